@@ -0,0 +1,183 @@
+"""
+Уведомления боту (notify_server.py): общий keep-alive AsyncClient и очередь в памяти.
+
+Клиент и воркеры очереди живут в lifespan приложения (api/main.py).
+Роуты только ставят уведомление в очередь (notify_bot) и не ждут ответа бота;
+воркеры отправляют в фоне с повторами и экспоненциальной задержкой.
+Очередь ограничена: при переполнении уведомление отбрасывается с предупреждением
+в логе (бот всё равно дошлёт pending_confirm по расписанию).
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Optional
+
+import anyio.from_thread
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class NotifyOutbox:
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        workers: int = 4,
+        max_attempts: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        timeout: float = 5.0,
+    ):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def started(self) -> bool:
+        return self._client is not None
+
+    async def start(
+        self,
+        base_url: Optional[str] = None,
+        secret: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        """Создать клиент и воркеры. Без BOT_NOTIFY_URL очередь выключена."""
+        if self.started:
+            return
+        url = (base_url if base_url is not None else os.getenv("BOT_NOTIFY_URL") or "").strip().rstrip("/")
+        if not url:
+            return
+        secret = (secret if secret is not None else os.getenv("NOTIFY_SECRET") or "").strip()
+        self._client = httpx.AsyncClient(
+            base_url=url,
+            headers={"X-Notify-Secret": secret} if secret else {},
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+            transport=transport,
+        )
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("Bot notify outbox started (%s, %d workers)", url, self.workers)
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        """Дождаться отправки очереди (не дольше drain_timeout), закрыть клиент."""
+        if not self.started:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Bot notify outbox: %d notifications not sent on shutdown", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._client.aclose()
+        self._client = self._queue = self._loop = None
+        self._tasks = []
+
+    def enqueue(self, path: str, payload: dict) -> bool:
+        """Поставить уведомление в очередь. Можно вызывать из потока синхронного роута."""
+        loop = self._loop
+        if not self.started or loop is None or loop.is_closed():
+            return False
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return self._put((path, payload))
+        loop.call_soon_threadsafe(self._put, (path, payload))
+        return True
+
+    def _put(self, item: tuple[str, dict]) -> bool:
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Bot notify outbox full, dropping %s", item[0])
+            return False
+
+    async def post(self, path: str, payload: dict) -> httpx.Response:
+        """Один запрос к боту через общий клиент (без очереди и повторов)."""
+        return await self._client.post(path, json=payload)
+
+    async def _send(self, path: str, payload: dict) -> bool:
+        for attempt in range(self.max_attempts):
+            try:
+                r = await self._client.post(path, json=payload)
+                if r.status_code < 500:
+                    if r.status_code >= 400:
+                        logger.warning("Bot notify %s rejected: %s", path, r.status_code)
+                    return r.status_code < 400
+            except httpx.HTTPError as e:
+                logger.debug("Bot notify %s attempt %d failed: %s", path, attempt + 1, e)
+            if attempt + 1 < self.max_attempts:
+                await asyncio.sleep(min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        logger.warning("Bot notify %s failed after %d attempts", path, self.max_attempts)
+        return False
+
+    async def _worker(self) -> None:
+        while True:
+            path, payload = await self._queue.get()
+            try:
+                if await self._send(path, payload):
+                    self.sent += 1
+                else:
+                    self.failed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.exception("Bot notify %s crashed: %s", path, e)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+outbox = NotifyOutbox(
+    maxsize=int(os.getenv("NOTIFY_OUTBOX_SIZE") or 1000),
+    max_attempts=int(os.getenv("NOTIFY_MAX_ATTEMPTS") or 4),
+)
+
+
+def notify_bot(path: str, payload: dict) -> bool:
+    """Fire-and-forget уведомление боту. False — очередь выключена (нет BOT_NOTIFY_URL) или переполнена."""
+    return outbox.enqueue(path, payload)
+
+
+def request_bot(path: str, payload: dict) -> httpx.Response:
+    """
+    Синхронный запрос к боту с ответом (для роутов, которым нужен результат).
+    Идёт через общий keep-alive клиент, если lifespan запущен; иначе — разовый запрос.
+    Вызывать из потока синхронного роута.
+    """
+    if outbox.started:
+        return anyio.from_thread.run(outbox.post, path, payload)
+    url = (os.getenv("BOT_NOTIFY_URL") or "").strip().rstrip("/")
+    secret = (os.getenv("NOTIFY_SECRET") or "").strip()
+    headers = {"X-Notify-Secret": secret} if secret else {}
+    return httpx.post(f"{url}{path}", json=payload, headers=headers, timeout=5.0)
+
+
+def notify_players_updated(player_ids: list[str]) -> None:
+    """Сообщить боту, что строки players изменились (имя, рейтинг): бот сбросит кэш игроков."""
+    ids = [str(pid) for pid in player_ids if pid]
+    if ids:
+        notify_bot("/notify-player-updated", {"player_ids": ids})
@@ -1,15 +1,19 @@
 """
-FastAPI dependencies: Supabase client, optional API key, current player (IDOR protection).
+FastAPI dependencies: Supabase clients (sync and async), optional API key, current player (IDOR protection).
 Supports both Bearer JWT (from /auth/telegram) and legacy X-Player-Id.
+Auth dependencies are `async def` (no I/O, so no threadpool hop); verified tokens are cached
+(api.token_cache) and the current player is resolved once per request (request.state.player_id).
 """
 import os
 from pathlib import Path
 from typing import Optional
 
 import jwt
-from fastapi import Depends, Header, HTTPException
+from fastapi import Depends, Header, HTTPException, Request
 from fastapi.security import APIKeyHeader
-from supabase import Client, create_client
+from supabase import AsyncClient, Client, create_async_client, create_client
+
+from api.token_cache import token_cache
 
 # Security scheme for OpenAPI/Swagger: enables "Authorize" and X-API-Key in /docs
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False, scheme_name="ApiKey")
@@ -23,21 +27,36 @@ if _env_path.exists():
     load_dotenv(_env_path)
 
 _client: Optional[Client] = None
+_async_client: Optional[AsyncClient] = None
 
 
-def get_supabase() -> Client:
-    global _client
-    if _client is not None:
-        return _client
+def _supabase_credentials() -> tuple[str, str]:
     url = (os.getenv("SUPABASE_URL") or "").strip()
     key = (os.getenv("SUPABASE_KEY") or "").strip()
     if not url or not key:
         raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set")
-    _client = create_client(url, key)
+    return url, key
+
+
+def get_supabase() -> Client:
+    global _client
+    if _client is not None:
+        return _client
+    _client = create_client(*_supabase_credentials())
     return _client
 
 
-def optional_api_key(x_api_key: Optional[str] = Depends(api_key_header)) -> None:
+async def get_async_supabase() -> AsyncClient:
+    """Async client for `async def` routes: PostgREST calls don't hold a threadpool worker
+    and independent queries of one request can run concurrently (asyncio.gather)."""
+    global _async_client
+    if _async_client is not None:
+        return _async_client
+    _async_client = await create_async_client(*_supabase_credentials())
+    return _async_client
+
+
+async def optional_api_key(x_api_key: Optional[str] = Depends(api_key_header)) -> None:
     """If API_KEY is set in env, require X-API-Key header to match."""
     api_key = (os.getenv("API_KEY") or "").strip()
     if not api_key:
@@ -47,7 +66,9 @@ def optional_api_key(x_api_key: Optional[str] = Depends(api_key_header)) -> None
 
 
 def _player_id_from_bearer(authorization: Optional[str]) -> Optional[str]:
-    """Extract and verify Bearer JWT; return player_id from payload or None."""
+    """Extract and verify Bearer JWT; return player_id from payload or None.
+    A token verified earlier is answered from token_cache until its exp.
+    """
     if not authorization or not isinstance(authorization, str):
         return None
     parts = authorization.strip().split()
@@ -57,27 +78,41 @@ def _player_id_from_bearer(authorization: Optional[str]) -> Optional[str]:
     secret = (os.getenv("JWT_SECRET") or "").strip()
     if not secret:
         return None
+    found, pid = token_cache.get(secret, token)
+    if found:
+        return pid
     try:
         payload = jwt.decode(token, secret, algorithms=["HS256"])
-        pid = payload.get("player_id")
-        return str(pid) if pid is not None else None
     except (jwt.InvalidTokenError, jwt.ExpiredSignatureError):
         return None
+    raw = payload.get("player_id")
+    pid = str(raw) if raw is not None else None
+    token_cache.put(secret, token, pid, payload.get("exp"))
+    return pid
+
 
+_UNRESOLVED = object()
 
-def get_current_player_id(
+
+async def get_current_player_id(
+    request: Request,
     authorization: Optional[str] = Header(None),
     x_player_id: Optional[str] = Header(None, alias=player_id_header),
 ) -> Optional[str]:
-    """Return current player ID: from Bearer JWT first, else from X-Player-Id header."""
+    """Return current player ID: from Bearer JWT first, else from X-Player-Id header.
+    Resolved once per request and kept in request.state.player_id for other dependencies.
+    """
+    cached = getattr(request.state, "player_id", _UNRESOLVED)
+    if cached is not _UNRESOLVED:
+        return cached
     pid = _player_id_from_bearer(authorization)
-    if pid is not None:
-        return pid
-    s = (x_player_id or "").strip()
-    return s if s else None
+    if pid is None:
+        pid = (x_player_id or "").strip() or None
+    request.state.player_id = pid
+    return pid
 
 
-def require_current_player_id(
+async def require_current_player_id(
     current: Optional[str] = Depends(get_current_player_id),
 ) -> str:
     """Require X-Player-Id for endpoints that must know the actor (access control)."""
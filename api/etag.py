@@ -0,0 +1,87 @@
+"""
+Условные GET (ETag / If-None-Match → 304) для ресурсов, которые Mini App опрашивает по таймеру.
+
+Версия ресурса — счётчики в памяти процесса API по областям (scope): players, seasons,
+division:<id>. Роуты, которые меняют данные через API, вызывают versions.bump();
+ETag — хэш счётчиков нужных областей. Совпал If-None-Match — роут отвечает 304
+до запроса в Supabase и без сериализации JSON.
+Записи в обход API (бот, SQL Editor) счётчики не видят, поэтому в ETag входит номер
+окна ETAG_MAX_AGE секунд (по умолчанию 30): дольше этого ответ устареть не может.
+ETAG_MAX_AGE=0 — без окна (если все записи идут через API).
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+PLAYERS = "players"
+# Рейтинги игроков меняет каждое подтверждение матча. Отдельно от PLAYERS (имена), чтобы
+# подтверждение не сбрасывало ETag и кэш всех дивизионов: дивизион матча получает свою версию,
+# рейтинг тех же игроков в других дивизионах (прошлые сезоны) обновляется окном ETAG_MAX_AGE.
+RATINGS = "ratings"
+SEASONS = "seasons"
+
+
+def division_scope(division_id: Any) -> str:
+    return f"division:{division_id}"
+
+
+class ResponseVersions:
+    """Потокобезопасные счётчики версий по областям + ETag из них."""
+
+    def __init__(self, max_age: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.max_age = max_age
+        self._clock = clock
+        # Другой процесс или перезапуск — другие ETag: счётчики у них свои
+        self._instance = uuid.uuid4().hex
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *scopes: str) -> None:
+        with self._lock:
+            for scope in scopes:
+                if scope:
+                    self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def etag(self, *scopes: str) -> str:
+        window = int(self._clock() // self.max_age) if self.max_age > 0 else 0
+        with self._lock:
+            parts = [f"{s}={self._versions.get(s, 0)}" for s in scopes]
+        raw = "|".join([self._instance, str(window), *parts])
+        return f'W/"{hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()}"'
+
+
+versions = ResponseVersions(max_age=float(os.getenv("ETAG_MAX_AGE") or 30))
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match совпадает с etag (слабое сравнение, как требует RFC 9110 для GET)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_opaque(t) == _opaque(etag) for t in header.split(","))
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    # no-cache: клиент может хранить ответ, но перед использованием перепроверяет ETag
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+
+def json_with_etag(content: Any, etag: str) -> JSONResponse:
+    return JSONResponse(content=content, headers=etag_headers(etag))
@@ -1,10 +1,53 @@
 """
 Rate limiting (OWASP: protect from brute force and abuse).
 Uses X-Forwarded-For when behind a trusted proxy.
+
+Storage is pluggable via RATE_LIMIT_STORAGE_URI:
+- bounded-memory:// (default) — per-process counters, at most RATE_LIMIT_MAX_KEYS keys
+  (oldest windows are evicted first, so memory does not grow with distinct IPs);
+- redis://host:port/db — counters shared by all uvicorn workers / instances.
+If the shared storage is unreachable, limits are enforced per process in bounded memory
+until it recovers. Strategy is sliding-window-counter (RATE_LIMIT_STRATEGY): two counters
+per key and window instead of a list of timestamps per request, one round-trip to Redis per hit.
 """
+import os
+import threading
+
+from limits.storage import MemoryStorage, storage_from_string
+from limits.strategies import STRATEGIES
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+DEFAULT_STORAGE_URI = "bounded-memory://"
+DEFAULT_STRATEGY = "sliding-window-counter"
+DEFAULT_MAX_KEYS = 10_000
+
+
+class BoundedMemoryStorage(MemoryStorage):
+    """In-memory limits storage with a cap on the number of counters.
+    When the cap is exceeded, the oldest inserted keys (oldest windows) are dropped:
+    an evicted client starts from zero, which is safer than unbounded growth."""
+
+    STORAGE_SCHEME = ["bounded-memory"]
+
+    def __init__(self, uri: str | None = None, wrap_exceptions: bool = False, max_keys: int = DEFAULT_MAX_KEYS, **options):
+        self.max_keys = int(max_keys)
+        self.evictions = 0
+        self._evict_lock = threading.Lock()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        count = super().incr(key, expiry, amount)
+        if len(self.storage) > self.max_keys:
+            self._evict()
+        return count
+
+    def _evict(self) -> None:
+        with self._evict_lock:
+            while len(self.storage) > self.max_keys:
+                self.clear(next(iter(self.storage)))
+                self.evictions += 1
+
 
 def _key_func(request):
     """Client IP: X-Forwarded-For (first hop) when behind proxy, else remote address."""
@@ -14,4 +57,49 @@ def _key_func(request):
     return get_remote_address(request)
 
 
-limiter = Limiter(key_func=_key_func)
+def _storage_options(uri: str) -> dict:
+    if uri.startswith("bounded-memory"):
+        return {"max_keys": int(os.getenv("RATE_LIMIT_MAX_KEYS") or DEFAULT_MAX_KEYS)}
+    if uri.startswith(("redis", "valkey")):
+        # Fail fast: an unreachable Redis must not stall requests before the fallback kicks in
+        timeout = float(os.getenv("RATE_LIMIT_STORAGE_TIMEOUT") or 0.5)
+        return {"socket_connect_timeout": timeout, "socket_timeout": timeout}
+    return {}
+
+
+def build_limiter(storage_uri: str | None = None, strategy: str | None = None) -> Limiter:
+    """Limiter over RATE_LIMIT_STORAGE_URI with a bounded in-memory fallback."""
+    uri = (storage_uri or os.getenv("RATE_LIMIT_STORAGE_URI") or DEFAULT_STORAGE_URI).strip()
+    strategy = (strategy or os.getenv("RATE_LIMIT_STRATEGY") or DEFAULT_STRATEGY).strip()
+    shared = not uri.startswith(("memory", "bounded-memory"))
+    built = Limiter(
+        key_func=_key_func,
+        storage_uri=uri,
+        storage_options=_storage_options(uri),
+        strategy=strategy,
+        in_memory_fallback_enabled=shared,
+    )
+    if shared:
+        # slowapi falls back to a plain (unbounded) MemoryStorage; keep the fallback bounded too
+        fallback_uri = DEFAULT_STORAGE_URI
+        built._fallback_storage = storage_from_string(fallback_uri, **_storage_options(fallback_uri))
+        built._fallback_limiter = STRATEGIES[strategy](built._fallback_storage)
+    return built
+
+
+def limiter_stats(target: Limiter | None = None) -> dict:
+    """Backend and state of the limiter for /metrics."""
+    target = target or limiter
+    storage = target._storage
+    stats = {
+        "storage": type(storage).__name__,
+        "strategy": target._strategy,
+        "fallback_active": target._storage_dead,
+    }
+    local = target._fallback_storage if target._storage_dead else storage
+    if isinstance(local, BoundedMemoryStorage):
+        stats.update({"keys": len(local.storage), "max_keys": local.max_keys, "evictions": local.evictions})
+    return stats
+
+
+limiter = build_limiter()
@@ -3,9 +3,10 @@ REST API for Tennis League. OpenAPI (Swagger) at /docs.
 """
 import logging
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, PlainTextResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -13,15 +14,34 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
-from api.limiter import limiter
+from api.bot_notify import outbox
+from api.dependencies import get_supabase, optional_api_key
+from api.limiter import limiter, limiter_stats
+from api.sse import division_hub
+from api.token_cache import init_data_cache, token_cache
+from api.response_cache import response_cache
 from api.routers import auth, client_sessions, divisions, game_requests, matches, players, seasons
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Общий HTTP-клиент, очередь уведомлений боту и push-канал дивизионов живут столько же, сколько приложение."""
+    await outbox.start()
+    await division_hub.start(lambda division_id: divisions.division_snapshot(get_supabase(), division_id))
+    try:
+        yield
+    finally:
+        await division_hub.stop()
+        await outbox.stop()
+
+
 app = FastAPI(
     title="Tennis League API",
     description="REST API for Лига настольного тенниса",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS: только доверенные origin'ы из env (OWASP)
@@ -32,7 +52,8 @@ app.add_middleware(
     allow_origins=_cors_origins,
     allow_credentials=False,
     allow_methods=["GET", "POST", "PATCH", "OPTIONS"],
-    allow_headers=["Content-Type", "X-API-Key", "X-Player-Id", "Authorization"],
+    allow_headers=["Content-Type", "X-API-Key", "X-Player-Id", "Authorization", "If-None-Match"],
+    expose_headers=["ETag"],
 )
 
 app.state.limiter = limiter
@@ -65,6 +86,19 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", dependencies=[Depends(optional_api_key)])
+def metrics():
+    """Счётчики процесса API: кэши ответов, токенов и initData, очередь уведомлений боту, подписчики SSE, хранилище rate limit."""
+    return {
+        "response_cache": response_cache.stats(),
+        "jwt_cache": token_cache.stats(),
+        "init_data_cache": init_data_cache.stats(),
+        "notify_outbox": outbox.stats(),
+        "realtime": division_hub.stats(),
+        "rate_limit": limiter_stats(),
+    }
+
+
 app.include_router(auth.router)
 app.include_router(players.router)
 app.include_router(seasons.router)
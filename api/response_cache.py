@@ -0,0 +1,136 @@
+"""
+Кэш готовых ответов (сериализованный JSON) для таблицы и матрицы дивизиона.
+
+Ключ — область дивизиона (division:<id>), внутри — ресурсы ("standings", "matches"),
+у каждого сохранён ETag (api.etag), под которым ответ посчитан. Запись отдаётся, только
+если ETag всё ещё текущий, поэтому смена имени/рейтинга игрока и окно ETAG_MAX_AGE
+устаревают её сами. Роуты, меняющие матчи дивизиона, вызывают invalidate_division():
+счётчик версии увеличивается, запись удаляется сразу, подписчики SSE (api.sse) получают diff.
+Хранилище подключаемое: любой объект с get(key) / set(key, value) / delete(key)
+(по умолчанию — LRU в памяти процесса, RESPONSE_CACHE_SIZE записей; 0 — кэш выключен).
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Protocol
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from api.etag import division_scope, etag_headers, versions
+from api.sse import division_hub
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[Any]: ...
+
+    def set(self, key: str, value: Any) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+class MemoryBackend:
+    """Потокобезопасный LRU в памяти процесса."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        # Чтение-изменение-запись записи области в store и её удаление в invalidate не перемежаются:
+        # иначе store из другого потока вернул бы запись, удалённую invalidate между get и set
+        self._write_lock = threading.Lock()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, scope: str, resource: str, etag: str) -> Optional[Response]:
+        """Готовый ответ, если он посчитан под этим же ETag; иначе None."""
+        entry = self.backend.get(scope) if self.backend is not None else None
+        cached = (entry or {}).get(resource)
+        if cached is None or cached[0] != etag:
+            self._count(False)
+            return None
+        self._count(True)
+        return Response(content=cached[1], media_type="application/json", headers=etag_headers(etag))
+
+    def store(self, scope: str, resource: str, etag: str, content: Any) -> JSONResponse:
+        """Сериализовать ответ один раз, сохранить тело и вернуть его."""
+        response = JSONResponse(content=content, headers=etag_headers(etag))
+        if self.backend is not None:
+            with self._write_lock:
+                entry = dict(self.backend.get(scope) or {})
+                entry[resource] = (etag, response.body)
+                self.backend.set(scope, entry)
+        return response
+
+    def invalidate(self, scope: str) -> None:
+        if self.backend is not None:
+            with self._write_lock:
+                self.backend.delete(scope)
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.backend is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "invalidations": self.invalidations,
+                "size": len(self.backend) if hasattr(self.backend, "__len__") else None,
+            }
+
+
+def _default_backend() -> Optional[CacheBackend]:
+    size = int(os.getenv("RESPONSE_CACHE_SIZE") or 256)
+    return MemoryBackend(size) if size > 0 else None
+
+
+response_cache = ResponseCache(_default_backend())
+
+
+def invalidate_division(division_id: Any, *scopes: str) -> None:
+    """Матчи дивизиона изменились: новая версия (ETag) и сброс кэша; scopes — что ещё изменилось."""
+    if division_id is None:
+        versions.bump(*scopes)
+        return
+    scope = division_scope(division_id)
+    versions.bump(scope, *scopes)
+    response_cache.invalidate(scope)
+    division_hub.notify(division_id)
@@ -1,5 +1,7 @@
 """
 Auth: exchange Telegram Web App initData for JWT (validated on server).
+Validated initData with a known player is cached for a short time (api.token_cache.init_data_cache),
+so repeated Mini App openings skip both the HMAC check and the players lookup.
 """
 import os
 import time
@@ -11,7 +13,8 @@ from pydantic import BaseModel
 
 from api.dependencies import get_supabase, optional_api_key
 from api.limiter import limiter
-from api.telegram_auth import validate_init_data
+from api.telegram_auth import AUTH_DATE_MAX_AGE_SECONDS, validate_init_data
+from api.token_cache import init_data_cache
 
 router = APIRouter(
     prefix="/auth",
@@ -38,6 +41,28 @@ def _get_jwt_secret() -> str:
     return secret
 
 
+def _resolve_init_data(init_data: str, bot_token: str, supabase) -> tuple[int, Optional[str]]:
+    """Validate initData and resolve player_id from DB; cache the result if the player exists."""
+    payload = validate_init_data(init_data, bot_token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid or expired initData")
+
+    telegram_id = payload["telegram_id"]
+
+    # Resolve player_id from DB
+    r = supabase.table("players").select("id").eq("telegram_id", telegram_id).execute()
+    player_id = None
+    if r.data and len(r.data) > 0:
+        player_id = r.data[0].get("id")
+
+    # Not registered yet: don't cache, the next opening should see the new player
+    if player_id is not None:
+        auth_date = payload.get("auth_date")
+        valid_until = auth_date + AUTH_DATE_MAX_AGE_SECONDS if auth_date else None
+        init_data_cache.put(bot_token, init_data, (telegram_id, player_id), valid_until)
+    return telegram_id, player_id
+
+
 @router.post("/telegram")
 @limiter.limit("10/minute")
 def auth_telegram(
@@ -58,17 +83,12 @@ def auth_telegram(
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail="Auth not configured") from e
 
-    payload = validate_init_data(body.init_data.strip(), bot_token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid or expired initData")
-
-    telegram_id = payload["telegram_id"]
-
-    # Resolve player_id from DB
-    r = supabase.table("players").select("id").eq("telegram_id", telegram_id).execute()
-    player_id = None
-    if r.data and len(r.data) > 0:
-        player_id = r.data[0].get("id")
+    init_data = body.init_data.strip()
+    found, cached = init_data_cache.get(bot_token, init_data)
+    if found:
+        telegram_id, player_id = cached
+    else:
+        telegram_id, player_id = _resolve_init_data(init_data, bot_token, supabase)
 
     exp_seconds = int(os.getenv("JWT_EXPIRATION_SECONDS", "604800"))  # 7 days
     now = int(time.time())
@@ -1,6 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from typing import Literal
 
-from api.dependencies import get_supabase, optional_api_key
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from api.dependencies import get_async_supabase, optional_api_key
+from bot.services.rating_calculator import calculate_match_ratings
+from api.etag import PLAYERS, division_scope, is_not_modified, not_modified, versions
+from api.sse import division_hub
+from api.response_cache import response_cache
 
 router = APIRouter(
     prefix="/divisions",
@@ -10,12 +18,12 @@ router = APIRouter(
 
 
 @router.get("/{division_id}")
-def get_division_by_id(
+async def get_division_by_id(
     division_id: str,
-    supabase=Depends(get_supabase),
+    supabase=Depends(get_async_supabase),
 ):
     """Division by id with season."""
-    r = (
+    r = await (
         supabase.table("divisions")
         .select("*, season:seasons(*)")
         .eq("id", division_id)
@@ -27,12 +35,29 @@ def get_division_by_id(
 
 
 @router.get("/{division_id}/standings")
-def get_division_standings(
+async def get_division_standings(
     division_id: str,
-    supabase=Depends(get_supabase),
+    request: Request,
+    supabase=Depends(get_async_supabase),
 ):
-    """Division standings (division_players with player, ordered by position/points)."""
-    r = (
+    """Division standings (division_players with player, ordered by position/points).
+    Supports If-None-Match: 304 until a match of the division or a player changes.
+    """
+    scope = division_scope(division_id)
+    etag = versions.etag(scope, PLAYERS)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    cached = response_cache.get(scope, "standings", etag)
+    if cached is not None:
+        return cached
+    r = await _standings_query(supabase, division_id).execute()
+    return response_cache.store(scope, "standings", etag, _sorted_standings(r.data or []))
+
+
+# Построители запросов общие для async-роутов (await query.execute()) и синхронного
+# division_snapshot (push-канал api.sse считает снимок в потоке синхронным клиентом).
+def _standings_query(supabase, division_id: str):
+    return (
         supabase.table("division_players")
         .select(
             "id, position, total_points, total_sets_won, total_sets_lost, rating_delta, "
@@ -40,9 +65,10 @@ def get_division_standings(
         )
         .eq("division_id", division_id)
         .order("position", ascending=True, nulls_first=False)
-        .execute()
     )
-    rows = r.data or []
+
+
+def _sorted_standings(rows: list[dict]) -> list[dict]:
     if rows and all(r.get("position") is not None for r in rows):
         rows.sort(
             key=lambda x: (
@@ -53,27 +79,12 @@ def get_division_standings(
     return rows
 
 
-@router.get("/{division_id}/matches")
-def get_division_matches(
-    division_id: str,
-    supabase=Depends(get_supabase),
-):
-    """Matches and players list for division (for matrix view)."""
-    r_m = (
-        supabase.table("matches")
-        .select("id, player1_id, player2_id, sets_player1, sets_player2, status, submitted_by")
-        .eq("division_id", division_id)
-        .execute()
-    )
-    r_dp = (
-        supabase.table("division_players")
-        .select("player_id, player:players(id, name)")
-        .eq("division_id", division_id)
-        .execute()
-    )
-    matches = r_m.data or []
-    standings = r_dp.data or []
-    players = [s.get("player") or {"id": s["player_id"]} for s in standings if s.get("player_id")]
+MATCH_STATUSES = ["pending", "pending_confirm", "played", "not_played"]
+COMPACT_CELL = ["status", "sets_row", "sets_col", "submitted_by", "match_id"]
+
+
+def _full_matrix_payload(players: list[dict], matches: list[dict]) -> dict:
+    """Original format: every match is stored under both "p1-p2" and "p2-p1" keys."""
     matrix = {}
     for m in matches:
         k1, k2 = f"{m['player1_id']}-{m['player2_id']}", f"{m['player2_id']}-{m['player1_id']}"
@@ -90,3 +101,245 @@ def get_division_matches(
         }
         matrix[k1] = matrix[k2] = cell
     return {"players": players, "matches": matches, "matrix": matrix}
+
+
+def _compact_matrix_payload(players: list[dict], matches: list[dict]) -> dict:
+    """
+    Compact format: player index table and an N×N matrix where each match is stored once,
+    in the upper triangle (row index < column index); other cells are null.
+    Cell: [status index in "statuses", sets of the row player, sets of the column player,
+    submitted_by (0 — nobody, 1 — row player, 2 — column player), match id].
+    """
+    ids = [p["id"] for p in players]
+    names = [p.get("name") for p in players]
+    index = {pid: i for i, pid in enumerate(ids)}
+    for m in matches:
+        for pid in (m.get("player1_id"), m.get("player2_id")):
+            if pid is not None and pid not in index:
+                index[pid] = len(ids)
+                ids.append(pid)
+                names.append(None)
+    n = len(ids)
+    matrix: list[list] = [[None] * n for _ in range(n)]
+    status_index = {s: i for i, s in enumerate(MATCH_STATUSES)}
+    for m in matches:
+        i, j = index.get(m.get("player1_id")), index.get(m.get("player2_id"))
+        if i is None or j is None or i == j:
+            continue
+        s_i, s_j = m.get("sets_player1"), m.get("sets_player2")
+        if i > j:
+            i, j, s_i, s_j = j, i, s_j, s_i
+        submitted = m.get("submitted_by")
+        submitter = 1 if submitted == ids[i] else 2 if submitted == ids[j] else 0
+        matrix[i][j] = [status_index.get(m.get("status"), -1), s_i, s_j, submitter, m.get("id")]
+    return {
+        "format": "compact",
+        "statuses": MATCH_STATUSES,
+        "cell": COMPACT_CELL,
+        "player_ids": ids,
+        "player_names": names,
+        "matrix": matrix,
+    }
+
+
+@router.get("/{division_id}/matches")
+async def get_division_matches(
+    division_id: str,
+    request: Request,
+    format: Literal["full", "compact"] = Query("full", description="compact: index table + N×N matrix"),
+    supabase=Depends(get_async_supabase),
+):
+    """Matches and players list for division (for matrix view). Supports If-None-Match (304).
+    The serialized response is cached until the division's matches change (api.response_cache).
+    format=compact returns each match once (see _compact_matrix_payload) — about 3× smaller.
+    """
+    scope = division_scope(division_id)
+    resource = f"matches:{format}"
+    etag = versions.etag(scope, PLAYERS, resource)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    cached = response_cache.get(scope, resource, etag)
+    if cached is not None:
+        return cached
+    r_m, r_dp = await asyncio.gather(
+        _matrix_matches_query(supabase, division_id).execute(),
+        _matrix_players_query(supabase, division_id).execute(),
+    )
+    players, matches = _matrix_source(r_m.data, r_dp.data)
+    build = _compact_matrix_payload if format == "compact" else _full_matrix_payload
+    return response_cache.store(scope, resource, etag, build(players, matches))
+
+
+def _matrix_matches_query(supabase, division_id: str):
+    return (
+        supabase.table("matches")
+        .select("id, player1_id, player2_id, sets_player1, sets_player2, status, submitted_by")
+        .eq("division_id", division_id)
+    )
+
+
+def _matrix_players_query(supabase, division_id: str):
+    return (
+        supabase.table("division_players")
+        .select("player_id, player:players(id, name)")
+        .eq("division_id", division_id)
+    )
+
+
+def _matrix_source(match_rows: list[dict], player_rows: list[dict]) -> tuple[list[dict], list[dict]]:
+    matches = match_rows or []
+    standings = player_rows or []
+    players = [s.get("player") or {"id": s["player_id"]} for s in standings if s.get("player_id")]
+    return players, matches
+
+
+# Счета Best of 5 с точки зрения первого игрока пары (как validScores в ratingCalc.js)
+SCENARIO_SCORES = [(3, 0), (3, 1), (3, 2), (2, 3), (1, 3), (0, 3)]
+DEFAULT_RATING = 100.0
+DEFAULT_COEF = 0.25
+
+
+def _match_scenario(winner_sets: int, loser_sets: int, winner_position: int, loser_position: int) -> str:
+    """Сценарий матча по счёту и местам в таблице (getMatchScenario из matchScenario.js)."""
+    close = (winner_sets, loser_sets) == (3, 2)
+    dominant = (winner_sets, loser_sets) == (3, 0)
+    upset = winner_position > loser_position > 0
+    equal = winner_position == loser_position or not winner_position or not loser_position
+    if upset:
+        return "UPSET_DOMINANT" if dominant else "UPSET_CLOSE" if close else "UPSET"
+    if close:
+        return "CLOSE_BATTLE"
+    if not equal:
+        return "EXPECTED_DOMINANT" if dominant else "EXPECTED"
+    return "EQUAL"
+
+
+def _scenarios_payload(division_id: str, coef, standings: list[dict], matches: list[dict]) -> dict:
+    """
+    Every pair of the division without a played (or cancelled) match × every valid score.
+    All 6·P projections go through one calculate_match_ratings call; pair i, score k is
+    element 6·i + k. Deltas of a pair are [player1, player2] in the order of "scores".
+    """
+    kd = float(coef if coef is not None else DEFAULT_COEF)
+    ids, ratings, positions = [], {}, {}
+    for row in standings:
+        pid = row.get("player_id")
+        if not pid or pid in ratings:
+            continue
+        player = row.get("player") or {}
+        ids.append(pid)
+        rating = player.get("rating")
+        ratings[pid] = float(rating) if rating is not None else DEFAULT_RATING
+        positions[pid] = row.get("position") or 0
+    open_matches, closed = {}, set()
+    for m in matches:
+        key = frozenset((m.get("player1_id"), m.get("player2_id")))
+        if m.get("status") in ("played", "not_played"):
+            closed.add(key)
+        else:
+            open_matches[key] = m.get("id")
+
+    pairs = [
+        (a, b) for i, a in enumerate(ids) for b in ids[i + 1:]
+        if frozenset((a, b)) not in closed
+    ]
+    winner_ratings, loser_ratings, winner_sets, loser_sets = [], [], [], []
+    for a, b in pairs:
+        for s_a, s_b in SCENARIO_SCORES:
+            w, l = (a, b) if s_a > s_b else (b, a)
+            winner_ratings.append(ratings[w])
+            loser_ratings.append(ratings[l])
+            winner_sets.append(max(s_a, s_b))
+            loser_sets.append(min(s_a, s_b))
+    deltas_w, deltas_l = calculate_match_ratings(
+        winner_ratings, loser_ratings, winner_sets, loser_sets, [kd] * len(winner_ratings)
+    )
+
+    out = []
+    for i, (a, b) in enumerate(pairs):
+        deltas, scenarios = [], []
+        for k, (s_a, s_b) in enumerate(SCENARIO_SCORES):
+            dw, dl = deltas_w[6 * i + k], deltas_l[6 * i + k]
+            if s_a > s_b:
+                deltas.append([dw, dl])
+                scenarios.append(_match_scenario(s_a, s_b, positions[a], positions[b]))
+            else:
+                deltas.append([dl, dw])
+                scenarios.append(_match_scenario(s_b, s_a, positions[b], positions[a]))
+        out.append({
+            "player1_id": a,
+            "player2_id": b,
+            "match_id": open_matches.get(frozenset((a, b))),
+            "deltas": deltas,
+            "scenarios": scenarios,
+        })
+    return {
+        "division_id": division_id,
+        "coef": kd,
+        "scores": [list(s) for s in SCENARIO_SCORES],
+        "ratings": ratings,
+        "pairs": out,
+    }
+
+
+@router.get("/{division_id}/scenarios")
+async def get_division_scenarios(
+    division_id: str,
+    request: Request,
+    supabase=Depends(get_async_supabase),
+):
+    """What-if projections for the division's remaining pairs: rating deltas of both players
+    and the match scenario for each of the six valid scores (see _scenarios_payload).
+    Computed once per division version: cached like the matrix until a match of the division
+    (and with it its players' ratings) or a player's name changes. Supports If-None-Match (304).
+    """
+    scope = division_scope(division_id)
+    etag = versions.etag(scope, PLAYERS, "scenarios")
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    cached = response_cache.get(scope, "scenarios", etag)
+    if cached is not None:
+        return cached
+    r_div, r_dp, r_m = await asyncio.gather(
+        supabase.table("divisions").select("id, coef").eq("id", division_id).execute(),
+        supabase.table("division_players")
+        .select("player_id, position, player:players(id, rating)")
+        .eq("division_id", division_id)
+        .execute(),
+        _matrix_matches_query(supabase, division_id).execute(),
+    )
+    if not r_div.data:
+        raise HTTPException(status_code=404, detail="Division not found")
+    payload = _scenarios_payload(division_id, r_div.data[0].get("coef"), r_dp.data or [], r_m.data or [])
+    return response_cache.store(scope, "scenarios", etag, payload)
+
+
+def division_snapshot(supabase, division_id: str) -> dict:
+    """Standings and compact matrix of a division — the payload pushed by /events (api.sse).
+    Takes the sync client: the hub runs it in a worker thread.
+    """
+    players, matches = _matrix_source(
+        _matrix_matches_query(supabase, division_id).execute().data,
+        _matrix_players_query(supabase, division_id).execute().data,
+    )
+    return {
+        "standings": _sorted_standings(_standings_query(supabase, division_id).execute().data or []),
+        "matrix": _compact_matrix_payload(players, matches),
+    }
+
+
+@router.get("/{division_id}/events")
+async def division_events(division_id: str, request: Request):
+    """Server-Sent Events stream of the division's standings and matrix, instead of polling.
+    First event is `snapshot` (division_snapshot), then `diff` events with changed standings rows,
+    new order and changed matrix cells ([row, col, cell]); a `snapshot` again if the players changed
+    or the client fell behind. One computation per change is shared by all subscribers.
+    """
+    if not division_hub.started:
+        raise HTTPException(status_code=503, detail="Realtime is not available")
+    return StreamingResponse(
+        division_hub.events(division_id, request.is_disconnected),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx не должен буферизовать поток
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
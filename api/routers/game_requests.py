@@ -2,15 +2,16 @@
 Game requests: division challenges and open "looking for game" requests.
 Requests expire daily at 21:00 Moscow time (UTC+3 = 18:00 UTC).
 """
-import os
+import asyncio
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
+from api.bot_notify import notify_bot
 from api.dependencies import (
+    get_async_supabase,
     get_supabase,
     optional_api_key,
     require_current_player_id,
@@ -32,42 +33,15 @@ def _next_21_moscow() -> datetime:
 
 
 def _trigger_game_request_notify(request_id: str) -> None:
-    url = (os.getenv("BOT_NOTIFY_URL") or "").strip().rstrip("/")
-    if not url:
-        return
-    secret = (os.getenv("NOTIFY_SECRET") or "").strip()
-    hdrs = {"X-Notify-Secret": secret} if secret else {}
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            client.post(f"{url}/notify-game-request", json={"request_id": request_id}, headers=hdrs)
-    except Exception:
-        pass
+    notify_bot("/notify-game-request", {"request_id": request_id})
 
 
 def _trigger_open_game_request_notify(request_id: str) -> None:
-    url = (os.getenv("BOT_NOTIFY_URL") or "").strip().rstrip("/")
-    if not url:
-        return
-    secret = (os.getenv("NOTIFY_SECRET") or "").strip()
-    hdrs = {"X-Notify-Secret": secret} if secret else {}
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            client.post(f"{url}/notify-open-game-request", json={"request_id": request_id}, headers=hdrs)
-    except Exception:
-        pass
+    notify_bot("/notify-open-game-request", {"request_id": request_id})
 
 
 def _trigger_game_request_accepted_notify(request_id: str) -> None:
-    url = (os.getenv("BOT_NOTIFY_URL") or "").strip().rstrip("/")
-    if not url:
-        return
-    secret = (os.getenv("NOTIFY_SECRET") or "").strip()
-    hdrs = {"X-Notify-Secret": secret} if secret else {}
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            client.post(f"{url}/notify-game-request-accepted", json={"request_id": request_id}, headers=hdrs)
-    except Exception:
-        pass
+    notify_bot("/notify-game-request-accepted", {"request_id": request_id})
 
 
 router = APIRouter(
@@ -157,9 +131,9 @@ def create_game_request(
 
 
 @router.get("")
-def list_game_requests(
+async def list_game_requests(
     season_id: Optional[str] = None,
-    supabase=Depends(get_supabase),
+    supabase=Depends(get_async_supabase),
     current_player_id=Depends(require_current_player_id),
 ):
     """
@@ -180,9 +154,9 @@ def list_game_requests(
     )
     if season_id:
         open_q = open_q.eq("season_id", season_id)
-    open_r = open_q.order("created_at", desc=False).execute()
+    open_q = open_q.order("created_at", desc=False)
 
-    challenge_r = (
+    challenge_q = (
         supabase.table("game_requests")
         .select("id, requester_id, type, message, created_at, expires_at, requester:players!requester_id(id, name)")
         .eq("type", "division_challenge")
@@ -190,17 +164,19 @@ def list_game_requests(
         .eq("status", "pending")
         .gt("expires_at", now_utc)
         .order("created_at", desc=False)
-        .execute()
     )
 
-    mine_r = (
+    mine_q = (
         supabase.table("game_requests")
         .select("id, requester_id, type, message, created_at, expires_at, target_player_id, target:players!target_player_id(id, name)")
         .eq("requester_id", current_player_id)
         .eq("status", "pending")
         .gt("expires_at", now_utc)
         .order("created_at", desc=False)
-        .execute()
+    )
+
+    open_r, challenge_r, mine_r = await asyncio.gather(
+        open_q.execute(), challenge_q.execute(), mine_q.execute()
     )
 
     return {
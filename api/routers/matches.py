@@ -1,19 +1,29 @@
+import json
 import os
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Literal, Optional
 
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from postgrest.exceptions import APIError
 from pydantic import BaseModel
 
+from api.bot_notify import notify_bot, notify_players_updated, request_bot
 from api.dependencies import (
+    get_async_supabase,
     get_current_player_id,
     get_supabase,
     optional_api_key,
     require_current_player_id,
 )
+from api.etag import RATINGS
 from api.limiter import limiter
-from api.rating_calc import calculate_match_rating
+from api.response_cache import invalidate_division
+from bot.services.consistency import iter_consistency_reports
+from bot.services.player_embed import embed_players, hydrate_players
+from bot.services.rating_calculator import calculate_match_rating
+from bot.services.standings import apply_match_delta, recalc_division_standings
 
 router = APIRouter(
     prefix="/matches",
@@ -33,76 +43,38 @@ def _recalc_division_standings(supabase, division_id: str) -> None:
     """
     Пересчитать totals в division_players по таблице matches для заданного дивизиона.
     Используется как защита от рассинхронизации между matches и division_players.
+    Логика общая с ботом: bot/services/standings.py (2 чтения + один bulk upsert).
     """
-    # Собираем все сыгранные матчи дивизиона
-    matches_r = (
-        supabase.table("matches")
-        .select("player1_id, player2_id, sets_player1, sets_player2, status")
-        .eq("division_id", division_id)
-        .execute()
-    )
-    matches = matches_r.data or []
-
-    totals = {}
-
-    def ensure_player(pid: str):
-        if pid not in totals:
-            totals[pid] = {
-                "points": 0,
-                "sets_won": 0,
-                "sets_lost": 0,
-            }
-
-    for m in matches:
-        if m.get("status") != "played":
-            continue
-        p1 = m.get("player1_id")
-        p2 = m.get("player2_id")
-        s1 = int(m.get("sets_player1") or 0)
-        s2 = int(m.get("sets_player2") or 0)
-        if p1 is None or p2 is None:
-            continue
-        if s1 == s2:
-            # Нечего считать, результат некорректен
-            continue
-        ensure_player(p1)
-        ensure_player(p2)
-        # Сеты
-        totals[p1]["sets_won"] += s1
-        totals[p1]["sets_lost"] += s2
-        totals[p2]["sets_won"] += s2
-        totals[p2]["sets_lost"] += s1
-        # Очки: 2 за победу, 1 за поражение
-        if s1 > s2:
-            totals[p1]["points"] += 2
-            totals[p2]["points"] += 1
-        else:
-            totals[p2]["points"] += 2
-            totals[p1]["points"] += 1
-
-    # Обновляем division_players только по агрегатам totals, не трогая rating_delta и position
-    dp_r = (
-        supabase.table("division_players")
-        .select("id, player_id, total_points, total_sets_won, total_sets_lost")
-        .eq("division_id", division_id)
-        .execute()
-    )
-    for row in dp_r.data or []:
-        pid = row.get("player_id")
-        agg = totals.get(pid)
-        if not agg:
-            # Нет сыгранных матчей для этого игрока — оставляем как есть
-            continue
-        supabase.table("division_players").update(
-            {
-                "total_points": agg["points"],
-                "total_sets_won": agg["sets_won"],
-                "total_sets_lost": agg["sets_lost"],
-            }
-        ).eq("id", row["id"]).execute()
-
-
-def _apply_match_result_as_played(supabase, match: dict) -> None:
+    recalc_division_standings(supabase, division_id)
+
+
+# PostgREST: функция не найдена (миграция 014 не применена)
+_MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+
+
+def _confirm_match_rpc(supabase, match_id: str, confirmed_by: str) -> Optional[dict]:
+    """
+    Подтвердить матч одним вызовом RPC confirm_match_result (database/migrations/014):
+    рейтинг, division_players и rating_history — в одной транзакции.
+    Возвращает новые рейтинги или None, если функция ещё не создана в БД.
+    Ошибки проверки внутри транзакции превращаются в ValueError.
+    """
+    try:
+        r = supabase.rpc(
+            "confirm_match_result",
+            {"p_match_id": match_id, "p_confirmed_by": confirmed_by},
+        ).execute()
+    except APIError as e:
+        if e.code in _MISSING_FUNCTION_CODES:
+            return None
+        if e.code == "P0001":
+            raise ValueError(e.message) from e
+        raise
+    return r.data or {}
+
+
+def _apply_match_result_as_played(supabase, match: dict) -> dict:
+    """Старый путь подтверждения (последовательные запросы), если RPC недоступен."""
     division_id = match["division_id"]
     p1_id = match["player1_id"]
     p2_id = match["player2_id"]
@@ -112,16 +84,16 @@ def _apply_match_result_as_played(supabase, match: dict) -> None:
     division = _get_division_by_id(supabase, division_id)
     if not division:
         raise ValueError("Дивизион не найден.")
-    coef = float(division.get("coef") or 0.25)
+    # Как coalesce(d.coef, 0.25) в confirm_match_result (014): КД = 0 остаётся нулём
+    coef = float(division["coef"]) if division.get("coef") is not None else 0.25
     season = division.get("season") or {}
     season_id = season.get("id") or division.get("season_id")
     if not season_id:
         raise ValueError("Сезон дивизиона не найден.")
 
-    r1 = supabase.table("players").select("id, rating").eq("id", p1_id).execute()
-    r2 = supabase.table("players").select("id, rating").eq("id", p2_id).execute()
-    r1_val = float(r1.data[0]["rating"]) if r1.data else 100.0
-    r2_val = float(r2.data[0]["rating"]) if r2.data else 100.0
+    players = hydrate_players(supabase, [match], "player1_id", "player2_id", fields="id, rating")
+    r1_val = float(players[p1_id]["rating"]) if p1_id in players else 100.0
+    r2_val = float(players[p2_id]["rating"]) if p2_id in players else 100.0
 
     winner_id = p1_id if sets1 > sets2 else p2_id
     loser_id = p2_id if sets1 > sets2 else p1_id
@@ -141,26 +113,6 @@ def _apply_match_result_as_played(supabase, match: dict) -> None:
     supabase.table("players").update({"rating": winner_rating_after}).eq("id", winner_id).execute()
     supabase.table("players").update({"rating": loser_rating_after}).eq("id", loser_id).execute()
 
-    for pid, pts, swon, slost, delta in [
-        (winner_id, 2, winner_sets, loser_sets, delta_winner),
-        (loser_id, 1, loser_sets, winner_sets, delta_loser),
-    ]:
-        dp = (
-            supabase.table("division_players")
-            .select("id, total_points, total_sets_won, total_sets_lost, rating_delta")
-            .eq("division_id", division_id)
-            .eq("player_id", pid)
-            .execute()
-        )
-        if dp.data:
-            row = dp.data[0]
-            supabase.table("division_players").update({
-                "total_points": (row.get("total_points") or 0) + pts,
-                "total_sets_won": (row.get("total_sets_won") or 0) + swon,
-                "total_sets_lost": (row.get("total_sets_lost") or 0) + slost,
-                "rating_delta": round((row.get("rating_delta") or 0) + delta, 2),
-            }).eq("id", row["id"]).execute()
-
     supabase.table("rating_history").insert([
         {
             "player_id": winner_id,
@@ -180,8 +132,30 @@ def _apply_match_result_as_played(supabase, match: dict) -> None:
         },
     ]).execute()
 
-    # После применения результата матча пересчитываем агрегаты standings для дивизиона
-    _recalc_division_standings(supabase, division_id)
+    # Standings: дельта только двум игрокам; полный пересчёт — если не сошлась контрольная сумма
+    consistent = apply_match_delta(
+        supabase,
+        division_id,
+        winner_id,
+        loser_id,
+        winner_sets,
+        loser_sets,
+        delta_winner,
+        delta_loser,
+    )
+    return {
+        "match_id": match["id"],
+        "division_id": division_id,
+        "winner_id": winner_id,
+        "loser_id": loser_id,
+        "winner_rating_before": winner_rating_before,
+        "winner_rating_after": winner_rating_after,
+        "delta_winner": delta_winner,
+        "loser_rating_before": loser_rating_before,
+        "loser_rating_after": loser_rating_after,
+        "delta_loser": delta_loser,
+        "standings_recalculated": not consistent,
+    }
 
 
 class SubmitForConfirmationBody(BaseModel):
@@ -199,9 +173,9 @@ class ConfirmRejectBody(BaseModel):
 
 
 @router.get("/pending")
-def get_pending_confirmation(
+async def get_pending_confirmation(
     player_id: str,
-    supabase=Depends(get_supabase),
+    supabase=Depends(get_async_supabase),
     current_player_id=Depends(require_current_player_id),
 ):
     """Matches with status pending_confirm where the given player is the opponent (must confirm).
@@ -209,7 +183,7 @@ def get_pending_confirmation(
     """
     if current_player_id != player_id:
         raise HTTPException(status_code=403, detail="Access denied: only your own pending matches")
-    r = (
+    r = await (
         supabase.table("matches")
         .select("id, division_id, player1_id, player2_id, sets_player1, sets_player2, submitted_by")
         .eq("status", "pending_confirm")
@@ -221,17 +195,20 @@ def get_pending_confirmation(
 
 
 @router.get("/{match_id}")
-def get_match_by_id(
+async def get_match_by_id(
     match_id: str,
-    supabase=Depends(get_supabase),
+    supabase=Depends(get_async_supabase),
     current_player_id=Depends(get_current_player_id),
 ):
-    """Single match with player1/player2 names (for confirm screen).
+    """Single match with player1/player2 names (for confirm screen), one query: players are embedded.
     If X-Player-Id is sent, access is restricted to participants (player1 or player2).
     """
-    r = (
+    r = await (
         supabase.table("matches")
-        .select("id, division_id, player1_id, player2_id, sets_player1, sets_player2, status, submitted_by, division:divisions(id, season_id)")
+        .select(
+            "id, division_id, player1_id, player2_id, sets_player1, sets_player2, status, submitted_by, "
+            "division:divisions(id, season_id), " + embed_players("player1_id", "player2_id")
+        )
         .eq("id", match_id)
         .execute()
     )
@@ -242,10 +219,6 @@ def get_match_by_id(
         p1, p2 = match.get("player1_id"), match.get("player2_id")
         if current_player_id != p1 and current_player_id != p2:
             raise HTTPException(status_code=403, detail="Access denied: only participants can view this match")
-    p1 = supabase.table("players").select("id, name, telegram_id").eq("id", match["player1_id"]).execute()
-    p2 = supabase.table("players").select("id, name, telegram_id").eq("id", match["player2_id"]).execute()
-    match["player1"] = p1.data[0] if p1.data else None
-    match["player2"] = p2.data[0] if p2.data else None
     return match
 
 
@@ -292,27 +265,15 @@ def submit_for_confirmation(
         r = supabase.table("matches").insert(payload).select().execute()
     if r.data and len(r.data) > 0:
         match_row = r.data[0]
+        invalidate_division(body.division_id)
         _trigger_instant_notify(match_row["id"])
         return match_row
     raise HTTPException(status_code=500, detail="Failed to save match")
 
 
 def _trigger_instant_notify(match_id: str) -> None:
-    """Вызвать бота для мгновенной отправки уведомления сопернику (без блокировки ответа)."""
-    url = (os.getenv("BOT_NOTIFY_URL") or "").strip().rstrip("/")
-    if not url:
-        return
-    secret = (os.getenv("NOTIFY_SECRET") or "").strip()
-    headers = {"X-Notify-Secret": secret} if secret else {}
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            client.post(
-                f"{url}/notify-pending-match",
-                json={"match_id": match_id},
-                headers=headers,
-            )
-    except Exception:
-        pass
+    """Вызвать бота для мгновенной отправки уведомления сопернику (через очередь, без блокировки ответа)."""
+    notify_bot("/notify-pending-match", {"match_id": match_id})
 
 
 @router.post("/{match_id}/notify-pending")
@@ -332,18 +293,10 @@ def notify_pending_match(
     row = r.data[0]
     if current_player_id not in (row.get("player1_id"), row.get("player2_id")):
         raise HTTPException(status_code=403, detail="Access denied: only participants may request notify")
-    url = (os.getenv("BOT_NOTIFY_URL") or "").strip().rstrip("/")
-    if not url:
+    if not (os.getenv("BOT_NOTIFY_URL") or "").strip():
         raise HTTPException(status_code=503, detail="Instant notify not configured")
-    secret = (os.getenv("NOTIFY_SECRET") or "").strip()
-    headers = {"X-Notify-Secret": secret} if secret else {}
     try:
-        r = httpx.post(
-            f"{url}/notify-pending-match",
-            json={"match_id": match_id},
-            headers=headers,
-            timeout=5.0,
-        )
+        r = request_bot("/notify-pending-match", {"match_id": match_id})
         if r.status_code == 401:
             raise HTTPException(status_code=502, detail="Notify unauthorized")
         if r.status_code >= 400:
@@ -360,7 +313,8 @@ def confirm_match(
     supabase=Depends(get_supabase),
     current_player_id=Depends(require_current_player_id),
 ):
-    """Confirm match result (opponent). Applies rating and division stats.
+    """Confirm match result (opponent). Applies rating and division stats atomically
+    (RPC confirm_match_result) and returns the new ratings.
     confirmed_by_player_id must match X-Player-Id (caller identity).
     """
     confirmed_by = body.confirmed_by_player_id
@@ -379,10 +333,14 @@ def confirm_match(
     if confirmed_by == row.get("submitted_by"):
         raise HTTPException(status_code=400, detail="Подтверждать должен соперник.")
     try:
-        _apply_match_result_as_played(supabase, row)
+        result = _confirm_match_rpc(supabase, match_id, confirmed_by)
+        if result is None:
+            result = _apply_match_result_as_played(supabase, row)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    return {"ok": True}
+    notify_players_updated([result.get("winner_id"), result.get("loser_id")])
+    invalidate_division(row.get("division_id"), RATINGS)
+    return {"ok": True, **result}
 
 
 @router.post("/{match_id}/reject")
@@ -417,6 +375,7 @@ def reject_match(
         "submitted_by": None,
         "notification_sent_at": None,
     }).eq("id", match_id).execute()
+    invalidate_division(row.get("division_id"))
     return {"ok": True}
 
 
@@ -432,12 +391,31 @@ def admin_recalc_standings(
     Используется как часть канонического пути обработки матчей и фоновой самопроверки.
     """
     _recalc_division_standings(supabase, division_id)
+    invalidate_division(division_id)
     return {"ok": True}
 
 
+def _require_admin(supabase, player_id: str) -> None:
+    """players.is_admin for the caller; season-wide reports read every division of the season."""
+    r = supabase.table("players").select("id, is_admin").eq("id", player_id).execute()
+    if not r.data or not r.data[0].get("is_admin"):
+        raise HTTPException(status_code=403, detail="Access denied: admin only")
+
+
+def _consistency_response(reports, format: str, envelope: dict):
+    """JSON: envelope + reports; jsonl: one report per line, streamed as divisions are checked."""
+    if format == "jsonl":
+        return StreamingResponse(
+            (json.dumps(report, ensure_ascii=False) + "\n" for report in reports),
+            media_type="application/x-ndjson",
+        )
+    return {**envelope, "divisions": list(reports)}
+
+
 @router.get("/admin/divisions/{division_id}/consistency-report")
 def admin_division_consistency_report(
     division_id: str,
+    format: Literal["json", "jsonl"] = Query("json", description="jsonl: JSON Lines stream"),
     supabase=Depends(get_supabase),
     current_player_id=Depends(require_current_player_id),
 ):
@@ -445,95 +423,35 @@ def admin_division_consistency_report(
     Диагностический отчёт по дивизиону:
     - сыгранные матчи без двух записей в rating_history;
     - расхождения totals в division_players относительно таблицы matches.
+    Три выборки независимо от размера дивизиона (bot/services/consistency.py).
     """
-    # Сыгранные матчи и агрегаты из matches
-    matches_r = (
-        supabase.table("matches")
-        .select("id, player1_id, player2_id, sets_player1, sets_player2, status")
-        .eq("division_id", division_id)
-        .execute()
-    )
-    matches = matches_r.data or []
-
-    played_match_ids = [m["id"] for m in matches if m.get("status") == "played"]
-    missing_history = []
-    if played_match_ids:
-        rh_r = (
-            supabase.table("rating_history")
-            .select("match_id")
-            .in_("match_id", played_match_ids)
-            .execute()
-        )
-        hist_counts = {}
-        for row in rh_r.data or []:
-            mid = row.get("match_id")
-            if mid is not None:
-                hist_counts[mid] = hist_counts.get(mid, 0) + 1
-        for mid in played_match_ids:
-            if hist_counts.get(mid) != 2:
-                missing_history.append(
-                    {"match_id": mid, "history_rows": hist_counts.get(mid, 0)}
-                )
-
-    # Агрегаты по matches
-    from collections import defaultdict
-
-    calc_totals = defaultdict(lambda: {"points": 0, "sets_won": 0, "sets_lost": 0})
-    for m in matches:
-        if m.get("status") != "played":
-            continue
-        p1 = m.get("player1_id")
-        p2 = m.get("player2_id")
-        s1 = int(m.get("sets_player1") or 0)
-        s2 = int(m.get("sets_player2") or 0)
-        if not p1 or not p2 or s1 == s2:
-            continue
-        calc_totals[p1]["sets_won"] += s1
-        calc_totals[p1]["sets_lost"] += s2
-        calc_totals[p2]["sets_won"] += s2
-        calc_totals[p2]["sets_lost"] += s1
-        if s1 > s2:
-            calc_totals[p1]["points"] += 2
-            calc_totals[p2]["points"] += 1
-        else:
-            calc_totals[p2]["points"] += 2
-            calc_totals[p1]["points"] += 1
-
-    dp_r = (
-        supabase.table("division_players")
-        .select("id, player_id, total_points, total_sets_won, total_sets_lost")
-        .eq("division_id", division_id)
+    reports = iter_consistency_reports(supabase, [division_id])
+    if format == "jsonl":
+        return _consistency_response(reports, format, {})
+    return next(reports)
+
+
+@router.get("/admin/seasons/{season_id}/consistency-report")
+def admin_season_consistency_report(
+    season_id: str,
+    format: Literal["json", "jsonl"] = Query("json", description="jsonl: JSON Lines stream, one division per line"),
+    supabase=Depends(get_supabase),
+    current_player_id=Depends(require_current_player_id),
+):
+    """
+    Тот же отчёт по всем дивизионам сезона одним вызовом: список дивизионов и по три выборки
+    на каждые DIVISION_BATCH дивизионов. format=jsonl отдаёт отчёт дивизиона строкой сразу после
+    проверки его пачки — аудит целого сезона не упирается в таймаут ответа.
+    Только для администратора (players.is_admin).
+    """
+    _require_admin(supabase, current_player_id)
+    r = (
+        supabase.table("divisions")
+        .select("id")
+        .eq("season_id", season_id)
+        .order("number")
         .execute()
     )
-    dp_rows = dp_r.data or []
-
-    totals_mismatches = []
-    for row in dp_rows:
-        pid = row.get("player_id")
-        agg = calc_totals.get(pid, {"points": 0, "sets_won": 0, "sets_lost": 0})
-        cur_pts = row.get("total_points") or 0
-        cur_sw = row.get("total_sets_won") or 0
-        cur_sl = row.get("total_sets_lost") or 0
-        if (
-            cur_pts != agg["points"]
-            or cur_sw != agg["sets_won"]
-            or cur_sl != agg["sets_lost"]
-        ):
-            totals_mismatches.append(
-                {
-                    "player_id": pid,
-                    "division_player_id": row.get("id"),
-                    "stored": {
-                        "points": cur_pts,
-                        "sets_won": cur_sw,
-                        "sets_lost": cur_sl,
-                    },
-                    "calculated": agg,
-                }
-            )
-
-    return {
-        "division_id": division_id,
-        "missing_rating_history": missing_history,
-        "totals_mismatches": totals_mismatches,
-    }
+    division_ids = [d["id"] for d in r.data or []]
+    reports = iter_consistency_reports(supabase, division_ids)
+    return _consistency_response(reports, format, {"season_id": season_id})
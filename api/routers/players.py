@@ -1,14 +1,23 @@
-from typing import Optional
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from postgrest.exceptions import APIError
 from pydantic import BaseModel
 
+from api.bot_notify import notify_players_updated
 from api.dependencies import (
+    get_async_supabase,
     get_current_player_id,
     get_supabase,
     optional_api_key,
     require_current_player_id,
 )
+from api.etag import PLAYERS, RATINGS, is_not_modified, json_with_etag, not_modified, versions
 
 router = APIRouter(
     prefix="/players",
@@ -22,9 +31,9 @@ class UpdatePlayerName(BaseModel):
 
 
 @router.get("")
-def get_player_by_telegram_id(
+async def get_player_by_telegram_id(
     telegram_id: Optional[int] = Query(None, description="Telegram user ID"),
-    supabase=Depends(get_supabase),
+    supabase=Depends(get_async_supabase),
     current_player_id=Depends(get_current_player_id),
 ):
     """Get player by telegram_id. Returns single player or null.
@@ -34,7 +43,7 @@ def get_player_by_telegram_id(
         return None
     if current_player_id is None:
         raise HTTPException(status_code=403, detail="X-Player-Id required to request player by telegram_id")
-    r = supabase.table("players").select("*").eq("telegram_id", telegram_id).execute()
+    r = await supabase.table("players").select("*").eq("telegram_id", telegram_id).execute()
     if not r.data or len(r.data) == 0:
         return None
     player = r.data[0]
@@ -44,24 +53,32 @@ def get_player_by_telegram_id(
 
 
 @router.get("/rating")
-def get_rating_top(
+async def get_rating_top(
+    request: Request,
     limit: int = Query(50, ge=1, le=100),
-    supabase=Depends(get_supabase),
+    supabase=Depends(get_async_supabase),
 ):
-    """Top players by rating. Uses player_stats view if available (games, wins)."""
+    """Top players by rating. Uses player_stats view if available (games, wins).
+    Since migration 015 the view reads precomputed player_match_stats, so the cost
+    does not grow with match history; it also adds sets_won, sets_lost, last_played_at.
+    Supports If-None-Match: 304 until a rating, name or match result changes.
+    """
+    etag = versions.etag(PLAYERS, RATINGS)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
     try:
-        r = (
+        r = await (
             supabase.table("player_stats")
-            .select("id, name, rating, telegram_id, games, wins")
+            .select("*")
             .order("rating", desc=True)
             .limit(limit)
             .execute()
         )
         if r.data is not None:
-            return r.data
+            return json_with_etag(r.data, etag)
     except Exception:
         pass
-    r = (
+    r = await (
         supabase.table("players")
         .select("id, name, rating, telegram_id")
         .order("rating", desc=True)
@@ -69,7 +86,161 @@ def get_rating_top(
         .execute()
     )
     rows = r.data or []
-    return [{"games": None, "wins": None, **p} for p in rows]
+    return json_with_etag([{"games": None, "wins": None, **p} for p in rows], etag)
+
+
+HISTORY_COLUMNS = "id, match_id, season_id, rating_before, rating_delta, rating_after, created_at"
+HISTORY_PAGE = 1000
+# PostgREST: функция не найдена (миграция 016 не применена)
+_MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+
+
+def _encode_cursor(*parts: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps(parts).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, size: int) -> list[str]:
+    """[created_at] или [created_at, id]; значения проверяются и возвращаются в каноническом виде,
+    т.к. подставляются в фильтр or_ и в параметры RPC."""
+    try:
+        parts = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(parts, list) or len(parts) != size or not all(isinstance(p, str) for p in parts):
+            raise ValueError(cursor)
+        canonical = [_parse_ts(parts[0]).isoformat()]
+        if size == 2:
+            canonical.append(str(uuid.UUID(parts[1])))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return canonical
+
+
+def _parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value)
+    return (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).astimezone(timezone.utc)
+
+
+def _bucket_start(ts: datetime, bucket: str) -> datetime:
+    """Начало недели (понедельник) или месяца по UTC — как date_trunc(bucket, ts, 'UTC')."""
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _next_bucket(start: datetime, bucket: str) -> datetime:
+    if bucket == "week":
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def _downsample(rows: list[dict], bucket: str) -> list[dict]:
+    """Последняя точка каждого периода, сумма дельт и число матчей (rows — по возрастанию времени)."""
+    points: dict[datetime, dict] = {}
+    for row in rows:
+        start = _bucket_start(_parse_ts(row["created_at"]), bucket)
+        point = points.get(start)
+        if point is None:
+            point = points[start] = {"bucket": start.isoformat(), "rating_delta": 0.0, "games": 0}
+        point["created_at"] = row["created_at"]
+        point["rating_after"] = row.get("rating_after")
+        point["rating_delta"] = round(point["rating_delta"] + float(row.get("rating_delta") or 0), 2)
+        point["games"] += 1
+    return list(points.values())
+
+
+async def _history_page(
+    supabase, player_id: str, limit: int, after: Optional[list[str]], since: Optional[str] = None
+) -> list[dict]:
+    """Keyset page in (created_at, id) order: index range scan on (player_id, created_at, id)."""
+    query = (
+        supabase.table("rating_history")
+        .select(HISTORY_COLUMNS)
+        .eq("player_id", player_id)
+    )
+    if since:
+        query = query.gte("created_at", since)
+    if after:
+        ts, row_id = after
+        query = query.or_(f'created_at.gt."{ts}",and(created_at.eq."{ts}",id.gt.{row_id})')
+    r = await query.order("created_at").order("id").limit(limit).execute()
+    return r.data or []
+
+
+async def _series_rpc(supabase, player_id: str, bucket: str, start: Optional[str], limit: int) -> Optional[list[dict]]:
+    """Прореживание в базе (rating_history_series, миграция 016); None — функции нет."""
+    try:
+        r = await supabase.rpc(
+            "rating_history_series",
+            {"p_player_id": player_id, "p_bucket": bucket, "p_from": start, "p_limit": limit},
+        ).execute()
+    except APIError as e:
+        if e.code in _MISSING_FUNCTION_CODES:
+            return None
+        raise
+    return [{**p, "rating_delta": float(p.get("rating_delta") or 0)} for p in r.data or []]
+
+
+async def _series_fallback(supabase, player_id: str, bucket: str, start: Optional[str], limit: int) -> list[dict]:
+    """Без миграции 016: история страницами по keyset, периоды считаются здесь.
+    Читает на один период больше, чтобы последний период страницы был полным."""
+    rows: list[dict] = []
+    after = None
+    buckets: set[datetime] = set()
+    while True:
+        page = await _history_page(supabase, player_id, HISTORY_PAGE, after, since=start)
+        rows.extend(page)
+        buckets.update(_bucket_start(_parse_ts(r["created_at"]), bucket) for r in page)
+        if len(page) < HISTORY_PAGE or len(buckets) > limit:
+            break
+        after = [page[-1]["created_at"], page[-1]["id"]]
+    return _downsample(rows, bucket)[:limit]
+
+
+@router.get("/{player_id}/rating-history")
+async def get_player_rating_history(
+    player_id: str,
+    request: Request,
+    bucket: Literal["match", "week", "month"] = Query(
+        "match", description="match: every rating_history row; week/month: last value per period (UTC)"
+    ),
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    supabase=Depends(get_async_supabase),
+):
+    """Rating trajectory of a player, oldest first, for charts.
+    Keyset pagination: pass next_cursor back as cursor until it is null (no OFFSET, each page is
+    an index range scan on (player_id, created_at, id), see migration 016).
+    bucket=week|month downsamples in the database (rating_history_series) to the last value of each
+    period, with the period's summed rating_delta and number of games, so a long history fits one response.
+    Supports If-None-Match: 304 until a match result changes a rating.
+    """
+    etag = versions.etag(RATINGS, f"rating-history:{player_id}:{bucket}:{limit}:{cursor or ''}")
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    if bucket == "match":
+        after = _decode_cursor(cursor, 2) if cursor else None
+        rows = await _history_page(supabase, player_id, limit + 1, after)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return json_with_etag(
+            {"player_id": player_id, "bucket": bucket, "points": rows, "next_cursor": next_cursor}, etag
+        )
+
+    start = _decode_cursor(cursor, 1)[0] if cursor else None
+    points = await _series_rpc(supabase, player_id, bucket, start, limit + 1)
+    if points is None:
+        points = await _series_fallback(supabase, player_id, bucket, start, limit + 1)
+    next_cursor = None
+    if len(points) > limit:
+        points = points[:limit]
+        last = _parse_ts(points[-1]["bucket"])
+        next_cursor = _encode_cursor(_next_bucket(last, bucket).isoformat())
+    return json_with_etag(
+        {"player_id": player_id, "bucket": bucket, "points": points, "next_cursor": next_cursor}, etag
+    )
 
 
 @router.patch("/{player_id}")
@@ -93,5 +264,7 @@ def update_player_name(
         .execute()
     )
     if r.data and len(r.data) > 0:
+        notify_players_updated([player_id])
+        versions.bump(PLAYERS)
         return r.data[0]
     raise HTTPException(status_code=404, detail="Player not found")
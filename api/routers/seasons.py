@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 
-from api.dependencies import get_supabase, optional_api_key
+from api.dependencies import get_async_supabase, optional_api_key
+from api.etag import SEASONS, is_not_modified, json_with_etag, not_modified, versions
 
 router = APIRouter(
     prefix="/seasons",
@@ -10,9 +11,12 @@ router = APIRouter(
 
 
 @router.get("/current")
-def get_current_season(supabase=Depends(get_supabase)):
-    """Active season (single)."""
-    r = (
+async def get_current_season(request: Request, supabase=Depends(get_async_supabase)):
+    """Active season (single). Supports If-None-Match (304)."""
+    etag = versions.etag(SEASONS)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    r = await (
         supabase.table("seasons")
         .select("*")
         .eq("status", "active")
@@ -22,17 +26,17 @@ def get_current_season(supabase=Depends(get_supabase)):
         .execute()
     )
     if r.data and len(r.data) > 0:
-        return r.data[0]
-    return None
+        return json_with_etag(r.data[0], etag)
+    return json_with_etag(None, etag)
 
 
 @router.get("/{season_id}/divisions")
-def get_divisions_by_season(
+async def get_divisions_by_season(
     season_id: str,
-    supabase=Depends(get_supabase),
+    supabase=Depends(get_async_supabase),
 ):
     """All divisions of a season, ordered by number."""
-    r = (
+    r = await (
         supabase.table("divisions")
         .select("id, number, season_id")
         .eq("season_id", season_id)
@@ -0,0 +1,243 @@
+"""
+Push-канал таблицы и матрицы дивизиона (Server-Sent Events) вместо опроса клиентами.
+
+DivisionHub держит подписчиков по дивизионам. Снимок дивизиона (standings + компактная
+матрица) считается один раз на изменение и рассылается всем подписчикам уже
+сериализованным SSE-событием:
+- snapshot — полный снимок (при подписке, при смене состава игроков, после переполнения очереди);
+- diff — только изменившиеся строки standings, новый порядок и изменившиеся ячейки матрицы.
+Пересчёт запускают роуты API, меняющие матчи (notify, через invalidate_division), и
+периодический обход раз в REALTIME_REFRESH секунд (записи бота и SQL в обход API).
+Несколько уведомлений подряд по одному дивизиону сливаются в один пересчёт.
+"""
+import asyncio
+import json
+import logging
+import os
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+SnapshotFn = Callable[[str], dict]
+
+
+def _row_key(row: dict) -> Any:
+    return row.get("id") or (row.get("player") or {}).get("id")
+
+
+def diff_snapshots(old: dict, new: dict) -> Optional[dict]:
+    """
+    Разница двух снимков: {"standings": [...], "order": [...], "cells": [[i, j, cell], ...]}.
+    Пустой dict — ничего не изменилось; None — нужен полный снимок (поменялся состав игроков).
+    """
+    old_matrix, new_matrix = old["matrix"], new["matrix"]
+    if (old_matrix["player_ids"], old_matrix["player_names"]) != (new_matrix["player_ids"], new_matrix["player_names"]):
+        return None
+    diff: dict[str, Any] = {}
+    old_rows = {_row_key(r): r for r in old["standings"]}
+    changed = [r for r in new["standings"] if old_rows.get(_row_key(r)) != r]
+    if changed:
+        diff["standings"] = changed
+    order = [_row_key(r) for r in new["standings"]]
+    if order != [_row_key(r) for r in old["standings"]]:
+        diff["order"] = order
+    cells = [
+        [i, j, cell]
+        for i, (old_row, new_row) in enumerate(zip(old_matrix["matrix"], new_matrix["matrix"]))
+        for j, cell in enumerate(new_row)
+        if old_row[j] != cell
+    ]
+    if cells:
+        diff["cells"] = cells
+    return diff
+
+
+def format_event(event: str, version: int, data: Any) -> str:
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {version}\nevent: {event}\ndata: {body}\n\n"
+
+
+class DivisionHub:
+    def __init__(self, queue_size: int = 16, refresh_interval: float = 15.0, heartbeat: float = 15.0):
+        self.queue_size = queue_size
+        self.refresh_interval = refresh_interval
+        self.heartbeat = heartbeat
+        self.computations = 0
+        self.published = 0
+        self.resyncs = 0
+        self._snapshot_fn: Optional[SnapshotFn] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        # division_id → (версия, снимок, готовое SSE-событие snapshot)
+        self._state: dict[str, tuple[int, dict, str]] = {}
+        self._dirty: set[str] = set()
+        # Блокировка пересчёта дивизиона живёт, пока её держит или ждёт _refresh:
+        # ids прошлых сезонов в хабе не накапливаются
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+
+    async def start(self, snapshot_fn: SnapshotFn) -> None:
+        """snapshot_fn(division_id) — синхронная функция (запросы к Supabase), выполняется в пуле потоков."""
+        if self.started:
+            return
+        self._snapshot_fn = snapshot_fn
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self.started:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        for queues in self._subscribers.values():
+            for queue in queues:
+                # Завершить открытые потоки; у медленного клиента очередь может быть полна
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+        self._task = self._loop = self._wakeup = None
+        self._subscribers.clear()
+        self._state.clear()
+        self._dirty.clear()
+        self._locks.clear()
+
+    def notify(self, division_id: Any) -> None:
+        """Матчи дивизиона изменились. Можно вызывать из потока синхронного роута."""
+        loop = self._loop
+        if loop is None or loop.is_closed() or division_id is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._mark_dirty(str(division_id))
+        else:
+            loop.call_soon_threadsafe(self._mark_dirty, str(division_id))
+
+    def _mark_dirty(self, division_id: str) -> None:
+        if division_id in self._subscribers and self._wakeup is not None:
+            self._dirty.add(division_id)
+            self._wakeup.set()
+
+    async def subscribe(self, division_id: str) -> asyncio.Queue:
+        """Новый подписчик: очередь SSE-событий, первым в ней — текущий полный снимок."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(division_id, set()).add(queue)
+        try:
+            if division_id not in self._state:
+                await self._refresh(division_id, initial=True)
+            queue.put_nowait(self._state[division_id][2])
+        except BaseException:
+            self.unsubscribe(division_id, queue)
+            raise
+        return queue
+
+    def unsubscribe(self, division_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(division_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            # Никто не слушает — снимок не поддерживаем
+            del self._subscribers[division_id]
+            self._state.pop(division_id, None)
+            self._dirty.discard(division_id)
+
+    def subscriber_count(self, division_id: Optional[str] = None) -> int:
+        if division_id is not None:
+            return len(self._subscribers.get(division_id, ()))
+        return sum(len(q) for q in self._subscribers.values())
+
+    async def _refresh(self, division_id: str, initial: bool = False) -> None:
+        lock = self._locks.setdefault(division_id, asyncio.Lock())
+        async with lock:
+            if initial and division_id in self._state:
+                return  # снимок уже посчитал одновременно подписавшийся клиент
+            snapshot = await asyncio.to_thread(self._snapshot_fn, division_id)
+            self.computations += 1
+            if division_id not in self._subscribers:
+                return
+            previous = self._state.get(division_id)
+            version = previous[0] + 1 if previous else 1
+            full_event = format_event("snapshot", version, snapshot)
+            if previous is None:
+                self._state[division_id] = (version, snapshot, full_event)
+                return
+            diff = diff_snapshots(previous[1], snapshot)
+            if diff == {}:
+                return
+            self._state[division_id] = (version, snapshot, full_event)
+            event = full_event if diff is None else format_event("diff", version, diff)
+            self._publish(division_id, event, full_event)
+
+    def _publish(self, division_id: str, event: str, full_event: str) -> None:
+        for queue in list(self._subscribers.get(division_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Медленный клиент: выбросить накопленные diff и прислать полный снимок
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(full_event)
+                self.resyncs += 1
+            self.published += 1
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.refresh_interval)
+                divisions = set(self._dirty)
+            except asyncio.TimeoutError:
+                divisions = set(self._subscribers)
+            self._wakeup.clear()
+            self._dirty.difference_update(divisions)
+            for division_id in divisions:
+                try:
+                    await self._refresh(division_id)
+                except Exception as e:
+                    logger.warning("Division %s snapshot failed: %s", division_id, e)
+
+    async def events(
+        self,
+        division_id: str,
+        is_disconnected: Callable[[], Awaitable[bool]],
+    ) -> AsyncIterator[str]:
+        """Поток SSE для одного клиента: снимок, затем diff; комментарий-пинг каждые heartbeat секунд."""
+        queue = await self.subscribe(division_id)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            self.unsubscribe(division_id, queue)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "divisions": len(self._subscribers),
+            "subscribers": self.subscriber_count(),
+            "computations": self.computations,
+            "published": self.published,
+            "resyncs": self.resyncs,
+        }
+
+
+division_hub = DivisionHub(
+    queue_size=int(os.getenv("REALTIME_QUEUE_SIZE") or 16),
+    refresh_interval=float(os.getenv("REALTIME_REFRESH") or 15),
+)
@@ -6,6 +6,8 @@ import hmac
 import hashlib
 import json
 import logging
+import time
+from functools import lru_cache
 from typing import Any, Optional
 from urllib.parse import parse_qsl
 
@@ -15,10 +17,20 @@ logger = logging.getLogger(__name__)
 AUTH_DATE_MAX_AGE_SECONDS = 24 * 3600  # 24 hours
 
 
+@lru_cache(maxsize=4)
+def webapp_secret_key(bot_token: str) -> bytes:
+    """secret_key = HMAC_SHA256("WebAppData", bot_token), computed once per bot token."""
+    return hmac.new(
+        b"WebAppData",
+        bot_token.encode("utf-8"),
+        hashlib.sha256,
+    ).digest()
+
+
 def validate_init_data(init_data: str, bot_token: str) -> Optional[dict[str, Any]]:
     """
     Validate initData from Telegram.WebApp.initData and return parsed user data.
-    Returns dict with at least telegram_id (from user.id), or None if invalid.
+    Returns dict with at least telegram_id (from user.id) and auth_date (int or None), or None if invalid.
     """
     if not init_data or not bot_token:
         return None
@@ -45,14 +57,8 @@ def validate_init_data(init_data: str, bot_token: str) -> Optional[dict[str, Any
         data_check_parts.append(f"{key}={params[key]}")
     data_check_string = "\n".join(data_check_parts)
 
-    # secret_key = HMAC_SHA256("WebAppData", bot_token)
-    secret_key = hmac.new(
-        b"WebAppData",
-        bot_token.encode("utf-8"),
-        hashlib.sha256,
-    ).digest()
     computed_hash = hmac.new(
-        secret_key,
+        webapp_secret_key(bot_token),
         data_check_string.encode("utf-8"),
         hashlib.sha256,
     ).hexdigest()
@@ -62,11 +68,11 @@ def validate_init_data(init_data: str, bot_token: str) -> Optional[dict[str, Any
         return None
 
     # auth_date: reject too old (replay)
+    auth_date = None
     auth_date_str = params.get("auth_date")
     if auth_date_str:
         try:
             auth_date = int(auth_date_str)
-            import time
             if auth_date < (int(time.time()) - AUTH_DATE_MAX_AGE_SECONDS):
                 logger.warning("initData auth_date too old")
                 return None
@@ -94,4 +100,5 @@ def validate_init_data(init_data: str, bot_token: str) -> Optional[dict[str, Any
     return {
         "telegram_id": telegram_id,
         "user": user,
+        "auth_date": auth_date,
     }
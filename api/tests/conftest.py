@@ -2,6 +2,7 @@
 Shared fixtures and mock helpers for API tests.
 Single _get_mock_supabase reference so dependency_overrides in tests use the same key as the app.
 """
+from contextlib import ExitStack, contextmanager
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -27,8 +28,64 @@ def _get_mock_supabase():
     return _make_mock_supabase()
 
 
+class AsyncSupabase:
+    """Async view of a sync mock client for `async def` routes (get_async_supabase):
+    the same call chains, execute() is awaitable. Tests configure and assert on the sync mock."""
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name == "execute":
+            def execute(*args, **kwargs):
+                result = attr(*args, **kwargs)  # вызов сразу: порядок side_effect как в синхронном коде
+
+                async def resolved():
+                    return result
+                return resolved()
+            return execute
+        if callable(attr):
+            return lambda *args, **kwargs: AsyncSupabase(attr(*args, **kwargs))
+        return attr
+
+
+async def _get_async_mock_supabase():
+    return AsyncSupabase(_make_mock_supabase())
+
+
+@contextmanager
+def patch_supabase(mock_sb):
+    """Patch both Supabase dependencies (sync and async) with one mock before importing api.main."""
+
+    async def get_async_supabase():
+        return AsyncSupabase(mock_sb)
+
+    with ExitStack() as stack:
+        stack.enter_context(patch("api.dependencies.get_supabase", lambda: mock_sb))
+        stack.enter_context(patch("api.dependencies.get_async_supabase", get_async_supabase))
+        yield
+
+
+@pytest.fixture(autouse=True)
+def _reset_rate_limits():
+    """Tests re-import api.main; each import registers route limits on the shared limiter again,
+    so one request would count several times. Keep the latest registration, start from zero.
+    Verified tokens and initData are process-wide too: every test starts with empty caches."""
+    from api.limiter import limiter
+    from api.token_cache import init_data_cache, token_cache
+
+    for limits in limiter._route_limits.values():
+        del limits[:-1]
+    limiter.reset()
+    token_cache.clear()
+    init_data_cache.clear()
+    yield
+
+
 @pytest.fixture
 def client():
-    with patch("api.dependencies.get_supabase", _get_mock_supabase):
+    with patch("api.dependencies.get_supabase", _get_mock_supabase), \
+            patch("api.dependencies.get_async_supabase", _get_async_mock_supabase):
         from api.main import app
         yield TestClient(app)
@@ -0,0 +1,118 @@
+"""
+Async read routes (get_async_supabase): independent PostgREST queries of one request run
+concurrently, related players are embedded. Load comparison with the previous sync routes:
+scripts/bench_api_async.py.
+"""
+import asyncio
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from api.tests.conftest import _make_mock_supabase, patch_supabase
+
+LATENCY = 0.05
+DIVISION = "00000000-0000-0000-0000-0000000000d1"
+PLAYER_A = "00000000-0000-0000-0000-000000000001"
+PLAYER_B = "00000000-0000-0000-0000-000000000002"
+
+
+class SlowQuery:
+    """Цепочка построителя запроса; execute() отвечает через LATENCY и считает запросы в полёте."""
+
+    def __init__(self, db, table):
+        self._db, self._table = db, table
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    async def _run(self):
+        self._db.in_flight += 1
+        self._db.max_in_flight = max(self._db.max_in_flight, self._db.in_flight)
+        await asyncio.sleep(LATENCY)
+        self._db.in_flight -= 1
+        return MagicMock(data=self._db.data.get(self._table, []))
+
+    def execute(self):
+        return self._run()
+
+
+class SlowAsyncSupabase:
+    def __init__(self, data: dict):
+        self.data = data
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def table(self, name):
+        return SlowQuery(self, name)
+
+
+def _client(async_sb):
+    for key in list(sys.modules.keys()):
+        if key in ("api.main", "api.etag", "api.response_cache", "api.routers") or key.startswith("api.routers."):
+            del sys.modules[key]
+
+    async def get_async_supabase():
+        return async_sb
+
+    with patch("api.dependencies.get_supabase", _make_mock_supabase), \
+            patch("api.dependencies.get_async_supabase", get_async_supabase):
+        from api.main import app
+    return TestClient(app)
+
+
+def _timed_get(tc, path, **kwargs):
+    tc.get("/health")  # первый запрос TestClient поднимает event loop — не в замер
+    started = time.perf_counter()
+    r = tc.get(path, **kwargs)
+    return r, time.perf_counter() - started
+
+
+def test_match_by_id_embeds_both_players(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _make_mock_supabase()
+    mock_sb.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{
+        "id": "m1",
+        "player1_id": PLAYER_A,
+        "player2_id": PLAYER_B,
+        "player1": {"id": PLAYER_A, "name": "A", "telegram_id": 1},
+        "player2": {"id": PLAYER_B, "name": "B", "telegram_id": 2},
+    }]
+    for key in list(sys.modules.keys()):
+        if key == "api.main" or key == "api.routers" or key.startswith("api.routers."):
+            del sys.modules[key]
+    with patch_supabase(mock_sb):
+        from api.main import app
+    r = TestClient(app).get("/matches/m1", headers={"X-Player-Id": PLAYER_A})
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["player1"]["name"], body["player2"]["name"]) == ("A", "B")
+    mock_sb.table.assert_called_once_with("matches")  # один запрос: игроки встроены
+    select = mock_sb.table.return_value.select.call_args.args[0]
+    assert "player1:players!player1_id(" in select and "player2:players!player2_id(" in select
+
+
+def test_division_matrix_queries_run_concurrently(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    db = SlowAsyncSupabase({
+        "matches": [],
+        "division_players": [{"player_id": PLAYER_A, "player": {"id": PLAYER_A, "name": "A"}}],
+    })
+    tc = _client(db)
+    r, elapsed = _timed_get(tc, f"/divisions/{DIVISION}/matches")
+    assert r.status_code == 200
+    assert r.json()["players"] == [{"id": PLAYER_A, "name": "A"}]
+    assert db.max_in_flight == 2
+    assert elapsed < 2 * LATENCY  # одна задержка PostgREST, а не две подряд
+
+
+def test_game_requests_lists_are_fetched_concurrently(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    db = SlowAsyncSupabase({"game_requests": []})
+    tc = _client(db)
+    r, elapsed = _timed_get(tc, "/game-requests", headers={"X-Player-Id": PLAYER_A})
+    assert r.status_code == 200
+    assert r.json() == {"open": [], "challenges": [], "mine": []}
+    assert db.max_in_flight == 3
+    assert elapsed < 2 * LATENCY
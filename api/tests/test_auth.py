@@ -1,9 +1,18 @@
 """
 Tests for POST /auth/telegram (exchange initData for JWT).
 """
+import hashlib
+import hmac
+import json
+import sys
+import time
 from unittest.mock import patch, MagicMock
+from urllib.parse import urlencode
 
 import pytest
+from fastapi.testclient import TestClient
+
+from api.tests.conftest import patch_supabase
 
 
 @pytest.fixture
@@ -52,3 +61,72 @@ def test_auth_telegram_200_returns_token_and_player_id(client, mock_validate_ok,
     assert data.get("token_type") == "bearer"
     assert data.get("telegram_id") == 123
     assert data.get("player_id") is None  # no player in DB from mock
+
+
+def _signed_init_data(bot_token: str, telegram_id: int, auth_date: int) -> str:
+    params = {"auth_date": str(auth_date), "user": json.dumps({"id": telegram_id})}
+    data_check_string = "\n".join(f"{k}={params[k]}" for k in sorted(params))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    params["hash"] = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(params)
+
+
+@pytest.fixture
+def auth_client(env_auth):
+    """App re-imported with a players lookup that finds player-1; yields (client, lookup, auth router module)."""
+    for key in list(sys.modules.keys()):
+        if key == "api.main" or key == "api.routers" or key.startswith("api.routers."):
+            del sys.modules[key]
+    mock_supabase = MagicMock()
+    lookup = mock_supabase.table.return_value.select.return_value.eq.return_value.execute
+    lookup.return_value = MagicMock(data=[{"id": "player-1"}])
+    with patch_supabase(mock_supabase):
+        from api.main import app
+        from api.routers import auth
+        yield TestClient(app), lookup, auth
+
+
+def test_auth_telegram_repeated_init_data_skips_validation_and_lookup(auth_client):
+    client, lookup, auth = auth_client
+    init_data = _signed_init_data("test-bot-token", 123, int(time.time()))
+    with patch.object(auth, "validate_init_data", wraps=auth.validate_init_data) as validate:
+        for _ in range(3):
+            r = client.post("/auth/telegram", json={"init_data": init_data})
+            assert r.status_code == 200
+            assert r.json()["player_id"] == "player-1"
+            assert r.json()["telegram_id"] == 123
+    assert validate.call_count == 1
+    assert lookup.call_count == 1
+
+
+def test_auth_telegram_cached_init_data_expires(auth_client):
+    from api.token_cache import init_data_cache
+
+    client, lookup, _ = auth_client
+    now = [time.time()]
+    init_data = _signed_init_data("test-bot-token", 123, int(now[0]))
+    with patch.object(init_data_cache, "_clock", lambda: now[0]):
+        assert client.post("/auth/telegram", json={"init_data": init_data}).status_code == 200
+        now[0] += init_data_cache.max_ttl + 1
+        assert client.post("/auth/telegram", json={"init_data": init_data}).status_code == 200
+    assert lookup.call_count == 2
+
+
+def test_auth_telegram_tampered_init_data_rejected_after_cache(auth_client):
+    client, lookup, _ = auth_client
+    init_data = _signed_init_data("test-bot-token", 123, int(time.time()))
+    assert client.post("/auth/telegram", json={"init_data": init_data}).status_code == 200
+    tampered = init_data.replace("%22id%22%3A+123", "%22id%22%3A+999")
+    assert tampered != init_data
+    r = client.post("/auth/telegram", json={"init_data": tampered})
+    assert r.status_code == 401
+    assert lookup.call_count == 1
+
+
+def test_auth_telegram_unregistered_player_is_not_cached(auth_client):
+    client, lookup, _ = auth_client
+    lookup.return_value = MagicMock(data=[])
+    init_data = _signed_init_data("test-bot-token", 123, int(time.time()))
+    assert client.post("/auth/telegram", json={"init_data": init_data}).json()["player_id"] is None
+    lookup.return_value = MagicMock(data=[{"id": "player-1"}])
+    assert client.post("/auth/telegram", json={"init_data": init_data}).json()["player_id"] == "player-1"
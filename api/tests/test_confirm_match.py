@@ -0,0 +1,218 @@
+"""
+POST /matches/{id}/confirm: one RPC call (confirm_match_result) with fallback to the legacy path
+when migration 014 is not applied. The standings checksum of 014 runs on SQLite (plain SQL body).
+"""
+import re
+import sqlite3
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+
+from api.tests.conftest import _make_mock_supabase, patch_supabase
+
+PLAYER_A = "00000000-0000-0000-0000-000000000001"
+PLAYER_B = "00000000-0000-0000-0000-000000000002"
+MATCH_ID = "00000000-0000-0000-0000-000000000010"
+
+RPC_RESULT = {
+    "match_id": MATCH_ID,
+    "winner_id": PLAYER_A,
+    "loser_id": PLAYER_B,
+    "winner_rating_after": 103.6,
+    "loser_rating_after": 98.2,
+    "delta_winner": 3.6,
+    "delta_loser": -1.8,
+    "standings_recalculated": False,
+}
+
+
+def _pending_match_supabase():
+    mock_sb = _make_mock_supabase()
+    mock_sb.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+        {
+            "id": MATCH_ID,
+            "division_id": "div",
+            "status": "pending_confirm",
+            "player1_id": PLAYER_A,
+            "player2_id": PLAYER_B,
+            "sets_player1": 3,
+            "sets_player2": 0,
+            "submitted_by": PLAYER_A,
+        }
+    ]
+    return mock_sb
+
+
+def _app_client(mock_sb):
+    """Re-import the app so routes bind to mock_sb; return the client and the fresh matches router module."""
+    for key in list(sys.modules.keys()):
+        if key == "api.main" or key == "api.routers" or key.startswith("api.routers."):
+            del sys.modules[key]
+    with patch_supabase(mock_sb):
+        from api.main import app
+        from api.routers import matches as matches_router
+    return TestClient(app), matches_router
+
+
+def _confirm(tc):
+    return tc.post(
+        f"/matches/{MATCH_ID}/confirm",
+        json={"confirmed_by_player_id": PLAYER_B},
+        headers={"X-Player-Id": PLAYER_B},
+    )
+
+
+def test_confirm_calls_rpc_once_and_returns_new_ratings(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _pending_match_supabase()
+    mock_sb.rpc.return_value.execute.return_value = MagicMock(data=RPC_RESULT)
+    tc, _ = _app_client(mock_sb)
+    r = _confirm(tc)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["ok"] is True
+    assert data["winner_rating_after"] == 103.6
+    assert data["loser_rating_after"] == 98.2
+    mock_sb.rpc.assert_called_once_with(
+        "confirm_match_result", {"p_match_id": MATCH_ID, "p_confirmed_by": PLAYER_B}
+    )
+    mock_sb.table.return_value.update.assert_not_called()
+    mock_sb.table.return_value.insert.assert_not_called()
+
+
+def test_confirm_invalidates_only_its_division(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _pending_match_supabase()
+    mock_sb.rpc.return_value.execute.return_value = MagicMock(data=RPC_RESULT)
+    tc, _ = _app_client(mock_sb)
+    from api.etag import PLAYERS, RATINGS, division_scope, versions
+
+    monkeypatch.setattr(versions, "max_age", 0)
+    scopes = {
+        "division": (division_scope("div"), PLAYERS),
+        "other division": (division_scope("other"), PLAYERS),
+        "rating": (PLAYERS, RATINGS),
+    }
+    before = {name: versions.etag(*s) for name, s in scopes.items()}
+    assert _confirm(tc).status_code == 200
+    after = {name: versions.etag(*s) for name, s in scopes.items()}
+    assert after["division"] != before["division"]
+    assert after["rating"] != before["rating"]
+    assert after["other division"] == before["other division"]  # кэш других дивизионов не сброшен
+
+
+def test_confirm_rpc_validation_error_returns_400(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _pending_match_supabase()
+    mock_sb.rpc.return_value.execute.side_effect = APIError(
+        {"code": "P0001", "message": "Матч не найден или уже обработан."}
+    )
+    tc, matches_router = _app_client(mock_sb)
+    with patch.object(matches_router, "_apply_match_result_as_played") as legacy:
+        r = _confirm(tc)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Матч не найден или уже обработан."
+    legacy.assert_not_called()
+
+
+def test_confirm_falls_back_to_legacy_path_when_rpc_missing(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _pending_match_supabase()
+    mock_sb.rpc.return_value.execute.side_effect = APIError(
+        {"code": "PGRST202", "message": "Could not find the function public.confirm_match_result"}
+    )
+    tc, matches_router = _app_client(mock_sb)
+    with patch.object(matches_router, "_apply_match_result_as_played", return_value=RPC_RESULT) as legacy:
+        r = _confirm(tc)
+    assert r.status_code == 200
+    assert r.json()["delta_winner"] == 3.6
+    legacy.assert_called_once()
+
+
+def test_confirm_notifies_bot_about_both_players(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _pending_match_supabase()
+    mock_sb.rpc.return_value.execute.return_value = MagicMock(data=RPC_RESULT)
+    tc, matches_router = _app_client(mock_sb)
+    with patch.object(matches_router, "notify_players_updated") as notify:
+        r = _confirm(tc)
+    assert r.status_code == 200
+    notify.assert_called_once_with([PLAYER_A, PLAYER_B])
+
+
+def _legacy_confirm(coef):
+    """Legacy path over an in-memory database with the given division coef."""
+    from api.routers.matches import _apply_match_result_as_played
+    from bot.tests.fake_supabase import FakeSupabase
+
+    match = {"id": MATCH_ID, "division_id": "div", "player1_id": PLAYER_A, "player2_id": PLAYER_B,
+             "sets_player1": 3, "sets_player2": 0, "status": "pending_confirm"}
+    db = FakeSupabase({
+        "seasons": [{"id": "s1"}],
+        "divisions": [{"id": "div", "season_id": "s1", "coef": coef}],
+        "players": [{"id": PLAYER_A, "rating": 100}, {"id": PLAYER_B, "rating": 100}],
+        "matches": [match],
+        "division_players": [],
+    })
+    return _apply_match_result_as_played(db, match)
+
+
+def test_legacy_path_coef_matches_rpc():
+    # coalesce(d.coef, 0.25) in confirm_match_result: only a missing coef falls back to 0.25
+    assert _legacy_confirm(0)["delta_winner"] == 0
+    assert _legacy_confirm(None)["delta_winner"] == 3.0
+    assert _legacy_confirm(0.5)["delta_winner"] == 6.0
+
+
+MIGRATION_014 = Path(__file__).resolve().parents[2] / "database" / "migrations" / "014_confirm_match_rpc.sql"
+
+
+def _standings_consistent(matches, division_players) -> bool:
+    """division_standings_consistent из миграции 014 над таблицами в SQLite."""
+    body = re.search(
+        r"FUNCTION public\.division_standings_consistent\(.*?AS \$\$(.*?)\$\$;", MIGRATION_014.read_text(), re.S
+    ).group(1)
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE matches (division_id, player1_id, player2_id, sets_player1, sets_player2, status)")
+    db.execute("CREATE TABLE division_players (division_id, player_id, total_points, total_sets_won, total_sets_lost)")
+    db.executemany("INSERT INTO matches VALUES (:division_id, :player1_id, :player2_id, :sets_player1, :sets_player2, :status)", matches)
+    db.executemany("INSERT INTO division_players VALUES (:division_id, :player_id, :total_points, :total_sets_won, :total_sets_lost)", division_players)
+    (ok,) = db.execute(body.replace("p_division_id", ":p_division_id"), {"p_division_id": "div"}).fetchone()
+    return bool(ok)
+
+
+def test_confirm_checksum_ignores_unscored_matches():
+    from bot.services.standings import compute_totals
+
+    def match(p1, p2, s1, s2, status="played"):
+        return {"division_id": "div", "player1_id": p1, "player2_id": p2,
+                "sets_player1": s1, "sets_player2": s2, "status": status}
+
+    matches = [
+        match("a", "b", 3, 1),
+        match("b", "c", 0, 0),     # равный счёт
+        match("a", None, 3, 0),    # без соперника
+        match("c", "gone", 3, 2),  # gone выбыл из division_players
+        match("a", "c", 3, 2, status="pending_confirm"),
+    ]
+    totals = compute_totals(matches)
+    dps = {pid: {"division_id": "div", "player_id": pid, "total_points": t["points"],
+                 "total_sets_won": t["sets_won"], "total_sets_lost": t["sets_lost"]}
+           for pid, t in totals.items() if pid != "gone"}
+    assert _standings_consistent(matches, list(dps.values()))
+
+    # Подтверждение a–c 3:2: matches → played и дельта двум игрокам, как в confirm_match_result
+    matches[-1]["status"] = "played"
+    for pid, points, won, lost in (("a", 2, 3, 2), ("c", 1, 2, 3)):
+        dps[pid]["total_points"] += points
+        dps[pid]["total_sets_won"] += won
+        dps[pid]["total_sets_lost"] += lost
+    assert _standings_consistent(matches, list(dps.values()))  # без полного пересчёта
+    played = sum(m["status"] == "played" for m in matches)
+    assert sum(dp["total_points"] for dp in dps.values()) != 3 * played  # прежняя проверка ушла бы в пересчёт
+
+    dps["a"]["total_points"] -= 2  # потерянный матч
+    assert not _standings_consistent(matches, list(dps.values()))
@@ -0,0 +1,96 @@
+"""
+Admin consistency reports: one division (JSON, unchanged shape) and a whole season
+(JSON or a JSON Lines stream, one division per line) over a constant number of queries.
+"""
+import json
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.tests.conftest import patch_supabase
+from bot.tests.fake_supabase import FakeSupabase
+
+HEADERS = {"X-Player-Id": "admin"}
+
+
+def _db() -> FakeSupabase:
+    matches = [
+        {"id": "m1", "division_id": "d1", "player1_id": "a", "player2_id": "b",
+         "sets_player1": 3, "sets_player2": 1, "status": "played"},
+        {"id": "m2", "division_id": "d2", "player1_id": "c", "player2_id": "d",
+         "sets_player1": 2, "sets_player2": 3, "status": "played"},
+        {"id": "m3", "division_id": "d2", "player1_id": "c", "player2_id": "e",
+         "sets_player1": 0, "sets_player2": 0, "status": "pending"},
+    ]
+    return FakeSupabase({
+        "seasons": [{"id": "s1"}],
+        "divisions": [{"id": "d2", "season_id": "s1", "number": 2}, {"id": "d1", "season_id": "s1", "number": 1}],
+        "players": [{"id": p} for p in "abcde"] + [{"id": "admin", "is_admin": True}],
+        "matches": matches,
+        "rating_history": [
+            {"id": "h1", "match_id": "m1", "player_id": "a"},
+            {"id": "h2", "match_id": "m1", "player_id": "b"},
+            {"id": "h3", "match_id": "m2", "player_id": "d"},  # вторая запись m2 потеряна
+        ],
+        "division_players": [
+            {"id": "dp-a", "division_id": "d1", "player_id": "a", "total_points": 2, "total_sets_won": 3, "total_sets_lost": 1},
+            {"id": "dp-b", "division_id": "d1", "player_id": "b", "total_points": 1, "total_sets_won": 1, "total_sets_lost": 3},
+            {"id": "dp-c", "division_id": "d2", "player_id": "c", "total_points": 0, "total_sets_won": 0, "total_sets_lost": 0},
+            {"id": "dp-d", "division_id": "d2", "player_id": "d", "total_points": 2, "total_sets_won": 3, "total_sets_lost": 2},
+        ],
+    })
+
+
+@pytest.fixture
+def report_client(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    db = _db()
+    for key in list(sys.modules.keys()):
+        if key in ("api.main", "api.routers") or key.startswith("api.routers."):
+            del sys.modules[key]
+    with patch_supabase(db):
+        from api.main import app
+        yield TestClient(app), db
+    for key in list(sys.modules.keys()):
+        if key in ("api.main", "api.routers") or key.startswith("api.routers."):
+            del sys.modules[key]
+
+
+def test_division_report_keeps_its_shape(report_client):
+    tc, db = report_client
+    body = tc.get("/matches/admin/divisions/d2/consistency-report", headers=HEADERS).json()
+    assert body == {
+        "division_id": "d2",
+        "missing_rating_history": [{"match_id": "m2", "history_rows": 1}],
+        "totals_mismatches": [{
+            "player_id": "c", "division_player_id": "dp-c",
+            "stored": {"points": 0, "sets_won": 0, "sets_lost": 0},
+            "calculated": {"points": 1, "sets_won": 2, "sets_lost": 3},
+        }],
+    }
+    assert db.round_trips == 3
+    assert tc.get("/matches/admin/divisions/d2/consistency-report").status_code == 403
+
+
+def test_season_report_json_and_jsonl(report_client):
+    tc, db = report_client
+    body = tc.get("/matches/admin/seasons/s1/consistency-report", headers=HEADERS).json()
+    assert body["season_id"] == "s1"
+    assert [d["division_id"] for d in body["divisions"]] == ["d1", "d2"]
+    assert body["divisions"][0]["missing_rating_history"] == body["divisions"][0]["totals_mismatches"] == []
+    assert db.round_trips == 5  # проверка админа, divisions и три выборки на весь сезон
+
+    r = tc.get("/matches/admin/seasons/s1/consistency-report?format=jsonl", headers=HEADERS)
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert lines == body["divisions"]
+
+
+def test_season_report_is_admin_only(report_client):
+    tc, db = report_client
+    url = "/matches/admin/seasons/s1/consistency-report"
+    assert tc.get(url).status_code == 403
+    r = tc.get(url, headers={"X-Player-Id": "a"})
+    assert r.status_code == 403 and r.json()["detail"] == "Access denied: admin only"
+    assert tc.get(url, params={"format": "jsonl"}, headers={"X-Player-Id": "nobody"}).status_code == 403
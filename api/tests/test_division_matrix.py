@@ -0,0 +1,147 @@
+"""
+GET /divisions/{id}/matches?format=compact: same information as the full format, each match once.
+Includes a payload size and build+serialize+parse latency comparison of both formats.
+"""
+import itertools
+import json
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from api.routers.divisions import MATCH_STATUSES, _compact_matrix_payload, _full_matrix_payload
+from api.tests.conftest import _make_mock_supabase, patch_supabase
+
+N_PLAYERS = 12
+DIVISION = "00000000-0000-0000-0000-0000000000d1"
+
+
+def _division(n: int = N_PLAYERS):
+    players = [{"id": f"00000000-0000-0000-0000-{i:012d}", "name": f"Игрок {i}"} for i in range(n)]
+    matches = []
+    for k, (a, b) in enumerate(itertools.combinations(range(n), 2)):
+        status = MATCH_STATUSES[k % len(MATCH_STATUSES)]
+        matches.append({
+            "id": f"00000000-0000-0000-0000-{1000 + k:012d}",
+            "player1_id": players[b if k % 2 else a]["id"],
+            "player2_id": players[a if k % 2 else b]["id"],
+            "sets_player1": 3 if status == "played" else 0,
+            "sets_player2": k % 3 if status == "played" else 0,
+            "status": status,
+            "submitted_by": players[a]["id"] if status == "pending_confirm" else None,
+        })
+    return players, matches
+
+
+def _decode(compact: dict) -> dict:
+    """Compact → the full format's matrix dict (what the Mini App reads)."""
+    ids = compact["player_ids"]
+    matrix = {}
+    for i, row in enumerate(compact["matrix"]):
+        for j, cell in enumerate(row):
+            if cell is None:
+                continue
+            status_idx, s_row, s_col, submitter, match_id = cell
+            status = compact["statuses"][status_idx]
+            value = {
+                "score": f"{s_row}-{s_col}" if status == "played" else None,
+                "status": status,
+                "matchId": match_id,
+                "submitted_by": {0: None, 1: ids[i], 2: ids[j]}[submitter],
+            }
+            matrix[f"{ids[i]}-{ids[j]}"] = value
+            flipped = dict(value, score=f"{s_col}-{s_row}" if status == "played" else None)
+            matrix[f"{ids[j]}-{ids[i]}"] = flipped
+    return matrix
+
+
+def test_compact_format_carries_the_same_matches():
+    players, matches = _division()
+    full = _full_matrix_payload(players, matches)
+    compact = _compact_matrix_payload(players, matches)
+
+    assert compact["player_ids"] == [p["id"] for p in players]
+    cells = [c for row in compact["matrix"] for c in row if c is not None]
+    assert len(cells) == len(matches)  # каждый матч ровно один раз
+    decoded = _decode(compact)
+    assert decoded.keys() == full["matrix"].keys()
+    for key, cell in full["matrix"].items():
+        got = decoded[key]
+        assert (got["status"], got["matchId"], got["submitted_by"]) == (
+            cell["status"], cell["matchId"], cell["submitted_by"]
+        )
+        # score в полном формате — с точки зрения player1 матча; ключ "p1-p2" совпадает с ним
+        if key == f"{cell['player1_id']}-{cell['player2_id']}":
+            assert got["score"] == cell["score"]
+
+
+def test_unknown_match_player_is_appended_to_index():
+    players, matches = _division(3)
+    matches.append({
+        "id": "extra", "player1_id": players[0]["id"], "player2_id": "left-the-league",
+        "sets_player1": 3, "sets_player2": 0, "status": "played", "submitted_by": None,
+    })
+    compact = _compact_matrix_payload(players, matches)
+    assert compact["player_ids"][-1] == "left-the-league"
+    assert compact["player_names"][-1] is None
+    assert compact["matrix"][0][3] == [MATCH_STATUSES.index("played"), 3, 0, 0, "extra"]
+
+
+def _best_of(fn, repeats=5, loops=50) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best
+
+
+def test_compact_format_is_smaller_and_faster_to_parse():
+    players, matches = _division()
+    full_body = json.dumps(_full_matrix_payload(players, matches), separators=(",", ":"))
+    compact_body = json.dumps(_compact_matrix_payload(players, matches), separators=(",", ":"))
+
+    full_build = _best_of(lambda: json.dumps(_full_matrix_payload(players, matches)))
+    compact_build = _best_of(lambda: json.dumps(_compact_matrix_payload(players, matches)))
+    full_parse = _best_of(lambda: json.loads(full_body))
+    compact_parse = _best_of(lambda: json.loads(compact_body))
+    assert len(compact_body) * 3 < len(full_body)
+    assert compact_parse < full_parse
+    assert compact_build < full_build
+
+
+def _client(mock_sb):
+    for key in list(sys.modules.keys()):
+        if key in ("api.main", "api.etag", "api.response_cache", "api.routers") or key.startswith("api.routers."):
+            del sys.modules[key]
+    with patch_supabase(mock_sb):
+        from api.main import app
+    return TestClient(app)
+
+
+def test_endpoint_serves_both_formats_with_distinct_etags(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    players, matches = _division(4)
+    mock_sb = _make_mock_supabase()
+    results = {
+        "matches": matches,
+        "division_players": [{"player_id": p["id"], "player": p} for p in players],
+    }
+
+    def table(name):
+        query = _make_mock_supabase().table.return_value
+        query.select.return_value.eq.return_value.execute.return_value.data = results[name]
+        return query
+
+    mock_sb.table.side_effect = table
+    tc = _client(mock_sb)
+
+    full = tc.get(f"/divisions/{DIVISION}/matches")
+    compact = tc.get(f"/divisions/{DIVISION}/matches?format=compact")
+    assert full.status_code == compact.status_code == 200
+    assert "matrix" in full.json() and isinstance(full.json()["matrix"], dict)
+    assert compact.json()["format"] == "compact"
+    assert _decode(compact.json()).keys() == full.json()["matrix"].keys()
+    assert full.headers["ETag"] != compact.headers["ETag"]
+    assert tc.get(f"/divisions/{DIVISION}/matches?format=xml").status_code == 422
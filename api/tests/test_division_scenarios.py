@@ -0,0 +1,122 @@
+"""
+GET /divisions/{id}/scenarios: what-if rating deltas for the remaining pairs × six valid scores,
+one batch calculation per division version (cached until the division or players change).
+"""
+import itertools
+import sys
+
+from fastapi.testclient import TestClient
+
+from api.routers.divisions import SCENARIO_SCORES, _match_scenario, _scenarios_payload
+from api.tests.conftest import _make_mock_supabase, patch_supabase
+from bot.services.rating_calculator import calculate_match_rating
+
+DIVISION = "00000000-0000-0000-0000-0000000000d1"
+
+
+def _division(n: int = 5):
+    standings = [
+        {
+            "player_id": f"p{i}",
+            "position": i + 1,
+            "player": {"id": f"p{i}", "rating": [100, 87.35, 123.4, None, 55.55, 140.1][i % 6]},
+        }
+        for i in range(n)
+    ]
+    matches = [
+        {"id": "m-played", "player1_id": "p1", "player2_id": "p0", "status": "played"},
+        {"id": "m-skipped", "player1_id": "p0", "player2_id": "p2", "status": "not_played"},
+        {"id": "m-pending", "player1_id": "p3", "player2_id": "p1", "status": "pending"},
+    ]
+    return standings, matches
+
+
+def test_payload_matches_single_match_calculator():
+    standings, matches = _division()
+    payload = _scenarios_payload(DIVISION, 0.75, standings, matches)
+    ratings = payload["ratings"]
+    assert ratings["p3"] == 100.0  # рейтинг не задан — как в Mini App
+    assert payload["scores"] == [list(s) for s in SCENARIO_SCORES]
+
+    pairs = {(p["player1_id"], p["player2_id"]): p for p in payload["pairs"]}
+    expected = set(itertools.combinations([f"p{i}" for i in range(5)], 2)) - {("p0", "p1"), ("p0", "p2")}
+    assert set(pairs) == expected
+    assert pairs[("p1", "p3")]["match_id"] == "m-pending"
+    assert pairs[("p0", "p3")]["match_id"] is None
+
+    for (a, b), pair in pairs.items():
+        pos_a, pos_b = int(a[1:]) + 1, int(b[1:]) + 1
+        for (s_a, s_b), (d_a, d_b), scenario in zip(SCENARIO_SCORES, pair["deltas"], pair["scenarios"]):
+            if s_a > s_b:
+                assert (d_a, d_b) == calculate_match_rating(ratings[a], ratings[b], s_a, s_b, 0.75)
+                assert scenario == _match_scenario(s_a, s_b, pos_a, pos_b)
+            else:
+                assert (d_b, d_a) == calculate_match_rating(ratings[b], ratings[a], s_b, s_a, 0.75)
+                assert scenario == _match_scenario(s_b, s_a, pos_b, pos_a)
+
+
+def test_match_scenario_follows_positions():
+    assert _match_scenario(3, 0, 5, 1) == "UPSET_DOMINANT"
+    assert _match_scenario(3, 2, 5, 1) == "UPSET_CLOSE"
+    assert _match_scenario(3, 1, 5, 1) == "UPSET"
+    assert _match_scenario(3, 2, 1, 5) == "CLOSE_BATTLE"
+    assert _match_scenario(3, 0, 1, 5) == "EXPECTED_DOMINANT"
+    assert _match_scenario(3, 1, 1, 5) == "EXPECTED"
+    assert _match_scenario(3, 0, 0, 5) == "EQUAL"
+
+
+def _client(mock_sb):
+    for key in list(sys.modules.keys()):
+        if key in ("api.main", "api.etag", "api.response_cache", "api.routers") or key.startswith("api.routers."):
+            del sys.modules[key]
+    with patch_supabase(mock_sb):
+        from api.main import app
+    return TestClient(app)
+
+
+def test_endpoint_computes_once_per_division_version(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    standings, matches = _division(4)
+    results = {
+        "divisions": [{"id": DIVISION, "coef": 0.5}],
+        "division_players": standings,
+        "matches": matches,
+    }
+    calls = []
+    mock_sb = _make_mock_supabase()
+
+    def table(name):
+        calls.append(name)
+        query = _make_mock_supabase().table.return_value
+        query.select.return_value.eq.return_value.execute.return_value.data = results[name]
+        return query
+
+    mock_sb.table.side_effect = table
+    tc = _client(mock_sb)
+
+    first = tc.get(f"/divisions/{DIVISION}/scenarios")
+    assert first.status_code == 200
+    assert first.json()["coef"] == 0.5
+    assert len(first.json()["pairs"]) == 4  # 6 пар минус сыгранная p0-p1 и несостоявшаяся p0-p2
+    assert sorted(calls) == ["division_players", "divisions", "matches"]
+
+    again = tc.get(f"/divisions/{DIVISION}/scenarios")
+    assert again.json() == first.json()
+    assert len(calls) == 3  # из кэша ответов, без Supabase
+    etag = first.headers["ETag"]
+    assert tc.get(f"/divisions/{DIVISION}/scenarios", headers={"If-None-Match": etag}).status_code == 304
+
+    from api.response_cache import invalidate_division
+
+    results["matches"] = matches + [{"id": "m-new", "player1_id": "p2", "player2_id": "p3", "status": "played"}]
+    invalidate_division(DIVISION)
+    fresh = tc.get(f"/divisions/{DIVISION}/scenarios", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert len(fresh.json()["pairs"]) == 3
+    assert len(calls) == 6
+
+
+def test_unknown_division_is_404(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    tc = _client(_make_mock_supabase())
+    assert tc.get(f"/divisions/{DIVISION}/scenarios").status_code == 404
@@ -0,0 +1,103 @@
+"""
+Conditional GET (api.etag): ETag on polled endpoints, 304 without a Supabase query,
+new ETag after writes through the API and after the ETAG_MAX_AGE window.
+"""
+import sys
+from unittest.mock import MagicMock
+
+from fastapi.testclient import TestClient
+
+from api.etag import PLAYERS, ResponseVersions, division_scope
+from api.tests.conftest import _make_mock_supabase, patch_supabase
+
+DIVISION = "00000000-0000-0000-0000-0000000000d1"
+PLAYER = "00000000-0000-0000-0000-000000000001"
+
+
+def _client(mock_sb):
+    for key in list(sys.modules.keys()):
+        if key in ("api.main", "api.etag", "api.routers") or key.startswith("api.routers."):
+            del sys.modules[key]
+    with patch_supabase(mock_sb):
+        from api.main import app
+        from api.etag import versions
+    return TestClient(app), versions
+
+
+def _supabase():
+    """Empty results for the query chains of the polled endpoints."""
+    mock_sb = _make_mock_supabase()
+    select = mock_sb.table.return_value.select.return_value
+    select.eq.return_value.order.return_value.execute.return_value.data = []
+    select.eq.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value.data = []
+    return mock_sb
+
+
+def _poll(tc, path, etag=None):
+    return tc.get(path, headers={"If-None-Match": etag} if etag else {})
+
+
+def test_standings_answer_304_without_query(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _supabase()
+    tc, _ = _client(mock_sb)
+    path = f"/divisions/{DIVISION}/standings"
+
+    first = _poll(tc, path)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    mock_sb.table.reset_mock()
+    second = _poll(tc, path, etag)
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+    mock_sb.table.assert_not_called()
+
+
+def test_each_polled_endpoint_supports_if_none_match(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    tc, _ = _client(_supabase())
+    for path in ("/players/rating", f"/divisions/{DIVISION}/matches", "/seasons/current"):
+        etag = _poll(tc, path).headers["ETag"]
+        assert _poll(tc, path, etag).status_code == 304, path
+        assert _poll(tc, path, 'W/"stale"').status_code == 200, path
+
+
+def test_write_through_api_changes_etag(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _supabase()
+    tc, versions = _client(mock_sb)
+    standings = f"/divisions/{DIVISION}/standings"
+    other = "/divisions/00000000-0000-0000-0000-0000000000d2/standings"
+    etag, other_etag = _poll(tc, standings).headers["ETag"], _poll(tc, other).headers["ETag"]
+
+    versions.bump(division_scope(DIVISION))
+    assert _poll(tc, standings, etag).status_code == 200
+    assert _poll(tc, other, other_etag).status_code == 304
+
+    rating_etag = _poll(tc, "/players/rating").headers["ETag"]
+    mock_sb.table.return_value.update.return_value.eq.return_value.select.return_value.execute.return_value = (
+        MagicMock(data=[{"id": PLAYER, "name": "Новое имя"}])
+    )
+    r = tc.patch(f"/players/{PLAYER}", json={"name": "Новое имя"}, headers={"X-Player-Id": PLAYER})
+    assert r.status_code == 200
+    assert _poll(tc, "/players/rating", rating_etag).status_code == 200
+
+
+def test_etag_window_bounds_staleness():
+    now = [0.0]
+    versions = ResponseVersions(max_age=30, clock=lambda: now[0])
+    etag = versions.etag(PLAYERS)
+    now[0] = 29.0
+    assert versions.etag(PLAYERS) == etag
+    now[0] = 31.0
+    assert versions.etag(PLAYERS) != etag
+
+    no_window = ResponseVersions(max_age=0, clock=lambda: now[0])
+    etag = no_window.etag(PLAYERS)
+    now[0] = 1e6
+    assert no_window.etag(PLAYERS) == etag
+    no_window.bump(PLAYERS)
+    assert no_window.etag(PLAYERS) != etag
@@ -4,13 +4,13 @@ Endpoints that act on player_id or match_id must verify X-Player-Id matches the
 """
 import sys
 from typing import Optional
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 
 import pytest
 from fastapi.testclient import TestClient
 
 # client, _make_mock_supabase, _get_mock_supabase from conftest (shared ref for dependency_overrides)
-from api.tests.conftest import _make_mock_supabase
+from api.tests.conftest import _make_mock_supabase, patch_supabase
 
 PLAYER_A = "00000000-0000-0000-0000-000000000001"
 PLAYER_B = "00000000-0000-0000-0000-000000000002"
@@ -115,7 +115,7 @@ def test_notify_pending_caller_not_participant_returns_403(client, monkeypatch):
     for key in list(sys.modules.keys()):
         if key == "api.main" or key == "api.routers" or key.startswith("api.routers."):
             del sys.modules[key]
-    with patch("api.dependencies.get_supabase", lambda: mock_sb):
+    with patch_supabase(mock_sb):
         from api.main import app
         tc = TestClient(app)
         r = tc.post(
@@ -141,7 +141,7 @@ def test_confirm_confirmed_by_mismatch_returns_403(client, monkeypatch):
             "submitted_by": PLAYER_A,
         }
     ]
-    with patch("api.dependencies.get_supabase", return_value=mock_sb):
+    with patch_supabase(mock_sb):
         from api.main import app
         tc = TestClient(app)
         r = tc.post(
@@ -168,7 +168,7 @@ def test_reject_rejected_by_mismatch_returns_403(client, monkeypatch):
             "submitted_by": PLAYER_A,
         }
     ]
-    with patch("api.dependencies.get_supabase", return_value=mock_sb):
+    with patch_supabase(mock_sb):
         from api.main import app
         tc = TestClient(app)
         r = tc.post(
@@ -194,7 +194,7 @@ def test_get_match_by_id_non_participant_returns_403(client, monkeypatch):
     for key in list(sys.modules.keys()):
         if key == "api.main" or key == "api.routers" or key.startswith("api.routers."):
             del sys.modules[key]
-    with patch("api.dependencies.get_supabase", lambda: mock_sb):
+    with patch_supabase(mock_sb):
         from api.main import app
         tc = TestClient(app)
         r = tc.get(
@@ -0,0 +1,114 @@
+"""
+Rate limit storage backends (api.limiter): bounded in-memory default, shared Redis counters
+across workers (fakeredis TCP server as a local stand-in), in-memory fallback when Redis is down.
+"""
+import socket
+import threading
+from importlib.resources import files
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from limits import parse
+from limits.strategies import STRATEGIES
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
+
+from api.limiter import BoundedMemoryStorage, build_limiter, limiter_stats
+
+
+def _app(limiter) -> TestClient:
+    """One API 'worker' with its own Limiter instance."""
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+    @app.post("/login")
+    @limiter.limit("5/minute")
+    def login(request: Request):
+        return {}
+
+    return TestClient(app)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def redis_url():
+    redis = pytest.importorskip("redis")
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # Lua scripts of the sliding window
+    port = _free_port()
+    server = fakeredis.TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"redis://127.0.0.1:{port}/0"
+    # The stand-in closes the connection after an error reply (NOSCRIPT on the first EVALSHA),
+    # so preload the limits Lua scripts like a warmed-up Redis would have them
+    client = redis.Redis.from_url(url)
+    for script in (files("limits") / "resources" / "redis" / "lua_scripts").iterdir():
+        client.script_load(script.read_text())
+    client.close()
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def test_slowapi_private_attributes_still_exist():
+    """build_limiter/limiter_stats rely on slowapi internals; a slowapi upgrade that renames them must fail here."""
+    plain = Limiter(key_func=get_remote_address, storage_uri="memory://", in_memory_fallback_enabled=True)
+    for name in ("_storage", "_strategy", "_limiter", "_fallback_storage", "_fallback_limiter", "_storage_dead"):
+        assert hasattr(plain, name), name
+    assert "sliding-window-counter" in STRATEGIES
+
+
+def test_default_storage_is_bounded():
+    limiter = build_limiter("bounded-memory://")
+    storage = limiter._storage
+    assert isinstance(storage, BoundedMemoryStorage)
+    storage.max_keys = 50
+    item = parse("5/minute")
+    for i in range(500):
+        assert limiter._limiter.hit(item, f"10.0.{i // 256}.{i % 256}")
+    stats = limiter_stats(limiter)
+    assert stats["keys"] <= 50
+    assert stats["evictions"] >= 450
+    assert not storage.events  # sliding window counters, no per-request lists
+
+
+def test_redis_counters_are_shared_between_workers(redis_url):
+    worker_a = _app(build_limiter(redis_url))
+    worker_b = _app(build_limiter(redis_url))
+    codes = [(worker_a if i % 2 else worker_b).post("/login").status_code for i in range(8)]
+    assert codes.count(200) == 5  # not 5 per worker
+    assert codes[5:] == [429, 429, 429]
+
+
+def test_redis_keeps_two_counters_per_client(redis_url):
+    import redis
+
+    limiter = build_limiter(redis_url)
+    item = parse("100/minute")
+    for _ in range(50):
+        assert limiter._limiter.hit(item, "10.0.0.1")
+    keys = redis.Redis.from_url(redis_url).keys("*")
+    assert 1 <= len(keys) <= 2
+    assert limiter_stats(limiter)["fallback_active"] is False
+
+
+def test_unreachable_redis_falls_back_to_local_limits():
+    pytest.importorskip("redis")
+    limiter = build_limiter(f"redis://127.0.0.1:{_free_port()}/0")
+    client = _app(limiter)
+    codes = [client.post("/login").status_code for _ in range(7)]
+    assert codes == [200] * 5 + [429, 429]
+    stats = limiter_stats(limiter)
+    assert stats["fallback_active"] is True
+    assert stats["storage"] == "RedisStorage"
+    assert 0 < stats["keys"] <= stats["max_keys"]
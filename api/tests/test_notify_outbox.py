@@ -0,0 +1,133 @@
+"""
+Очередь уведомлений боту (api.bot_notify): фоновая отправка, повторы, ограничение размера, lifespan.
+"""
+import asyncio
+import sys
+
+import httpx
+from fastapi.testclient import TestClient
+
+from api.bot_notify import NotifyOutbox, outbox
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_enqueue_from_route_thread_does_not_wait_for_bot():
+    seen = []
+
+    async def scenario():
+        release = asyncio.Event()
+        received = asyncio.Event()
+
+        async def blocked_bot(request: httpx.Request) -> httpx.Response:
+            received.set()
+            await release.wait()  # бот «отвечает» только после возврата enqueue
+            seen.append((request.url.path, request.headers.get("X-Notify-Secret"), request.content))
+            return httpx.Response(200, json={"ok": True})
+
+        box = NotifyOutbox(backoff_base=0.001)
+        await box.start("http://bot:8765", "s3cret", transport=httpx.MockTransport(blocked_bot))
+        queued = await asyncio.wait_for(
+            asyncio.to_thread(box.enqueue, "/notify-pending-match", {"match_id": "m1"}), 5
+        )
+        returned_before_bot = not release.is_set() and seen == []
+        await asyncio.wait_for(received.wait(), 5)
+        release.set()
+        await box.stop()
+        return queued, returned_before_bot, box.stats()
+
+    queued, returned_before_bot, stats = _run(scenario())
+    assert queued is True
+    assert returned_before_bot
+    assert seen == [("/notify-pending-match", "s3cret", b'{"match_id":"m1"}')]
+    assert stats["sent"] == 1
+
+
+def test_retries_server_errors_with_backoff():
+    statuses = iter([503, 502, 200])
+    calls = []
+
+    def bot(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(next(statuses))
+
+    async def scenario():
+        box = NotifyOutbox(backoff_base=0.001)
+        await box.start("http://bot", "", transport=httpx.MockTransport(bot))
+        box.enqueue("/notify-game-request", {"request_id": "r1"})
+        await box.stop()
+        return box.stats()
+
+    stats = _run(scenario())
+    assert len(calls) == 3
+    assert (stats["sent"], stats["failed"]) == (1, 0)
+
+
+def test_network_errors_are_retried_and_client_errors_are_not():
+    attempts = {"/a": 0, "/b": 0}
+
+    def bot(request: httpx.Request) -> httpx.Response:
+        attempts[request.url.path] += 1
+        if request.url.path == "/a":
+            raise httpx.ConnectError("bot is down", request=request)
+        return httpx.Response(401)
+
+    async def scenario():
+        box = NotifyOutbox(max_attempts=3, backoff_base=0.001)
+        await box.start("http://bot", "", transport=httpx.MockTransport(bot))
+        box.enqueue("/a", {})
+        box.enqueue("/b", {})
+        await box.stop()
+        return box.stats()
+
+    stats = _run(scenario())
+    assert attempts == {"/a": 3, "/b": 1}
+    assert stats["failed"] == 2
+
+
+def test_outbox_is_bounded():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def stuck_bot(request: httpx.Request) -> httpx.Response:
+            await release.wait()
+            return httpx.Response(200)
+
+        box = NotifyOutbox(maxsize=1, workers=1, backoff_base=0.001)
+        await box.start("http://bot", "", transport=httpx.MockTransport(stuck_bot))
+        results = [box.enqueue("/x", {"i": i}) for i in range(3)]
+        release.set()
+        await box.stop()
+        return results, box.stats()
+
+    results, stats = _run(scenario())
+    assert results == [True, False, False]
+    assert stats["dropped"] == 2
+    assert stats["sent"] == 1
+
+
+def test_disabled_without_bot_url(monkeypatch):
+    monkeypatch.delenv("BOT_NOTIFY_URL", raising=False)
+
+    async def scenario():
+        box = NotifyOutbox()
+        await box.start()
+        return box.started, box.enqueue("/x", {})
+
+    assert _run(scenario()) == (False, False)
+
+
+def test_app_lifespan_owns_outbox(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.setenv("BOT_NOTIFY_URL", "http://127.0.0.1:9")
+    for key in list(sys.modules.keys()):
+        if key == "api.main" or key == "api.routers" or key.startswith("api.routers."):
+            del sys.modules[key]
+    from api.main import app
+
+    with TestClient(app) as tc:
+        assert tc.get("/health").json() == {"status": "ok"}
+        assert outbox.started
+    assert not outbox.started
@@ -0,0 +1,58 @@
+"""
+GET /players/rating: reads the player_stats view (precomputed player_match_stats since migration 015),
+never aggregates matches per request; falls back to players when the view is missing.
+"""
+import sys
+from unittest.mock import MagicMock
+
+from fastapi.testclient import TestClient
+
+from api.tests.conftest import _make_mock_supabase, patch_supabase
+
+ROW = {
+    "id": "00000000-0000-0000-0000-000000000001",
+    "name": "Иван",
+    "rating": 104.5,
+    "telegram_id": 1,
+    "games": 12,
+    "wins": 8,
+    "sets_won": 30,
+    "sets_lost": 17,
+    "last_played_at": "2026-05-20T10:00:00+00:00",
+}
+
+
+def _client(mock_sb) -> TestClient:
+    for key in list(sys.modules.keys()):
+        if key == "api.main" or key == "api.routers" or key.startswith("api.routers."):
+            del sys.modules[key]
+    with patch_supabase(mock_sb):
+        from api.main import app
+    return TestClient(app)
+
+
+def test_rating_is_served_from_player_stats(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _make_mock_supabase()
+    query = mock_sb.table.return_value.select.return_value.order.return_value.limit.return_value
+    query.execute.return_value.data = [ROW]
+
+    r = _client(mock_sb).get("/players/rating?limit=10")
+    assert r.status_code == 200
+    assert r.json() == [ROW]
+    assert [c.args[0] for c in mock_sb.table.call_args_list] == ["player_stats"]
+    mock_sb.table.return_value.select.assert_called_once_with("*")
+    mock_sb.table.return_value.select.return_value.order.assert_called_once_with("rating", desc=True)
+
+
+def test_rating_falls_back_to_players_without_view(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _make_mock_supabase()
+    query = mock_sb.table.return_value.select.return_value.order.return_value.limit.return_value
+    player = {k: ROW[k] for k in ("id", "name", "rating", "telegram_id")}
+    query.execute.side_effect = [Exception("relation player_stats does not exist"), MagicMock(data=[player])]
+
+    r = _client(mock_sb).get("/players/rating")
+    assert r.status_code == 200
+    assert r.json() == [{"games": None, "wins": None, **player}]
+    assert [c.args[0] for c in mock_sb.table.call_args_list] == ["player_stats", "players"]
@@ -0,0 +1,218 @@
+"""
+GET /players/{id}/rating-history: keyset pages in (created_at, id) order, week/month downsampling
+in the database (rating_history_series) or, without migration 016, in the API.
+"""
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+
+from api.tests.conftest import patch_supabase
+
+PLAYER = "00000000-0000-0000-0000-000000000001"
+KEYSET = re.compile(r'^created_at\.gt\."(.+)",and\(created_at\.eq\."(.+)",id\.gt\.(.+)\)$')
+
+
+class HistoryQuery:
+    """rating_history over a list: the filters the route uses, and a log of what it asked for."""
+
+    def __init__(self, db, rows):
+        self.db, self.rows = db, rows
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return HistoryQuery(self.db, [r for r in self.rows if r[column] == value])
+
+    def gte(self, column, value):
+        return HistoryQuery(self.db, [r for r in self.rows if _ts(r[column]) >= _ts(value)])
+
+    def or_(self, filters):
+        ts, same_ts, row_id = KEYSET.match(filters).groups()
+        self.db.keyset_filters += 1
+        return HistoryQuery(self.db, [
+            r for r in self.rows
+            if _ts(r["created_at"]) > _ts(ts) or (_ts(r["created_at"]) == _ts(same_ts) and r["id"] > row_id)
+        ])
+
+    def order(self, column):
+        return self
+
+    def limit(self, n):
+        rows = sorted(self.rows, key=lambda r: (_ts(r["created_at"]), r["id"]))[:n]
+        return HistoryQuery(self.db, rows)
+
+    def execute(self):
+        self.db.round_trips += 1
+        return type("R", (), {"data": self.rows})()
+
+
+class HistoryDb:
+    def __init__(self, rows, series=None):
+        self.rows, self.series = rows, series
+        self.round_trips = self.keyset_filters = 0
+        self.rpc_calls = []
+
+    def table(self, name):
+        assert name == "rating_history"
+        return HistoryQuery(self, self.rows)
+
+    def rpc(self, fn, params):
+        self.rpc_calls.append(params)
+        if self.series is None:
+            raise APIError({"code": "PGRST202", "message": "function not found"})
+        result = self.series
+        return type("Q", (), {"execute": lambda _self: type("R", (), {"data": result})()})()
+
+
+def _ts(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def _history(n=400, other=30):
+    """Два матча в день, у пар записей одинаковый created_at (как у двух игроков одного матча)."""
+    start = datetime(2024, 12, 30, 18, tzinfo=timezone.utc)
+    rows, rating = [], 100.0
+    for k in range(n):
+        delta = [3.5, -1.75, 2.4, -0.6][k % 4]
+        rows.append({
+            "id": f"00000000-0000-0000-0001-{k:012d}",
+            "player_id": PLAYER,
+            "match_id": f"m{k}",
+            "season_id": "s1",
+            "rating_before": rating,
+            "rating_delta": delta,
+            "rating_after": round(rating + delta, 2),
+            "created_at": (start + timedelta(hours=12 * (k // 2))).isoformat(),
+        })
+        rating = round(rating + delta, 2)
+    rows += [dict(rows[k], id=f"x{k}", player_id="someone-else") for k in range(other)]
+    return rows[::-1]
+
+
+def _forget_app():
+    for key in list(sys.modules.keys()):
+        if key in ("api.main", "api.etag", "api.routers") or key.startswith("api.routers."):
+            del sys.modules[key]
+
+
+def _client(db) -> TestClient:
+    _forget_app()
+    with patch_supabase(db):
+        from api.main import app
+    return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def _no_api_key(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    yield
+    _forget_app()  # HistoryDb знает только rating_history: следующие тесты импортируют приложение заново
+
+
+# api.routers.players импортируется в тестах, а не при сборе модуля: иначе test_api_key получит
+# роутер, привязанный к настоящему get_async_supabase
+
+
+def test_buckets_follow_date_trunc():
+    from api.routers.players import _bucket_start, _next_bucket
+
+    sunday = datetime(2025, 3, 9, 23, 59, tzinfo=timezone.utc)
+    assert _bucket_start(sunday, "week") == datetime(2025, 3, 3, tzinfo=timezone.utc)
+    assert _bucket_start(sunday, "month") == datetime(2025, 3, 1, tzinfo=timezone.utc)
+    assert _next_bucket(datetime(2024, 12, 1, tzinfo=timezone.utc), "month") == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert _next_bucket(datetime(2025, 1, 31, tzinfo=timezone.utc), "week") == datetime(2025, 2, 7, tzinfo=timezone.utc)
+
+
+def test_keyset_pages_cover_history_once_in_order():
+    db = HistoryDb(_history())
+    tc = _client(db)
+    points, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 64, **({"cursor": cursor} if cursor else {})}
+        body = tc.get(f"/players/{PLAYER}/rating-history", params=params).json()
+        points += body["points"]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    own = sorted((r for r in db.rows if r["player_id"] == PLAYER), key=lambda r: (_ts(r["created_at"]), r["id"]))
+    assert [p["id"] for p in points] == [r["id"] for r in own]
+    assert pages == 7  # 400 записей по 64
+    assert db.round_trips == pages and db.keyset_filters == pages - 1  # без OFFSET
+
+
+@pytest.mark.parametrize("bucket", ["week", "month"])
+def test_fallback_downsampling_pages_match_full_history(bucket, monkeypatch):
+    db = HistoryDb(_history())
+    tc = _client(db)
+    from api.routers.players import _downsample
+
+    monkeypatch.setattr("api.routers.players.HISTORY_PAGE", 50)
+    own = sorted((r for r in db.rows if r["player_id"] == PLAYER), key=lambda r: (_ts(r["created_at"]), r["id"]))
+    expected = _downsample(own, bucket)
+
+    points, cursor = [], None
+    while True:
+        params = {"bucket": bucket, "limit": 3, **({"cursor": cursor} if cursor else {})}
+        body = tc.get(f"/players/{PLAYER}/rating-history", params=params).json()
+        points += body["points"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert points == expected
+    assert sum(p["games"] for p in points) == len(own)
+    assert points[-1]["rating_after"] == own[-1]["rating_after"]
+
+
+def test_series_rpc_returns_one_small_response():
+    series = [
+        {"bucket": "2025-01-01T00:00:00+00:00", "created_at": "2025-01-31T18:00:00+00:00",
+         "rating_after": 112.3, "rating_delta": "12.30", "games": 40},
+        {"bucket": "2025-02-01T00:00:00+00:00", "created_at": "2025-02-27T06:00:00+00:00",
+         "rating_after": 109.1, "rating_delta": "-3.20", "games": 38},
+    ]
+    db = HistoryDb(_history(), series=series)
+    tc = _client(db)
+    r = tc.get(f"/players/{PLAYER}/rating-history", params={"bucket": "month"})
+    body = r.json()
+    assert [p["rating_delta"] for p in body["points"]] == [12.3, -3.2]
+    assert body["next_cursor"] is None
+    assert db.round_trips == 0  # только RPC, без чтения истории
+    assert db.rpc_calls == [{"p_player_id": PLAYER, "p_bucket": "month", "p_from": None, "p_limit": 201}]
+    assert tc.get(
+        f"/players/{PLAYER}/rating-history", params={"bucket": "month"}, headers={"If-None-Match": r.headers["ETag"]}
+    ).status_code == 304
+
+
+def test_invalid_cursor_and_bucket():
+    tc = _client(HistoryDb([]))
+    assert tc.get(f"/players/{PLAYER}/rating-history", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert tc.get(f"/players/{PLAYER}/rating-history", params={"bucket": "year"}).status_code == 422
+
+
+def test_tampered_cursor_is_rejected_before_the_query():
+    from api.routers.players import _encode_cursor
+
+    db = HistoryDb(_history())
+    tc = _client(db)
+    url = f"/players/{PLAYER}/rating-history"
+    tampered = [
+        {"cursor": _encode_cursor('2025-01-01T00:00:00",id.gt.0),player_id.neq.x', "00000000-0000-0000-0001-000000000001")},
+        {"cursor": _encode_cursor("2025-01-01T00:00:00+00:00", "1),player_id.neq.(x")},
+        {"cursor": _encode_cursor("2025-01-01T00:00:00+00:00", "1"), "bucket": "week"},
+        {"cursor": _encode_cursor("not-a-date"), "bucket": "month"},
+    ]
+    for params in tampered:
+        r = tc.get(url, params=params)
+        assert r.status_code == 400 and r.json()["detail"] == "Invalid cursor"
+    assert db.round_trips == 0 and db.rpc_calls == []
+
+    # Допустимый курсор в другой записи (без часового пояса, id в верхнем регистре) приводится к каноническому виду
+    cursor = _encode_cursor("2024-12-31T06:00:00", "00000000-0000-0000-0001-000000000002".upper())
+    body = tc.get(url, params={"cursor": cursor, "limit": 2}).json()
+    assert [p["id"] for p in body["points"]] == ["00000000-0000-0000-0001-000000000003", "00000000-0000-0000-0001-000000000004"]
@@ -0,0 +1,151 @@
+"""
+Division response cache (api.response_cache): repeat GETs skip Supabase and serialization,
+writes through the API invalidate the division, hit rate is exposed on /metrics.
+"""
+import sys
+import threading
+
+from fastapi.testclient import TestClient
+
+from api.response_cache import MemoryBackend, ResponseCache
+from api.tests.conftest import _make_mock_supabase, patch_supabase
+
+DIVISION = "00000000-0000-0000-0000-0000000000d1"
+PLAYER_A = "00000000-0000-0000-0000-000000000001"
+PLAYER_B = "00000000-0000-0000-0000-000000000002"
+MATCH_ID = "00000000-0000-0000-0000-000000000010"
+
+MATCH = {
+    "id": MATCH_ID,
+    "division_id": DIVISION,
+    "player1_id": PLAYER_A,
+    "player2_id": PLAYER_B,
+    "sets_player1": 3,
+    "sets_player2": 1,
+    "status": "pending_confirm",
+    "submitted_by": PLAYER_A,
+}
+
+
+def _client(mock_sb):
+    for key in list(sys.modules.keys()):
+        if key in ("api.main", "api.etag", "api.response_cache", "api.routers") or key.startswith("api.routers."):
+            del sys.modules[key]
+    with patch_supabase(mock_sb):
+        from api.main import app
+        from api.response_cache import response_cache
+    return TestClient(app), response_cache
+
+
+def _supabase():
+    mock_sb = _make_mock_supabase()
+    select = mock_sb.table.return_value.select.return_value
+    select.eq.return_value.execute.return_value.data = [MATCH]
+    select.eq.return_value.order.return_value.execute.return_value.data = []
+    return mock_sb
+
+
+def test_repeat_matrix_request_is_served_from_cache(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _supabase()
+    tc, cache = _client(mock_sb)
+    path = f"/divisions/{DIVISION}/matches"
+
+    first = tc.get(path)
+    assert first.status_code == 200
+    assert f"{PLAYER_A}-{PLAYER_B}" in first.json()["matrix"]
+
+    mock_sb.table.reset_mock()
+    second = tc.get(path)
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    mock_sb.table.assert_not_called()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_reject_invalidates_division(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    mock_sb = _supabase()
+    tc, cache = _client(mock_sb)
+    path = f"/divisions/{DIVISION}/standings"
+    other = "/divisions/00000000-0000-0000-0000-0000000000d2/standings"
+    tc.get(path)
+    tc.get(other)
+
+    r = tc.post(
+        f"/matches/{MATCH_ID}/reject",
+        json={"rejected_by_player_id": PLAYER_B},
+        headers={"X-Player-Id": PLAYER_B},
+    )
+    assert r.status_code == 200
+    assert cache.invalidations == 1
+
+    mock_sb.table.reset_mock()
+    tc.get(other)
+    mock_sb.table.assert_not_called()
+    tc.get(path)
+    mock_sb.table.assert_called_with("division_players")
+
+
+def test_metrics_expose_hit_rate(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    tc, _ = _client(_supabase())
+    for _ in range(4):
+        tc.get(f"/divisions/{DIVISION}/matches")
+    stats = tc.get("/metrics").json()["response_cache"]
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.75
+    assert stats["size"] == 1
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(maxsize=2)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+    backend.set("c", 3)
+    assert (backend.get("a"), backend.get("b"), backend.get("c")) == (1, None, 3)
+
+
+def test_pluggable_and_disabled_backends():
+    class DictBackend(dict):
+        def set(self, key, value):
+            self[key] = value
+
+        def delete(self, key):
+            self.pop(key, None)
+
+    cache = ResponseCache(DictBackend())
+    cache.store("division:x", "matches", 'W/"1"', {"ok": True})
+    assert cache.get("division:x", "matches", 'W/"1"').body == b'{"ok":true}'
+    assert cache.get("division:x", "matches", 'W/"2"') is None  # другая версия — промах
+
+    disabled = ResponseCache(None)
+    disabled.store("division:x", "matches", 'W/"1"', {"ok": True})
+    assert disabled.get("division:x", "matches", 'W/"1"') is None
+    assert disabled.stats()["enabled"] is False
+
+
+def test_invalidate_during_store_is_not_undone():
+    entered, invalidated = threading.Event(), threading.Event()
+
+    class PausingBackend(MemoryBackend):
+        def get(self, key):
+            value = super().get(key)
+            if threading.current_thread() is not threading.main_thread() and not entered.is_set():
+                entered.set()
+                # invalidate из главного потока должен дождаться конца store, а не вклиниться сюда
+                invalidated.wait(0.2)
+            return value
+
+    cache = ResponseCache(PausingBackend())
+    cache.store("division:x", "standings", 'W/"1"', {"old": True})
+    writer = threading.Thread(target=cache.store, args=("division:x", "matches", 'W/"1"', {"old": True}))
+    writer.start()
+    assert entered.wait(5)
+    cache.invalidate("division:x")
+    invalidated.set()
+    writer.join(5)
+    assert cache.backend.get("division:x") is None
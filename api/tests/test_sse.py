@@ -0,0 +1,262 @@
+"""
+Division push channel (api.sse): one snapshot computation per change fans out to every subscriber.
+Hub-level harness with many in-process subscribers, and an end-to-end run of GET /divisions/{id}/events
+on a real uvicorn server with concurrent streaming HTTP clients.
+"""
+import asyncio
+import copy
+import json
+import socket
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi.testclient import TestClient
+
+from api.sse import DivisionHub, diff_snapshots
+from api.tests.conftest import _make_mock_supabase, patch_supabase
+
+DIVISION = "00000000-0000-0000-0000-0000000000d1"
+SUBSCRIBERS = 500
+
+
+def _snapshot(points=0, cell=None, names=("A", "B")):
+    return {
+        "standings": [
+            {"id": "dp1", "total_points": points, "player": {"id": "p1", "name": names[0]}},
+            {"id": "dp2", "total_points": 1, "player": {"id": "p2", "name": names[1]}},
+        ],
+        "matrix": {
+            "player_ids": ["p1", "p2"],
+            "player_names": list(names),
+            "matrix": [[None, cell], [None, None]],
+        },
+    }
+
+
+class CountingSource:
+    """snapshot_fn для хаба: считает вызовы, данные меняются через .current."""
+
+    def __init__(self):
+        self.current = _snapshot()
+        self.calls = 0
+
+    def __call__(self, division_id):
+        self.calls += 1
+        time.sleep(0.01)  # запрос в Supabase
+        return copy.deepcopy(self.current)
+
+
+def _parse(event: str) -> tuple[str, dict]:
+    fields = dict(line.split(": ", 1) for line in event.strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+def test_diff_snapshots():
+    old = _snapshot()
+    assert diff_snapshots(old, _snapshot()) == {}
+    new = _snapshot(points=3, cell=[2, 3, 0, 0, "m1"])
+    assert diff_snapshots(old, new) == {
+        "standings": [new["standings"][0]],
+        "cells": [[0, 1, [2, 3, 0, 0, "m1"]]],
+    }
+    reordered = _snapshot()
+    reordered["standings"].reverse()
+    assert diff_snapshots(old, reordered) == {"order": ["dp2", "dp1"]}
+    assert diff_snapshots(old, _snapshot(names=("A", "Б"))) is None  # состав/имена — полный снимок
+
+
+def test_many_subscribers_share_one_computation():
+    async def scenario():
+        source = CountingSource()
+        hub = DivisionHub(queue_size=4, refresh_interval=3600, heartbeat=3600)
+        await hub.start(source)
+        queues = await asyncio.gather(*(hub.subscribe(DIVISION) for _ in range(SUBSCRIBERS)))
+        assert source.calls == 1  # одновременные подписки — один снимок
+        first = [q.get_nowait() for q in queues]
+        assert all(e is first[0] for e in first)  # сериализован один раз
+        assert _parse(first[0])[0] == "snapshot"
+
+        source.current = _snapshot(points=3, cell=[2, 3, 0, 0, "m1"])
+        for _ in range(10):  # серия записей подряд — один пересчёт
+            hub.notify(DIVISION)
+        hub.notify("other-division")  # без подписчиков не считается
+        events = await asyncio.gather(*(q.get() for q in queues))
+        assert source.calls == 2
+        kind, diff = _parse(events[0])
+        assert kind == "diff"
+        assert diff["cells"] == [[0, 1, [2, 3, 0, 0, "m1"]]]
+        assert [r["id"] for r in diff["standings"]] == ["dp1"]
+        assert all(e is events[0] for e in events)
+
+        hub.notify(DIVISION)  # данные не изменились — событие не шлётся
+        await asyncio.sleep(0.05)
+        assert source.calls == 3
+        assert all(q.empty() for q in queues)
+        assert hub.stats()["subscribers"] == SUBSCRIBERS
+        assert hub.stats()["published"] == SUBSCRIBERS
+
+        for q in queues:
+            hub.unsubscribe(DIVISION, q)
+        assert hub.stats()["divisions"] == 0
+        await hub.stop()
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_gets_resynced_with_snapshot():
+    async def scenario():
+        source = CountingSource()
+        hub = DivisionHub(queue_size=2, refresh_interval=3600, heartbeat=3600)
+        await hub.start(source)
+        slow = await hub.subscribe(DIVISION)
+        for points in range(1, 5):
+            source.current = _snapshot(points=points)
+            hub.notify(DIVISION)
+            await asyncio.sleep(0.05)
+        assert slow.qsize() == 1
+        kind, data = _parse(slow.get_nowait())
+        assert kind == "snapshot"
+        assert data["standings"][0]["total_points"] == 4
+        assert hub.resyncs >= 1
+        await hub.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stop_ends_streams_with_full_queues():
+    async def scenario():
+        hub = DivisionHub(queue_size=1, refresh_interval=3600, heartbeat=3600)
+        await hub.start(CountingSource())
+        full = await hub.subscribe(DIVISION)  # снимок не прочитан — очередь полна
+        assert full.full()
+        await hub.stop()
+        assert full.get_nowait() is None
+
+    asyncio.run(scenario())
+
+
+def test_hub_forgets_divisions_without_subscribers():
+    async def scenario():
+        hub = DivisionHub(refresh_interval=3600, heartbeat=3600)
+        await hub.start(CountingSource())
+        for n in range(50):
+            division = f"old-season-{n}"
+            hub.unsubscribe(division, await hub.subscribe(division))
+        assert hub.subscriber_count() == 0
+        assert len(hub._locks) == len(hub._state) == 0
+        await hub.stop()
+
+    asyncio.run(scenario())
+
+
+def test_periodic_refresh_picks_up_writes_outside_api():
+    async def scenario():
+        source = CountingSource()
+        hub = DivisionHub(refresh_interval=0.05, heartbeat=3600)
+        await hub.start(source)
+        queue = await hub.subscribe(DIVISION)
+        queue.get_nowait()
+        source.current = _snapshot(points=7)
+        kind, diff = _parse(await asyncio.wait_for(queue.get(), 2))
+        assert kind == "diff"
+        assert diff["standings"][0]["total_points"] == 7
+        await hub.stop()
+
+    asyncio.run(scenario())
+
+
+def _division_supabase(data: dict):
+    mock_sb = _make_mock_supabase()
+
+    def table(name):
+        query = _make_mock_supabase().table.return_value
+        select = query.select.return_value
+        select.eq.return_value.execute.return_value.data = data[name]
+        select.eq.return_value.order.return_value.execute.return_value.data = data[name]
+        return query
+
+    mock_sb.table.side_effect = table
+    return mock_sb
+
+
+def _app(mock_sb):
+    for key in list(sys.modules.keys()):
+        if key in ("api.main", "api.etag", "api.response_cache", "api.routers") or key.startswith("api.routers."):
+            del sys.modules[key]
+    with patch_supabase(mock_sb):
+        from api.main import app
+    return app
+
+
+def test_events_endpoint_requires_running_hub(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    app = _app(_division_supabase({"matches": [], "division_players": []}))
+    # без lifespan (TestClient не в with) хаб не запущен
+    assert TestClient(app).get(f"/divisions/{DIVISION}/events").status_code == 503
+
+
+def test_events_endpoint_fans_out_over_http(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    clients = 50
+    players = [{"player_id": pid, "player": {"id": pid, "name": pid}} for pid in ("p1", "p2")]
+    data = {
+        "matches": [],
+        "division_players": players,
+    }
+    mock_sb = _division_supabase(data)
+    app = _app(mock_sb)
+    from api.sse import division_hub
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", timeout_graceful_shutdown=2))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    async def subscriber(client: httpx.AsyncClient, ready: asyncio.Event, received: list):
+        async with client.stream("GET", f"/divisions/{DIVISION}/events") as r:
+            assert r.headers["content-type"].startswith("text/event-stream")
+            event = ""
+            async for line in r.aiter_lines():
+                if line:
+                    event += line + "\n"
+                    continue
+                received.append(_parse(event))
+                event = ""
+                if len(received) == 1:
+                    ready.set()
+                else:
+                    return
+
+    async def scenario():
+        results = [[] for _ in range(clients)]
+        readies = [asyncio.Event() for _ in range(clients)]
+        limits = httpx.Limits(max_connections=clients)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=10) as client:
+            tasks = [asyncio.create_task(subscriber(client, readies[i], results[i])) for i in range(clients)]
+            await asyncio.wait_for(asyncio.gather(*(e.wait() for e in readies)), 10)
+            computed = division_hub.computations
+            data["matches"] = [{
+                "id": "m1", "player1_id": "p1", "player2_id": "p2",
+                "sets_player1": 3, "sets_player2": 1, "status": "played", "submitted_by": None,
+            }]
+            await asyncio.to_thread(division_hub.notify, DIVISION)  # из потока, как синхронный роут
+            await asyncio.wait_for(asyncio.gather(*tasks), 10)
+            return results, division_hub.computations - computed
+
+    try:
+        results, computations = asyncio.run(scenario())
+    finally:
+        server.should_exit = True
+        thread.join(10)
+    assert computations == 1
+    for received in results:
+        assert [kind for kind, _ in received] == ["snapshot", "diff"]
+        assert received[0][1]["matrix"]["player_ids"] == ["p1", "p2"]
+        assert received[1][1]["cells"] == [[0, 1, [2, 3, 1, 0, "m1"]]]
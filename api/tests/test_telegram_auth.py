@@ -53,3 +53,14 @@ def test_validate_init_data_valid_returns_payload():
 
 def test_validate_init_data_no_bot_token_returns_none():
     assert validate_init_data("auth_date=1&hash=ab", "") is None
+
+
+def test_webapp_secret_key_is_computed_once_per_bot_token():
+    from api.telegram_auth import webapp_secret_key
+
+    webapp_secret_key.cache_clear()
+    for _ in range(3):
+        validate_init_data("auth_date=1&user=%7B%7D&hash=ab", "token-a")
+    validate_init_data("auth_date=1&user=%7B%7D&hash=ab", "token-b")
+    info = webapp_secret_key.cache_info()
+    assert (info.misses, info.hits) == (2, 2)
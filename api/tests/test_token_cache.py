@@ -0,0 +1,105 @@
+"""
+Verified JWT cache (api.token_cache) and once-per-request auth (request.state.player_id).
+Timings of cold jwt.decode vs cache hit live in scripts/bench_token_cache.py.
+"""
+import time
+from unittest.mock import patch
+
+import jwt
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+
+import api.dependencies as deps
+from api.dependencies import get_current_player_id, require_current_player_id
+from api.token_cache import VerifiedTokens, token_cache
+
+SECRET = "test-jwt-secret-at-least-32-characters-long"
+PLAYER = "00000000-0000-0000-0000-000000000001"
+
+
+def _token(player_id=PLAYER, exp_in=3600, secret=SECRET) -> str:
+    now = int(time.time())
+    return jwt.encode({"player_id": player_id, "iat": now, "exp": now + exp_in}, secret, algorithm="HS256")
+
+
+def test_cache_honours_exp_and_bounds():
+    now = [1000.0]
+    cache = VerifiedTokens(maxsize=2, max_ttl=600, clock=lambda: now[0])
+    cache.put(SECRET, "a", "p1", exp=1100)
+    cache.put(SECRET, "b", None, exp=None)  # валидный токен без игрока, живёт max_ttl
+    assert cache.get(SECRET, "a") == (True, "p1")
+    assert cache.get(SECRET, "b") == (True, None)
+    assert cache.get("other-secret", "a") == (False, None)  # смена секрета — другой ключ
+
+    now[0] = 1100
+    assert cache.get(SECRET, "a") == (False, None)  # exp наступил
+    assert cache.get(SECRET, "b") == (True, None)
+    now[0] = 1601
+    assert cache.get(SECRET, "b") == (False, None)
+
+    cache.put(SECRET, "expired", "p", exp=1000)
+    assert cache.stats()["size"] == 0
+    for t in ("x", "y", "z"):
+        cache.put(SECRET, t, t, exp=None)
+    assert cache.get(SECRET, "x") == (False, None)  # вытеснен LRU
+    assert cache.stats()["size"] == 2
+
+
+def test_bearer_is_verified_once(monkeypatch):
+    monkeypatch.setenv("JWT_SECRET", SECRET)
+    token_cache.clear()
+    token = _token()
+    with patch.object(deps.jwt, "decode", wraps=jwt.decode) as decode:
+        for _ in range(5):
+            assert deps._player_id_from_bearer(f"Bearer {token}") == PLAYER
+        assert decode.call_count == 1
+        assert deps._player_id_from_bearer(f"Bearer {_token(secret='forged-secret-of-enough-length-000')}") is None
+        assert deps._player_id_from_bearer(f"Bearer {_token(secret='forged-secret-of-enough-length-000')}") is None
+        assert decode.call_count == 3  # неверные токены не кэшируются
+
+
+def _stacked_app() -> FastAPI:
+    app = FastAPI()
+
+    async def audit(request: Request, current=Depends(require_current_player_id)):
+        return request.state.player_id
+
+    @app.get("/me")
+    async def me(
+        current=Depends(require_current_player_id),
+        again=Depends(get_current_player_id),
+        audited=Depends(audit),
+    ):
+        return {"current": current, "again": again, "audited": audited}
+
+    return app
+
+
+def test_auth_is_resolved_once_per_request(monkeypatch):
+    monkeypatch.setenv("JWT_SECRET", SECRET)
+    token_cache.clear()
+    tc = TestClient(_stacked_app())
+    with patch.object(deps, "_player_id_from_bearer", wraps=deps._player_id_from_bearer) as verify:
+        r = tc.get("/me", headers={"Authorization": f"Bearer {_token()}"})
+        assert r.json() == {"current": PLAYER, "again": PLAYER, "audited": PLAYER}
+        assert verify.call_count == 1
+        r = tc.get("/me", headers={"X-Player-Id": "legacy"})
+        assert r.json()["current"] == "legacy"
+        assert tc.get("/me").status_code == 403
+
+
+def test_repeated_requests_hit_the_cache(monkeypatch):
+    monkeypatch.setenv("JWT_SECRET", SECRET)
+    token_cache.clear()
+    headers = {"Authorization": f"Bearer {_token()}"}
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(current=Depends(require_current_player_id)):
+        return {"current": current}
+
+    tc = TestClient(app)
+    with patch.object(deps.jwt, "decode", wraps=jwt.decode) as decode:
+        for _ in range(5):
+            assert tc.get("/me", headers=headers).json() == {"current": PLAYER}
+        assert decode.call_count == 1
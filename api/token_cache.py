@@ -0,0 +1,95 @@
+"""
+Кэши проверенных учётных данных в памяти процесса API: Bearer JWT и initData Mini App.
+
+Mini App шлёт один и тот же токен в каждом запросе, а jwt.decode каждый раз заново
+разбирает JSON и считает HMAC. Здесь хранится результат проверки: хэш (JWT_SECRET, токен)
+→ player_id. Запись живёт до exp токена (но не дольше max_ttl), LRU ограничен
+JWT_CACHE_SIZE записями (0 — кэш выключен). Сам токен не хранится; смена JWT_SECRET
+меняет ключ, поэтому старые записи не находятся. Неверные токены не кэшируются.
+
+init_data_cache — то же для /auth/telegram: хэш (bot token, initData) → (telegram_id, player_id).
+Повторное открытие Mini App с той же initData не считает HMAC и не ищет игрока в БД.
+Запись живёт INIT_DATA_CACHE_TTL секунд (по умолчанию 300), но не дольше, чем initData
+принимается по auth_date; кэшируются только найденные игроки. Любое изменение initData
+меняет ключ — подделанная строка проверяется заново и отклоняется.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+class VerifiedTokens:
+    """Потокобезопасный LRU проверенных токенов с истечением по exp. Значение — результат
+    проверки (player_id или кортеж для initData)."""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        max_ttl: float = 3600.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._clock = clock
+        self._data: OrderedDict[bytes, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(secret: str, token: str) -> bytes:
+        return hashlib.blake2b(f"{secret}\0{token}".encode(), digest_size=16).digest()
+
+    def get(self, secret: str, token: str) -> tuple[bool, Any]:
+        """(True, значение) — токен уже проверен и не истёк; (False, None) — проверять заново."""
+        key = self._key(secret, token)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= self._clock():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, item[1]
+
+    def put(self, secret: str, token: str, value: Any, exp: Optional[float]) -> None:
+        if self.maxsize <= 0:
+            return
+        now = self._clock()
+        expires_at = now + self.max_ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now:
+            return
+        key = self._key(secret, token)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+token_cache = VerifiedTokens(maxsize=int(os.getenv("JWT_CACHE_SIZE") or 1024))
+init_data_cache = VerifiedTokens(
+    maxsize=int(os.getenv("INIT_DATA_CACHE_SIZE") or 1024),
+    max_ttl=float(os.getenv("INIT_DATA_CACHE_TTL") or 300),
+)
@@ -9,9 +9,15 @@ from aiogram.filters import Command, CommandObject
 
 from services.supabase_client import (
     _get_client,
+    execute,
     get_player_by_telegram_id,
     get_active_season,
+    run_sync,
 )
+from services.broadcast import broadcaster, split_message
+from services.player_cache import player_cache
+from services.player_stats import rebuild_player_stats
+from services.scheduler import close_tour, prepare_next_season, preview_next_season
 
 router = Router()
 
@@ -24,20 +30,20 @@ MONTH_NAMES = [
 ]
 
 
-def is_admin(telegram_id: int) -> bool:
+async def is_admin(telegram_id: int) -> bool:
     """Проверка: ADMIN_TELEGRAM_ID или is_admin в БД."""
     admin_id = os.getenv("ADMIN_TELEGRAM_ID")
     if admin_id and str(telegram_id) == str(admin_id.strip()):
         return True
     try:
-        player = get_player_by_telegram_id(telegram_id)
+        player = await get_player_by_telegram_id(telegram_id)
         return bool(player and player.get("is_admin"))
     except Exception:
         return False
 
 
 async def _admin_only(message: Message):
-    if not is_admin(message.from_user.id):
+    if not await is_admin(message.from_user.id):
         await message.answer("Нет доступа.")
         return False
     return True
@@ -72,12 +78,12 @@ async def cmd_newseason(message: Message) -> None:
     name = f"{MONTH_NAMES[month]} {year}"
     try:
         client = _get_client()
-        r = client.table("seasons").insert({
+        r = await execute(client.table("seasons").insert({
             "year": year,
             "month": month,
             "name": name,
             "status": "active",
-        }).execute()
+        }))
         if r.data and len(r.data) > 0:
             await message.answer(f"Сезон создан: <b>{name}</b> (id: {r.data[0]['id']})")
         else:
@@ -103,17 +109,17 @@ async def cmd_adddivision(message: Message, command: CommandObject) -> None:
     # КД по умолчанию: 1=0.30, 2=0.27, 3=0.25, 4=0.22
     coefs = {1: 0.30, 2: 0.27, 3: 0.25, 4: 0.22}
     coef = coefs.get(num, 0.22)
-    season = get_active_season()
+    season = await get_active_season()
     if not season:
         await message.answer("Нет активного сезона. Создайте его: /newseason")
         return
     try:
         client = _get_client()
-        r = client.table("divisions").insert({
+        r = await execute(client.table("divisions").insert({
             "season_id": season["id"],
             "number": num,
             "coef": coef,
-        }).execute()
+        }))
         if r.data and len(r.data) > 0:
             await message.answer(f"Дивизион №{num} создан в сезоне {season.get('name', '')}.")
         else:
@@ -156,35 +162,32 @@ async def cmd_assignplayer(message: Message, command: CommandObject) -> None:
         else:
             by_telegram_id = False
             telegram_id_val = None
-    season = get_active_season()
+    season = await get_active_season()
     if not season:
         await message.answer("Нет активного сезона.")
         return
     client = _get_client()
-    div_r = (
+    div_r = await execute(
         client.table("divisions")
         .select("id")
         .eq("season_id", season["id"])
         .eq("number", div_num)
-        .execute()
     )
     if not div_r.data or len(div_r.data) == 0:
         await message.answer(f"Дивизион №{div_num} не найден в текущем сезоне.")
         return
     division_id = div_r.data[0]["id"]
     if by_telegram_id:
-        pl_r = (
+        pl_r = await execute(
             client.table("players")
             .select("id, name, telegram_id")
             .eq("telegram_id", telegram_id_val)
-            .execute()
         )
     else:
-        pl_r = (
+        pl_r = await execute(
             client.table("players")
             .select("id, name, telegram_username")
             .eq("telegram_username", second_arg)
-            .execute()
         )
     if not pl_r.data or len(pl_r.data) == 0:
         if by_telegram_id:
@@ -199,10 +202,10 @@ async def cmd_assignplayer(message: Message, command: CommandObject) -> None:
     else:
         assign_label = f"@{second_arg}"
     try:
-        client.table("division_players").insert({
+        await execute(client.table("division_players").insert({
             "division_id": division_id,
             "player_id": player_id,
-        }).execute()
+        }))
         await message.answer(f"Игрок <b>{player_name}</b> ({assign_label}) назначен в дивизион №{div_num}.")
     except Exception as e:
         if "duplicate" in str(e).lower() or "unique" in str(e).lower():
@@ -212,47 +215,78 @@ async def cmd_assignplayer(message: Message, command: CommandObject) -> None:
 
 
 @router.message(Command("closetour"))
-async def cmd_closetour(message: Message) -> None:
-    """Закрыть тур: несыгранные матчи 0-0, рассчитать итоги, закрыть сезон."""
+async def cmd_closetour(message: Message, command: CommandObject) -> None:
+    """
+    Закрыть тур: несыгранные матчи 0-0, рассчитать итоги, закрыть сезон.
+    /closetour preview — показать итоговые позиции без записи в БД.
+    """
     if not await _admin_only(message):
         return
+    dry_run = (command.args or "").strip().lower() == "preview"
     try:
-        client = _get_client()
-        season = get_active_season()
-        if not season:
-            await message.answer("Нет активного сезона.")
+        report = await close_tour(dry_run=dry_run)
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}")
+        return
+    # Отчёт по всем дивизионам длиннее лимита Telegram — частями, как у закрытия по расписанию
+    for part in split_message(report):
+        await message.answer(part)
+
+
+@router.message(Command("nextseason"))
+async def cmd_nextseason(message: Message, command: CommandObject) -> None:
+    """
+    Создать следующий сезон по итогам закрытого: ротация игроков между дивизионами.
+    /nextseason preview — показать план без записи в БД.
+    """
+    if not await _admin_only(message):
+        return
+    try:
+        if (command.args or "").strip().lower() == "preview":
+            await message.answer(await preview_next_season())
             return
-        season_id = season["id"]
-        divs = client.table("divisions").select("id").eq("season_id", season_id).execute()
-        if not divs.data:
-            await message.answer("В сезоне нет дивизионов.")
+        season_id = await prepare_next_season()
+        if not season_id:
+            await message.answer("Нет закрытого сезона.")
             return
-        for d in divs.data:
-            div_id = d["id"]
-            # Все pending матчи → not_played, 0-0
-            client.table("matches").update({
-                "status": "not_played",
-                "sets_player1": 0,
-                "sets_player2": 0,
-            }).eq("division_id", div_id).eq("status", "pending").execute()
-            # Позиции в дивизионе по total_points, затем по разнице сетов
-            dps = (
-                client.table("division_players")
-                .select("id, total_points, total_sets_won, total_sets_lost")
-                .eq("division_id", div_id)
-                .execute()
-            )
-            if not dps.data:
-                continue
-            rows = dps.data
-            def key(r):
-                pts = r.get("total_points") or 0
-                sw = r.get("total_sets_won") or 0
-                sl = r.get("total_sets_lost") or 0
-                return (pts, sw - sl)
-            for pos, row in enumerate(sorted(rows, key=key, reverse=True), 1):
-                client.table("division_players").update({"position": pos}).eq("id", row["id"]).execute()
-        client.table("seasons").update({"status": "closed"}).eq("id", season_id).execute()
-        await message.answer(f"Тур закрыт. Сезон «{season.get('name', '')}» переведён в статус closed.")
+        await message.answer("Следующий сезон создан, игроки распределены по дивизионам.")
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}")
+
+
+@router.message(Command("rebuildstats"))
+async def cmd_rebuildstats(message: Message) -> None:
+    """Пересобрать статистику игроков (игры, победы, сеты) для страницы Рейтинг по таблице matches."""
+    if not await _admin_only(message):
+        return
+    try:
+        changed = await run_sync(rebuild_player_stats, _get_client())
+        await message.answer(f"Статистика игроков пересобрана, изменено строк: {changed}.")
     except Exception as e:
         await message.answer(f"Ошибка: {e}")
+
+
+@router.message(Command("cachestats"))
+async def cmd_cachestats(message: Message) -> None:
+    """Счётчики кэша игроков (попадания/промахи)."""
+    if not await _admin_only(message):
+        return
+    st = player_cache.stats()
+    await message.answer(
+        f"Кэш игроков: {st['size']} записей\n"
+        f"Попадания: {st['hits']}, промахи: {st['misses']} (hit rate {st['hit_rate']:.0%})"
+    )
+
+
+@router.message(Command("broadcaststats"))
+async def cmd_broadcaststats(message: Message) -> None:
+    """Счётчики рассылок (доставлено/ошибки/отброшено, RetryAfter, скорость)."""
+    if not await _admin_only(message):
+        return
+    st = broadcaster.stats()
+    await message.answer(
+        f"Рассылок: {st['broadcasts']}\n"
+        f"Доставлено: {st['sent']}, ошибок: {st['failed']}, отброшено: {st['dropped']}\n"
+        f"Повторов: {st['retried']} (RetryAfter: {st['retry_after']})\n"
+        f"Скорость последней рассылки: {st['last_throughput']} сообщ./с"
+    )
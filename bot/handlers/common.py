@@ -27,9 +27,9 @@ async def cmd_start(message: Message) -> None:
     name = _get_name_from_user(message)
 
     try:
-        player = get_player_by_telegram_id(telegram_id)
+        player = await get_player_by_telegram_id(telegram_id)
         if not player:
-            player = create_player(
+            player = await create_player(
                 telegram_id=telegram_id,
                 name=name,
                 telegram_username=username,
@@ -78,11 +78,11 @@ async def menu_rating(callback: CallbackQuery) -> None:
 async def menu_division(callback: CallbackQuery) -> None:
     await callback.answer()
     telegram_id = callback.from_user.id
-    player = get_player_by_telegram_id(telegram_id)
+    player = await get_player_by_telegram_id(telegram_id)
     if not player:
         await callback.message.answer("Сначала нажмите /start для регистрации.")
         return
-    data = get_player_division(player["id"])
+    data = await get_player_division(player["id"])
     if not data:
         await callback.message.answer("У вас пока нет дивизиона в текущем сезоне. Обратитесь к администратору.")
         return
@@ -12,7 +12,9 @@ from typing import Optional, TYPE_CHECKING
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 
-from services.supabase_client import get_player_by_telegram_id
+from services.broadcast import OutgoingMessage, broadcaster
+from services.player_embed import embed_players
+from services.supabase_client import execute, get_player_by_telegram_id
 
 if TYPE_CHECKING:
     from aiogram import Bot
@@ -36,13 +38,13 @@ async def gamereq_accept(callback: CallbackQuery) -> None:
     request_id = callback.data.replace("gamereq:accept:", "").strip()
     telegram_id = callback.from_user.id
 
-    player = get_player_by_telegram_id(telegram_id)
+    player = await get_player_by_telegram_id(telegram_id)
     if not player:
         await callback.answer("Игрок не найден.", show_alert=True)
         return
 
     client = _get_client()
-    r = client.table("game_requests").select("*").eq("id", request_id).execute()
+    r = await execute(client.table("game_requests").select("*").eq("id", request_id))
     if not r.data:
         await callback.answer("Запрос не найден.", show_alert=True)
         return
@@ -60,13 +62,12 @@ async def gamereq_accept(callback: CallbackQuery) -> None:
         await callback.answer("Нельзя принять собственный запрос.", show_alert=True)
         return
 
-    upd = (
+    upd = await execute(
         client.table("game_requests")
         .update({"status": "accepted", "accepted_by_id": player["id"]})
         .eq("id", request_id)
         .eq("status", "pending")
         .select()
-        .execute()
     )
     if not upd.data:
         await callback.answer("Запрос уже был принят другим игроком.", show_alert=True)
@@ -89,17 +90,16 @@ async def gamereq_decline(callback: CallbackQuery) -> None:
     request_id = callback.data.replace("gamereq:decline:", "").strip()
     telegram_id = callback.from_user.id
 
-    player = get_player_by_telegram_id(telegram_id)
+    player = await get_player_by_telegram_id(telegram_id)
     if not player:
         await callback.answer("Игрок не найден.", show_alert=True)
         return
 
     client = _get_client()
-    r = (
+    r = await execute(
         client.table("game_requests")
-        .select("id, requester_id, target_player_id, status, type")
+        .select("id, requester_id, target_player_id, status, type, " + embed_players("requester_id"))
         .eq("id", request_id)
-        .execute()
     )
     if not r.data:
         await callback.answer("Запрос не найден.", show_alert=True)
@@ -114,7 +114,7 @@ async def gamereq_decline(callback: CallbackQuery) -> None:
         await callback.answer("Этот вызов не адресован вам.", show_alert=True)
         return
 
-    client.table("game_requests").update({"status": "cancelled"}).eq("id", request_id).eq("status", "pending").execute()
+    await execute(client.table("game_requests").update({"status": "cancelled"}).eq("id", request_id).eq("status", "pending"))
 
     await callback.answer("Отклонено.", show_alert=False)
     try:
@@ -123,17 +123,12 @@ async def gamereq_decline(callback: CallbackQuery) -> None:
         pass
 
     # Notify requester about the decline
-    requester_r = (
-        client.table("players")
-        .select("telegram_id, name")
-        .eq("id", req["requester_id"])
-        .execute()
-    )
-    if requester_r.data and requester_r.data[0].get("telegram_id"):
+    requester = req.get("requester") or {}
+    if requester.get("telegram_id"):
         decliner_name = player.get("name", "Игрок")
         try:
             await callback.bot.send_message(
-                int(requester_r.data[0]["telegram_id"]),
+                int(requester["telegram_id"]),
                 f"<b>{decliner_name}</b> отклонил ваш запрос на матч.",
             )
         except Exception:
@@ -151,11 +146,13 @@ async def send_game_request_notify(request_id: str, bot: Optional["Bot"]) -> boo
     webapp_url = (os.getenv("WEBAPP_URL") or "").strip().rstrip("/")
     try:
         client = _get_client()
-        r = (
+        r = await execute(
             client.table("game_requests")
-            .select("requester_id, target_player_id, status, notification_sent_at")
+            .select(
+                "requester_id, target_player_id, status, notification_sent_at, "
+                + embed_players("requester_id", "target_player_id")
+            )
             .eq("id", request_id)
-            .execute()
         )
         if not r.data:
             return False
@@ -169,15 +166,8 @@ async def send_game_request_notify(request_id: str, bot: Optional["Bot"]) -> boo
         if not target_id:
             return False
 
-        players_r = (
-            client.table("players")
-            .select("id, name, telegram_id")
-            .in_("id", [req["requester_id"], target_id])
-            .execute()
-        )
-        by_id = {p["id"]: p for p in (players_r.data or [])}
-        requester = by_id.get(req["requester_id"], {})
-        target = by_id.get(target_id, {})
+        requester = req.get("requester") or {}
+        target = req.get("target_player") or {}
 
         telegram_id = target.get("telegram_id")
         if not telegram_id:
@@ -201,7 +191,7 @@ async def send_game_request_notify(request_id: str, bot: Optional["Bot"]) -> boo
         await bot.send_message(int(telegram_id), text, reply_markup=kb)
 
         now_iso = datetime.now(timezone.utc).isoformat()
-        client.table("game_requests").update({"notification_sent_at": now_iso}).eq("id", request_id).execute()
+        await execute(client.table("game_requests").update({"notification_sent_at": now_iso}).eq("id", request_id))
         logger.info("Sent game request notify for %s to player %s", request_id, target_id)
         return True
     except Exception as e:
@@ -215,11 +205,10 @@ async def send_game_request_accepted_notify(request_id: str, bot: Optional["Bot"
         return False
     try:
         client = _get_client()
-        r = (
+        r = await execute(
             client.table("game_requests")
-            .select("requester_id, accepted_by_id, status")
+            .select("requester_id, accepted_by_id, status, " + embed_players("requester_id", "accepted_by_id"))
             .eq("id", request_id)
-            .execute()
         )
         if not r.data:
             return False
@@ -232,12 +221,8 @@ async def send_game_request_accepted_notify(request_id: str, bot: Optional["Bot"
         if not requester_id or not acceptor_id:
             return False
 
-        ids = list({requester_id, acceptor_id})
-        players_r = client.table("players").select("id, name, telegram_id").in_("id", ids).execute()
-        by_id = {p["id"]: p for p in (players_r.data or [])}
-
-        requester = by_id.get(requester_id, {})
-        acceptor = by_id.get(acceptor_id, {})
+        requester = req.get("requester") or {}
+        acceptor = req.get("accepted_by") or {}
         requester_name = requester.get("name", "Игрок")
         acceptor_name = acceptor.get("name", "Игрок")
 
@@ -277,11 +262,10 @@ async def send_open_game_request_notify(request_id: str, bot: Optional["Bot"]) -
     webapp_url = (os.getenv("WEBAPP_URL") or "").strip().rstrip("/")
     try:
         client = _get_client()
-        r = (
+        r = await execute(
             client.table("game_requests")
             .select("requester_id, type, status, notification_sent_at")
             .eq("id", request_id)
-            .execute()
         )
         if not r.data:
             return False
@@ -297,12 +281,11 @@ async def send_open_game_request_notify(request_id: str, bot: Optional["Bot"]) -
         if not requester_id:
             return False
 
-        players_r = (
+        players_r = await execute(
             client.table("players")
             .select("id, name, telegram_id")
             .neq("id", requester_id)
             .not_.is_("telegram_id", "null")
-            .execute()
         )
         players = players_r.data or []
         if not players:
@@ -312,11 +295,10 @@ async def send_open_game_request_notify(request_id: str, bot: Optional["Bot"]) -
         requester = next((p for p in players if p["id"] == requester_id), None)
         if not requester:
             # fetch explicitly if not in list
-            r_req = (
+            r_req = await execute(
                 client.table("players")
                 .select("id, name, telegram_id")
                 .eq("id", requester_id)
-                .execute()
             )
             requester = (r_req.data or [{}])[0]
 
@@ -336,21 +318,20 @@ async def send_open_game_request_notify(request_id: str, bot: Optional["Bot"]) -
             buttons.append([InlineKeyboardButton(text="Открыть приложение", url=webapp_url)])
         kb = InlineKeyboardMarkup(inline_keyboard=buttons)
 
-        sent_any = False
-        for p in players:
-            tid = p.get("telegram_id")
-            if not tid:
-                continue
-            try:
-                await bot.send_message(int(tid), text, reply_markup=kb)
-                sent_any = True
-            except Exception:
-                continue
+        report = await broadcaster.send(bot, [
+            OutgoingMessage(int(p["telegram_id"]), text, reply_markup=kb, key=p["id"])
+            for p in players
+            if p.get("telegram_id")
+        ])
+        sent_any = report.sent > 0
 
         if sent_any:
             now_iso = datetime.now(timezone.utc).isoformat()
-            client.table("game_requests").update({"notification_sent_at": now_iso}).eq("id", request_id).execute()
-            logger.info("Sent open game request notify for %s", request_id)
+            await execute(client.table("game_requests").update({"notification_sent_at": now_iso}).eq("id", request_id))
+            logger.info(
+                "Sent open game request notify for %s: %d sent, %d failed, %d dropped",
+                request_id, report.sent, report.failed, report.dropped,
+            )
         return sent_any
     except Exception as e:
         logger.exception("send_open_game_request_notify failed for %s: %s", request_id, e)
@@ -13,14 +13,14 @@ router = Router()
 async def _send_rating(message_or_chat, telegram_id: int):
     """Отправить топ-20 рейтинга в чат; выделить игрока с telegram_id."""
     try:
-        top = get_rating_top(limit=20)
+        top = await get_rating_top(limit=20)
     except Exception:
         await message_or_chat.answer("Рейтинг временно недоступен. Попробуйте позже.")
         return
     if not top:
         await message_or_chat.answer("Рейтинг пока пуст.")
         return
-    current = get_player_by_telegram_id(telegram_id)
+    current = await get_player_by_telegram_id(telegram_id)
     current_id = current["id"] if current else None
     if not current:
         await message_or_chat.answer(
@@ -51,11 +51,11 @@ async def cmd_result(message: Message, state: FSMContext) -> None:
     """Начать ввод результата: показать список соперников."""
     await state.clear()
     telegram_id = message.from_user.id
-    player = get_player_by_telegram_id(telegram_id)
+    player = await get_player_by_telegram_id(telegram_id)
     if not player:
         await message.answer("Сначала нажмите /start для регистрации.")
         return
-    data = get_player_division(player["id"])
+    data = await get_player_division(player["id"])
     if not data:
         await message.answer("У вас нет дивизиона в текущем сезоне. Обратитесь к администратору.")
         return
@@ -86,7 +86,8 @@ async def result_choose_opponent(callback: CallbackQuery, state: FSMContext) ->
         await callback.answer()
         return
     data = await state.get_data()
-    players = get_player_division(data["my_player_id"]).get("division_players") or []
+    my_division = await get_player_division(data["my_player_id"])
+    players = (my_division or {}).get("division_players") or []
     opponent_name = "Соперник"
     for dp in players:
         p = dp.get("player") or dp
@@ -129,13 +130,13 @@ async def result_confirm_yes(callback: CallbackQuery, state: FSMContext, bot: Bo
     my_sets = data["my_sets"]
     opp_sets = data["opponent_sets"]
 
-    existing = get_existing_match(division_id, my_id, opponent_id)
+    existing = await get_existing_match(division_id, my_id, opponent_id)
     if existing and existing.get("status") == "played":
         await state.clear()
         await callback.message.edit_text("Этот матч уже был внесён ранее.")
         return
 
-    match_id, err = submit_match_for_confirmation(
+    match_id, err = await submit_match_for_confirmation(
         division_id=division_id,
         player1_id=my_id,
         player2_id=opponent_id,
@@ -10,6 +10,7 @@ from typing import Optional
 import aiohttp.web
 
 from services import scheduler
+from services.player_cache import player_cache
 
 logger = logging.getLogger(__name__)
 
@@ -101,12 +102,30 @@ async def handle_notify_open_game_request(request: aiohttp.web.Request) -> aioht
     return aiohttp.web.json_response({"ok": ok})
 
 
+async def handle_notify_player_updated(request: aiohttp.web.Request) -> aiohttp.web.Response:
+    """API сообщает о смене имени или рейтинга: сбросить кэш игроков."""
+    secret = _get_secret()
+    if secret and request.headers.get("X-Notify-Secret") != secret:
+        return aiohttp.web.json_response({"error": "unauthorized"}, status=401)
+    try:
+        body = await request.json()
+    except Exception as e:
+        logger.warning("notify-player-updated: invalid JSON: %s", e)
+        return aiohttp.web.json_response({"error": "invalid json"}, status=400)
+    player_ids = body.get("player_ids") if isinstance(body, dict) else None
+    if not player_ids or not isinstance(player_ids, list):
+        return aiohttp.web.json_response({"error": "player_ids required"}, status=400)
+    removed = sum(player_cache.invalidate(player_id=str(pid)) for pid in player_ids)
+    return aiohttp.web.json_response({"ok": True, "invalidated": removed})
+
+
 def create_app() -> aiohttp.web.Application:
     app = aiohttp.web.Application()
     app.router.add_post("/notify-pending-match", handle_notify_pending)
     app.router.add_post("/notify-game-request", handle_notify_game_request)
     app.router.add_post("/notify-game-request-accepted", handle_notify_game_request_accepted)
     app.router.add_post("/notify-open-game-request", handle_notify_open_game_request)
+    app.router.add_post("/notify-player-updated", handle_notify_player_updated)
     return app
 
 
@@ -1,11 +1,13 @@
 from .rating_calculator import (
     calculate_score_coef,
     calculate_match_rating,
+    calculate_match_ratings,
     calc_rating_delta,
 )
 
 __all__ = [
     "calculate_score_coef",
     "calculate_match_rating",
+    "calculate_match_ratings",
     "calc_rating_delta",
 ]
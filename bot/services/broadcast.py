@@ -0,0 +1,241 @@
+"""
+Рассылка сообщений в Telegram с учётом flood-лимитов.
+
+Telegram пропускает от бота около 30 сообщений в секунду суммарно и около
+одного сообщения в секунду в один чат; сверх этого отвечает RetryAfter.
+Broadcaster отправляет пачку сообщений так, чтобы в лимиты не упираться:
+- общий ограничитель скорости на бота (GCRA, rate/burst) и интервал на каждый чат;
+- не больше concurrency одновременных send_message;
+- RetryAfter приостанавливает общий ограничитель на retry_after секунд, сообщение
+  возвращается в очередь (слот конкурентности на время ожидания освобождается);
+- сетевые ошибки и 5xx повторяются с экспоненциальной задержкой, бот заблокирован
+  (Forbidden) — получатель отбрасывается, BadRequest — ошибка без повтора.
+Результат — DeliveryResult по каждому получателю; счётчики — /broadcaststats.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+logger = logging.getLogger(__name__)
+
+SENT = "sent"
+FAILED = "failed"
+DROPPED = "dropped"
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+@dataclass
+class OutgoingMessage:
+    chat_id: int
+    text: str
+    reply_markup: Any = None
+    # Ключ для сопоставления результата (id игрока, матча и т.п.)
+    key: Any = None
+
+
+@dataclass
+class DeliveryResult:
+    chat_id: int
+    key: Any
+    status: str
+    attempts: int
+    error: Optional[str] = None
+
+
+@dataclass
+class BroadcastReport:
+    results: list[DeliveryResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def _count(self, status: str) -> int:
+        return sum(1 for r in self.results if r.status == status)
+
+    @property
+    def sent(self) -> int:
+        return self._count(SENT)
+
+    @property
+    def failed(self) -> int:
+        return self._count(FAILED)
+
+    @property
+    def dropped(self) -> int:
+        return self._count(DROPPED)
+
+    @property
+    def throughput(self) -> float:
+        """Доставленных сообщений в секунду."""
+        return self.sent / self.elapsed if self.elapsed > 0 else float(self.sent)
+
+    def delivered_keys(self) -> list:
+        return [r.key for r in self.results if r.status == SENT]
+
+
+class RateLimiter:
+    """GCRA: не чаще rate в секунду, до burst сообщений подряд без ожидания."""
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.interval = 1.0 / rate
+        self.tolerance = (max(1, burst) - 1) * self.interval
+        self._clock = clock
+        self._tat = 0.0
+
+    def reserve(self) -> float:
+        """Занять слот; вернуть, сколько секунд подождать до отправки."""
+        now = self._clock()
+        tat = max(self._tat, now)
+        self._tat = tat + self.interval
+        return max(0.0, tat - self.tolerance - now)
+
+    def pause(self, seconds: float) -> None:
+        """Ничего не отправлять ближайшие seconds секунд (ответ RetryAfter)."""
+        self._tat = max(self._tat, self._clock() + seconds + self.tolerance)
+
+
+class Broadcaster:
+    def __init__(
+        self,
+        rate: float = 25.0,
+        burst: int = 5,
+        per_chat_interval: float = 1.0,
+        concurrency: int = 8,
+        max_attempts: int = 3,
+        max_retry_after: int = 5,
+        backoff_base: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.per_chat_interval = per_chat_interval
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.max_retry_after = max_retry_after
+        self.backoff_base = backoff_base
+        self._clock = clock
+        self._sleep = sleep
+        self._limiter = RateLimiter(rate, burst, clock)
+        self._chat_tat: dict[int, float] = {}
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+        self.retry_after = 0
+        self.broadcasts = 0
+        self.last_throughput = 0.0
+
+    def _chat_delay(self, chat_id: int) -> float:
+        now = self._clock()
+        if len(self._chat_tat) > 4096:
+            self._chat_tat = {c: t for c, t in self._chat_tat.items() if t > now}
+        tat = max(self._chat_tat.get(chat_id, now), now)
+        self._chat_tat[chat_id] = tat + self.per_chat_interval
+        return tat - now
+
+    async def _wait_turn(self, chat_id: int) -> None:
+        delay = max(self._limiter.reserve(), self._chat_delay(chat_id))
+        if delay > 0:
+            await self._sleep(delay)
+
+    async def _deliver(self, bot, msg: OutgoingMessage, slots: asyncio.Semaphore) -> DeliveryResult:
+        attempts = failures = flood_waits = 0
+        while True:
+            async with slots:
+                await self._wait_turn(msg.chat_id)
+                attempts += 1
+                try:
+                    await bot.send_message(msg.chat_id, msg.text, reply_markup=msg.reply_markup)
+                    return DeliveryResult(msg.chat_id, msg.key, SENT, attempts)
+                except TelegramRetryAfter as e:
+                    self.retry_after += 1
+                    flood_waits += 1
+                    self._limiter.pause(e.retry_after)
+                    if flood_waits > self.max_retry_after:
+                        return DeliveryResult(msg.chat_id, msg.key, FAILED, attempts, str(e))
+                    delay = float(e.retry_after)
+                except TelegramForbiddenError as e:
+                    return DeliveryResult(msg.chat_id, msg.key, DROPPED, attempts, str(e))
+                except (TelegramNetworkError, TelegramServerError) as e:
+                    failures += 1
+                    if failures >= self.max_attempts:
+                        return DeliveryResult(msg.chat_id, msg.key, FAILED, attempts, str(e))
+                    delay = self.backoff_base * 2 ** (failures - 1)
+                except TelegramAPIError as e:
+                    return DeliveryResult(msg.chat_id, msg.key, FAILED, attempts, str(e))
+                except Exception as e:
+                    logger.exception("send_message to %s crashed: %s", msg.chat_id, e)
+                    return DeliveryResult(msg.chat_id, msg.key, FAILED, attempts, str(e))
+            # Ждём вне семафора: остальные получатели тем временем идут своим чередом
+            self.retried += 1
+            await self._sleep(delay)
+
+    async def send(self, bot, messages: Iterable[OutgoingMessage]) -> BroadcastReport:
+        """Разослать сообщения; порядок results совпадает с порядком messages."""
+        messages = list(messages)
+        if not messages:
+            return BroadcastReport()
+        started = self._clock()
+        slots = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._deliver(bot, m, slots) for m in messages))
+        report = BroadcastReport(list(results), self._clock() - started)
+        self.sent += report.sent
+        self.failed += report.failed
+        self.dropped += report.dropped
+        self.broadcasts += 1
+        self.last_throughput = report.throughput
+        if report.failed or report.dropped:
+            logger.warning(
+                "Broadcast: %d sent, %d failed, %d dropped in %.1fs",
+                report.sent, report.failed, report.dropped, report.elapsed,
+            )
+        else:
+            logger.info("Broadcast: %d sent in %.1fs", report.sent, report.elapsed)
+        return report
+
+    def stats(self) -> dict:
+        return {
+            "broadcasts": self.broadcasts,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "retry_after": self.retry_after,
+            "last_throughput": round(self.last_throughput, 1),
+        }
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[str]:
+    """Разбить длинный текст по строкам на части не длиннее limit (лимит Telegram — 4096)."""
+    chunks: list[str] = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+broadcaster = Broadcaster(
+    rate=float(os.getenv("BROADCAST_RATE") or 25),
+    concurrency=int(os.getenv("BROADCAST_CONCURRENCY") or 8),
+)
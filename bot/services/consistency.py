@@ -0,0 +1,108 @@
+"""
+Отчёт о согласованности дивизионов: сыгранные матчи без двух записей в rating_history
+и расхождения totals в division_players с таблицей matches.
+
+Общий модуль для API (bot.services.consistency). Данные читаются сразу для пачки дивизионов
+(один дивизион или весь сезон) — три выборки на пачку, с точностью до страниц fetch_all,
+независимо от числа матчей и игроков. rating_history выбирается через встроенный matches!inner
+по division_id, без списка id матчей в URL. Сверка — по словарям, один проход по каждой выборке.
+iter_consistency_reports отдаёт отчёты по мере готовности пачек (для потоковой выдачи).
+"""
+from collections import Counter
+from typing import Iterable, Iterator, Optional
+
+from .pagination import fetch_all
+from .standings import STANDINGS_COLUMNS, compute_totals_by_division
+
+MATCH_COLUMNS = "id, division_id, player1_id, player2_id, sets_player1, sets_player2, status"
+HISTORY_COLUMNS = "id, match_id, match:matches!inner(division_id)"
+# Дивизионов на пачку: в сезоне их обычно меньше, т.е. весь сезон — три выборки
+DIVISION_BATCH = 20
+
+
+def load_consistency_input(client, division_ids: list[str]) -> dict:
+    """Сыгранные матчи, их записи rating_history и division_players набора дивизионов."""
+    return {
+        "matches": fetch_all(
+            lambda: client.table("matches")
+            .select(MATCH_COLUMNS)
+            .in_("division_id", division_ids)
+            .eq("status", "played")
+            .order("id")
+        ),
+        "history": fetch_all(
+            lambda: client.table("rating_history")
+            .select(HISTORY_COLUMNS)
+            .in_("match.division_id", division_ids)
+            .order("id")
+        ),
+        "division_players": fetch_all(
+            lambda: client.table("division_players")
+            .select(STANDINGS_COLUMNS)
+            .in_("division_id", division_ids)
+            .order("id")
+        ),
+    }
+
+
+def _totals_mismatch(row: dict, agg: dict[str, int]) -> Optional[dict]:
+    stored = {
+        "points": row.get("total_points") or 0,
+        "sets_won": row.get("total_sets_won") or 0,
+        "sets_lost": row.get("total_sets_lost") or 0,
+    }
+    if stored == agg:
+        return None
+    return {
+        "player_id": row.get("player_id"),
+        "division_player_id": row.get("id"),
+        "stored": stored,
+        "calculated": agg,
+    }
+
+
+def division_reports(
+    division_ids: Iterable[str],
+    matches: list[dict],
+    history: list[dict],
+    division_players: list[dict],
+) -> Iterator[dict]:
+    """
+    Отчёт по каждому дивизиону из division_ids (в том же порядке):
+    {"division_id", "missing_rating_history": [{"match_id", "history_rows"}], "totals_mismatches": [...]}.
+    """
+    history_rows = Counter(row.get("match_id") for row in history)
+    played_by_division: dict[str, list[str]] = {}
+    for m in matches:
+        if m.get("status") == "played":
+            played_by_division.setdefault(m.get("division_id"), []).append(m["id"])
+    dp_by_division: dict[str, list[dict]] = {}
+    for row in division_players:
+        dp_by_division.setdefault(row.get("division_id"), []).append(row)
+    totals_by_division = compute_totals_by_division(matches)
+
+    for division_id in division_ids:
+        totals = totals_by_division.get(division_id, {})
+        missing = [
+            {"match_id": mid, "history_rows": history_rows.get(mid, 0)}
+            for mid in played_by_division.get(division_id, [])
+            if history_rows.get(mid) != 2
+        ]
+        mismatches = []
+        for row in dp_by_division.get(division_id, []):
+            agg = totals.get(row.get("player_id")) or {"points": 0, "sets_won": 0, "sets_lost": 0}
+            mismatch = _totals_mismatch(row, agg)
+            if mismatch:
+                mismatches.append(mismatch)
+        yield {
+            "division_id": division_id,
+            "missing_rating_history": missing,
+            "totals_mismatches": mismatches,
+        }
+
+
+def iter_consistency_reports(client, division_ids: list[str], batch: int = DIVISION_BATCH) -> Iterator[dict]:
+    """Отчёты по дивизионам пачками по batch: три выборки на пачку, отчёты пачки — сразу после её чтения."""
+    for start in range(0, len(division_ids), batch):
+        chunk = division_ids[start:start + batch]
+        yield from division_reports(chunk, **load_consistency_input(client, chunk))
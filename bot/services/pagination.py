@@ -0,0 +1,23 @@
+"""
+Постраничное чтение выборок PostgREST.
+
+PostgREST отдаёт не больше max-rows строк за ответ (по умолчанию 1000) и молча обрезает
+остальное, поэтому выборки без верхней границы (весь сезон, вся история) читаются через
+fetch_all страницами range(). Общий модуль для бота (services.pagination) и API
+(bot.services.pagination).
+"""
+from typing import Callable
+
+PAGE_SIZE = 1000
+
+
+def fetch_all(build: Callable[[], object], page_size: int = PAGE_SIZE) -> list[dict]:
+    """Все строки выборки страницами по page_size.
+    build() — новый запрос с фиксированным порядком (order), чтобы страницы не перекрывались."""
+    rows: list[dict] = []
+    while True:
+        r = build().range(len(rows), len(rows) + page_size - 1).execute()
+        page = r.data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
@@ -0,0 +1,126 @@
+"""
+Кэш игроков по telegram_id в памяти процесса бота (LRU + TTL).
+
+Одно нажатие кнопки часто приводит к 2–3 одинаковым поискам игрока
+(хендлер, is_admin, вложенные вызовы), а строка players меняется редко.
+Инвалидация: create_player в боте и уведомление API (/notify-player-updated)
+после смены имени или рейтинга; TTL ограничивает устаревание на случай
+правок в обход API.
+
+Поиск в БД идёт без блокировки кэша, и инвалидация может прийти, пока запрос в пути.
+Чтобы старая строка не вернулась в кэш после инвалидации, generation() читается до запроса
+и передаётся в put: счётчик кэша растёт с каждой инвалидацией, и put ничего не записывает,
+если ключ инвалидировали после чтения. Отметки инвалидаций хранятся только для последних
+maxsize ключей; вытесненная отметка поднимает общую нижнюю границу (put старше неё
+отбрасывается), так что память не растёт с числом игроков.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class PlayerCache:
+    """Потокобезопасный LRU-кэш с TTL: telegram_id → строка players."""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Счётчик инвалидаций, отметки последних инвалидаций по ключам (LRU, не больше maxsize)
+        # и нижняя граница для вытесненных отметок и инвалидаций по player_id, которые не знают
+        # telegram_id ещё не закэшированных записей
+        self._tick = 0
+        self._invalidated: OrderedDict[int, int] = OrderedDict()
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, telegram_id: int) -> Optional[dict]:
+        with self._lock:
+            item = self._data.get(telegram_id)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, player = item
+            if expires_at <= self._clock():
+                del self._data[telegram_id]
+                self.misses += 1
+                return None
+            self._data.move_to_end(telegram_id)
+            self.hits += 1
+            return dict(player)
+
+    def generation(self, telegram_id: int) -> int:
+        """Поколение: прочитать до запроса в БД и передать в put."""
+        with self._lock:
+            return self._tick
+
+    def put(self, telegram_id: int, player: dict, generation: Optional[int] = None) -> None:
+        """Записать игрока; с generation — только если ключ с тех пор не инвалидировали."""
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and (
+                generation < self._floor or generation < self._invalidated.get(telegram_id, 0)
+            ):
+                return
+            self._data[telegram_id] = (self._clock() + self.ttl, dict(player))
+            self._data.move_to_end(telegram_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, telegram_id: Optional[int] = None, player_id: Optional[str] = None) -> int:
+        """Убрать записи по telegram_id и/или id игрока. Возвращает число удалённых."""
+        with self._lock:
+            keys = set()
+            if telegram_id is not None and telegram_id in self._data:
+                keys.add(telegram_id)
+            if player_id is not None:
+                keys.update(k for k, (_, p) in self._data.items() if p.get("id") == player_id)
+                self._tick += 1
+                self._floor = self._tick
+            if telegram_id is not None:
+                self._mark_invalidated(telegram_id)
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._invalidated.clear()
+            self._tick += 1
+            self._floor = self._tick
+
+    def _mark_invalidated(self, telegram_id: int) -> None:
+        self._tick += 1
+        self._invalidated[telegram_id] = self._tick
+        self._invalidated.move_to_end(telegram_id)
+        while len(self._invalidated) > max(self.maxsize, 1):
+            _, tick = self._invalidated.popitem(last=False)
+            self._floor = max(self._floor, tick)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "size": len(self._data),
+            }
+
+
+player_cache = PlayerCache(
+    maxsize=int(os.getenv("PLAYER_CACHE_SIZE") or 1024),
+    ttl=float(os.getenv("PLAYER_CACHE_TTL") or 60),
+)
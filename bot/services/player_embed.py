@@ -0,0 +1,58 @@
+"""
+Игроки вместе со строками, которые на них ссылаются (matches, game_requests), за один запрос.
+
+embed_players() — фрагмент select со встроенными игроками по внешним ключам:
+    select("id, status, " + embed_players("player1_id", "player2_id"))
+    → каждая строка содержит player1 / player2 = {id, name, telegram_id}.
+hydrate_players() — для строк, где игроков встроить нельзя (ответ RPC, старые выборки):
+все недостающие id одним запросом players.in_("id", ...), результат кладётся в строки
+под теми же ключами. Используется в боте и в API (bot.services.player_embed).
+"""
+from typing import Iterable
+
+PLAYER_FIELDS = "id, name, telegram_id"
+
+
+def player_alias(column: str) -> str:
+    """player1_id → player1, accepted_by_id → accepted_by; submitted_by → submitted_by_player."""
+    return column[:-3] if column.endswith("_id") else f"{column}_player"
+
+
+def embed_players(*columns: str, fields: str = PLAYER_FIELDS) -> str:
+    """'player1:players!player1_id(id, name, telegram_id), ...' для перечисленных FK-колонок."""
+    return ", ".join(f"{player_alias(c)}:players!{c}({fields})" for c in columns)
+
+
+def embedded_players(rows: Iterable[dict], *columns: str) -> dict[str, dict]:
+    """id → игрок из уже встроенных объектов строк."""
+    players: dict[str, dict] = {}
+    for row in rows:
+        for column in columns:
+            player = row.get(player_alias(column))
+            if isinstance(player, dict) and player.get("id"):
+                players[player["id"]] = player
+    return players
+
+
+def hydrate_players(
+    client,
+    rows: list[dict],
+    *columns: str,
+    fields: str = PLAYER_FIELDS,
+) -> dict[str, dict]:
+    """
+    Дополнить строки игроками по колонкам columns: встроенные берутся как есть,
+    недостающие — одним запросом in_ на все строки. Возвращает id → игрок.
+    Синхронная: в боте вызывать через run_sync.
+    """
+    players = embedded_players(rows, *columns)
+    # Ключ есть, но None — игрок уже искался (встроен null): повторно не запрашиваем
+    pending = [(row, column) for row in rows for column in columns if player_alias(column) not in row]
+    missing = sorted({row[column] for row, column in pending if row.get(column) and row[column] not in players})
+    if missing:
+        r = client.table("players").select(fields).in_("id", missing).execute()
+        players.update({p["id"]: p for p in r.data or []})
+    for row, column in pending:
+        row[player_alias(column)] = players.get(row.get(column))
+    return players
+
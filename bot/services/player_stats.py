@@ -0,0 +1,46 @@
+"""
+Статистика игроков для рейтинга (таблица player_match_stats, миграция 015).
+
+В БД агрегаты ведёт триггер на matches (±1 матч при переходе в played и обратно),
+поэтому /players/rating читает готовые строки, а не агрегирует всю историю матчей.
+Здесь — та же модель на Python и полная пересборка (/rebuildstats) через RPC
+refresh_player_stats. Запасного пути нет: таблицу и функцию создаёт одна миграция,
+и без неё пересобирать нечего — отсутствие функции поднимается как ошибка.
+"""
+from typing import Iterable
+
+
+def compute_player_stats(matches: Iterable[dict]) -> dict[str, dict]:
+    """
+    {player_id: {"games", "wins", "sets_won", "sets_lost", "last_played_at"}} по сыгранным матчам.
+    Как в player_stats (006): игра — любой played-матч, победа — сетов больше, чем у соперника.
+    """
+    stats: dict[str, dict] = {}
+    for m in matches:
+        if m.get("status", "played") != "played":
+            continue
+        s1 = int(m.get("sets_player1") or 0)
+        s2 = int(m.get("sets_player2") or 0)
+        played_at = m.get("played_at")
+        for pid, won, lost in ((m.get("player1_id"), s1, s2), (m.get("player2_id"), s2, s1)):
+            if pid is None:
+                continue
+            row = stats.get(pid)
+            if row is None:
+                row = stats[pid] = {"games": 0, "wins": 0, "sets_won": 0, "sets_lost": 0, "last_played_at": None}
+            row["games"] += 1
+            row["wins"] += 1 if won > lost else 0
+            row["sets_won"] += won
+            row["sets_lost"] += lost
+            if played_at and (row["last_played_at"] is None or played_at > row["last_played_at"]):
+                row["last_played_at"] = played_at
+    return stats
+
+
+def rebuild_player_stats(client) -> int:
+    """
+    Пересобрать player_match_stats по matches (после ручных правок в БД или для сверки).
+    Возвращает число изменённых строк.
+    """
+    r = client.rpc("refresh_player_stats", {}).execute()
+    return int(r.data or 0)
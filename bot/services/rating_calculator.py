@@ -6,9 +6,26 @@
 
 ПРв = (100 – (РТВ – РТП)) / 10 * КД * КС   (победитель)
 ПРп = -(100 – (РТВ – РТП)) / 20 * КД * КС   (проигравший)
+
+Единственная реализация для бота (services.rating_calculator) и API
+(bot.services.rating_calculator). Рейтинги и КД — numeric(…, 2), поэтому считаем в целых
+сотых: без Decimal на вызов, округление «к чётному» целочисленное (как Decimal.quantize
+и public.round_half_even в 014_confirm_match_rpc.sql). Значения не с двумя знаками
+после запятой считаются прежним путём через Decimal — результат совпадает бит в бит.
+Пакетный расчёт — calculate_match_ratings (массивы матчей).
 """
+from array import array
 from decimal import Decimal
-from typing import Tuple
+from math import copysign
+from typing import Optional, Sequence, Tuple
+
+# КС и КС×10 по счёту сетов (любой порядок); прочие счета — 1.0
+SCORE_COEF = {
+    (3, 0): 1.2, (0, 3): 1.2,
+    (3, 1): 1.0, (1, 3): 1.0,
+    (3, 2): 0.8, (2, 3): 0.8,
+}
+SCORE_COEF_X10 = {score: round(coef * 10) for score, coef in SCORE_COEF.items()}
 
 
 def calculate_score_coef(sets_p1: int, sets_p2: int) -> float:
@@ -16,14 +33,65 @@ def calculate_score_coef(sets_p1: int, sets_p2: int) -> float:
     КС по счёту сетов (любой порядок).
     ​3:0 или 0:3 → 1.2, 3:1 или 1:3 → 1.0, 3:2 или 2:3 → 0.8
     """
-    a, b = sets_p1, sets_p2
-    if (a == 3 and b == 0) or (a == 0 and b == 3):
-        return 1.2
-    if (a == 3 and b == 1) or (a == 1 and b == 3):
-        return 1.0
-    if (a == 3 and b == 2) or (a == 2 and b == 3):
-        return 0.8
-    return 1.0
+    return SCORE_COEF.get((sets_p1, sets_p2), 1.0)
+
+
+def to_centi(value, default: float = 0.0) -> int:
+    """Рейтинг / дельта / КД (numeric(…, 2)) → целое в сотых."""
+    return round(float(default if value is None else value) * 100)
+
+
+def exact_centi(value) -> Optional[int]:
+    """Целое в сотых, если value — ровно число с двумя знаками после запятой; иначе None."""
+    centi = round(value * 100)
+    return centi if centi / 100 == value else None
+
+
+def _div_half_even(n: int, d: int) -> int:
+    """n / d с округлением к чётному (d > 0)."""
+    q, r = divmod(n, d)
+    twice = 2 * r
+    if twice > d or (twice == d and q & 1):
+        q += 1
+    return q
+
+
+def match_deltas_centi(winner_centi: int, loser_centi: int, ks10: int, kd_centi: int) -> tuple[int, int]:
+    """
+    (ПРв, ПРп) в сотых. ПРв = (100 − (РТВ − РТП)) / 10 · КД · КС; в сотых это
+    (10000 − diff) · КД·100 · КС·10 / 10⁴, проигравшему — половина со знаком минус.
+    """
+    n = (10000 - (winner_centi - loser_centi)) * kd_centi * ks10
+    return _div_half_even(n, 10000), -_div_half_even(n, 20000)
+
+
+def _deltas_to_float(winner_centi: int, loser_centi: int, ks10: int, kd_centi: int, kd: float) -> Tuple[float, float]:
+    dw, dl = match_deltas_centi(winner_centi, loser_centi, ks10, kd_centi)
+    # Как float(Decimal): ноль у победителя со знаком произведения (100 − diff) · КД,
+    # у проигравшего после унарного минуса — всегда +0.0
+    if dw == 0 and (winner_centi - loser_centi > 10000) != (copysign(1.0, kd) < 0):
+        return (-0.0, dl / 100)
+    return (dw / 100, dl / 100)
+
+
+def _calculate_match_rating_decimal(
+    winner_rating: float,
+    loser_rating: float,
+    winner_sets: int,
+    loser_sets: int,
+    kd: float,
+) -> Tuple[float, float]:
+    rw = Decimal(str(winner_rating))
+    rl = Decimal(str(loser_rating))
+    kd_dec = Decimal(str(kd))
+    ks = Decimal(str(calculate_score_coef(winner_sets, loser_sets)))
+
+    diff = rw - rl
+    base = (Decimal("100") - diff) / Decimal("10")
+    delta_winner = (base * kd_dec * ks).quantize(Decimal("0.01"))
+    delta_loser = -(base / Decimal("2") * kd_dec * ks).quantize(Decimal("0.01"))
+
+    return (float(delta_winner), float(delta_loser))
 
 
 def calculate_match_rating(
@@ -43,17 +111,51 @@ def calculate_match_rating(
     """
     if winner_sets == 0 and loser_sets == 0:
         return (0.0, 0.0)
-    rw = Decimal(str(winner_rating))
-    rl = Decimal(str(loser_rating))
-    kd_dec = Decimal(str(kd))
-    ks = Decimal(str(calculate_score_coef(winner_sets, loser_sets)))
+    rw = exact_centi(winner_rating)
+    rl = exact_centi(loser_rating)
+    kd_centi = exact_centi(kd)
+    if rw is None or rl is None or kd_centi is None:
+        return _calculate_match_rating_decimal(winner_rating, loser_rating, winner_sets, loser_sets, kd)
+    return _deltas_to_float(rw, rl, SCORE_COEF_X10.get((winner_sets, loser_sets), 10), kd_centi, kd)
 
-    diff = rw - rl
-    base = (Decimal("100") - diff) / Decimal("10")
-    delta_winner = (base * kd_dec * ks).quantize(Decimal("0.01"))
-    delta_loser = -(base / Decimal("2") * kd_dec * ks).quantize(Decimal("0.01"))
 
-    return (float(delta_winner), float(delta_loser))
+def calculate_match_ratings(
+    winner_ratings: Sequence[float],
+    loser_ratings: Sequence[float],
+    winner_sets: Sequence[int],
+    loser_sets: Sequence[int],
+    kds: Sequence[float],
+) -> tuple[array, array]:
+    """
+    Пакетный calculate_match_rating: i-й матч — i-е элементы последовательностей
+    (list, array). Возвращает два array("d"): дельты победителей и проигравших.
+    КД переводится в сотые один раз на значение, сам расчёт — без вызовов функций.
+    """
+    n = len(winner_ratings)
+    deltas_w = array("d", bytes(8 * n))
+    deltas_l = array("d", bytes(8 * n))
+    kd_centi_by_kd: dict[float, Optional[int]] = {}
+    for i, (rw_f, rl_f, ws, ls, kd) in enumerate(zip(winner_ratings, loser_ratings, winner_sets, loser_sets, kds)):
+        if ws == 0 and ls == 0:
+            continue
+        kd_centi = kd_centi_by_kd.get(kd, 0)
+        if kd_centi == 0:
+            kd_centi = kd_centi_by_kd[kd] = exact_centi(kd)
+        rw, rl = round(rw_f * 100), round(rl_f * 100)
+        if not kd_centi or rw / 100 != rw_f or rl / 100 != rl_f:
+            # Не два знака после запятой или КД = 0 (знак нуля) — одиночный расчёт
+            deltas_w[i], deltas_l[i] = calculate_match_rating(rw_f, rl_f, ws, ls, kd)
+            continue
+        num = (10000 - rw + rl) * kd_centi * SCORE_COEF_X10.get((ws, ls), 10)
+        dw, r = divmod(num, 10000)
+        if 2 * r > 10000 or (2 * r == 10000 and dw & 1):
+            dw += 1
+        dl, r = divmod(num, 20000)
+        if 2 * r > 20000 or (2 * r == 20000 and dl & 1):
+            dl += 1
+        deltas_w[i] = -0.0 if dw == 0 and num < 0 else dw / 100
+        deltas_l[i] = -dl / 100 if dl else 0.0
+    return deltas_w, deltas_l
 
 
 # Обратная совместимость со старыми именами
@@ -0,0 +1,308 @@
+"""
+Переигровка рейтинга по всей истории: после правки формулы или данных матчей.
+
+Сыгранные матчи берутся в хронологическом порядке (played_at, затем created_at, id),
+рейтинги игроков проходят через них заново по формуле ФНТР (целочисленный путь
+services.rating_calculator). Состояние — массивы (array) целых в сотых долях очка:
+рейтинг игрока по индексу, по матчу — индексы победителя и проигравшего, рейтинги
+до матча и дельты. Без Decimal на каждый матч; результат совпадает с
+calculate_match_rating бит в бит.
+
+Стартовый рейтинг игрока — rating_before его самой ранней записи rating_history,
+без истории — DEFAULT_RATING. Итог сравнивается с сохранённым (build_replay_diff):
+players.rating, строки rating_history (изменённые, недостающие, лишние) и
+division_players.rating_delta. apply_replay_diff записывает разницу bulk-запросами.
+Запускается из scripts/replay_ratings.py (bot.services.rating_replay); бенчмарк — scripts/bench_rating_replay.py.
+"""
+import logging
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from .pagination import fetch_all
+from .rating_calculator import SCORE_COEF_X10, to_centi
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATING = 100.0
+DEFAULT_COEF = 0.25
+WRITE_CHUNK = 500
+
+MATCH_COLUMNS = "id, division_id, player1_id, player2_id, sets_player1, sets_player2, played_at, created_at"
+HISTORY_COLUMNS = "id, player_id, match_id, season_id, rating_before, rating_delta, rating_after, created_at"
+
+
+def chronological_key(match: dict) -> tuple:
+    return (match.get("played_at") or match.get("created_at") or "", match.get("id") or "")
+
+
+@dataclass
+class Replay:
+    """Результат переигровки: траектории по матчам и итоговые рейтинги (всё в сотых)."""
+
+    player_ids: list[str]
+    ratings: array  # итоговый рейтинг игрока по индексу
+    matches: list[dict]  # сыгранные матчи в порядке переигровки
+    winners: array
+    losers: array
+    winner_before: array
+    loser_before: array
+    winner_delta: array
+    loser_delta: array
+
+    def final_ratings(self) -> dict[str, float]:
+        return {pid: self.ratings[i] / 100 for i, pid in enumerate(self.player_ids)}
+
+    def history_rows(self, season_by_division: dict[str, Optional[str]]) -> Iterable[dict]:
+        """Строки rating_history, которые дала бы переигровка (по две на матч)."""
+        ids = self.player_ids
+        for k, m in enumerate(self.matches):
+            season_id = season_by_division.get(m.get("division_id"))
+            for idx, before, delta in (
+                (self.winners[k], self.winner_before[k], self.winner_delta[k]),
+                (self.losers[k], self.loser_before[k], self.loser_delta[k]),
+            ):
+                yield {
+                    "player_id": ids[idx],
+                    "match_id": m["id"],
+                    "season_id": season_id,
+                    "rating_before": before / 100,
+                    "rating_delta": delta / 100,
+                    "rating_after": (before + delta) / 100,
+                }
+
+    def division_deltas(self) -> dict[tuple[str, str], int]:
+        """(division_id, player_id) → сумма дельт за дивизион, в сотых."""
+        totals: dict[tuple[str, str], int] = {}
+        ids = self.player_ids
+        for k, m in enumerate(self.matches):
+            division_id = m.get("division_id")
+            for key, delta in (
+                ((division_id, ids[self.winners[k]]), self.winner_delta[k]),
+                ((division_id, ids[self.losers[k]]), self.loser_delta[k]),
+            ):
+                totals[key] = totals.get(key, 0) + delta
+        return totals
+
+
+def seed_ratings(history: Iterable[dict]) -> dict[str, float]:
+    """Стартовый рейтинг игрока: rating_before самой ранней записи rating_history."""
+    earliest: dict[str, tuple] = {}
+    for row in history:
+        pid = row.get("player_id")
+        if pid is None or row.get("rating_before") is None:
+            continue
+        key = (row.get("created_at") or "", row.get("id") or "")
+        if pid not in earliest or key < earliest[pid][0]:
+            earliest[pid] = (key, row["rating_before"])
+    return {pid: float(before) for pid, (_, before) in earliest.items()}
+
+
+def replay_matches(
+    matches: Iterable[dict],
+    seeds: dict[str, float],
+    coefs: dict[str, float],
+    default_rating: float = DEFAULT_RATING,
+) -> Replay:
+    """
+    Переиграть сыгранные матчи по порядку. seeds — стартовые рейтинги, coefs — КД
+    дивизионов (нет в словаре — DEFAULT_COEF). Победитель — игрок с большим числом сетов
+    (при равенстве — player2, как в _apply_match_result_as_played); 0:0 — без изменения.
+    """
+    ordered = sorted(
+        (m for m in matches if m.get("player1_id") and m.get("player2_id")),
+        key=chronological_key,
+    )
+    n = len(ordered)
+    index: dict[str, int] = {}
+    player_ids: list[str] = []
+    ratings = array("q")
+    kd_by_division = {div_id: to_centi(coef, DEFAULT_COEF) for div_id, coef in coefs.items()}
+    default_kd = to_centi(DEFAULT_COEF)
+
+    # Проход 1: матчи → столбцы (индексы игроков, множитель КС·10 × КД·100; 0:0 → 0)
+    winners = array("l", [0]) * n
+    losers = array("l", [0]) * n
+    factors = array("q", [0]) * n
+    for k, m in enumerate(ordered):
+        pair = []
+        for pid in (m["player1_id"], m["player2_id"]):
+            i = index.get(pid)
+            if i is None:
+                i = index[pid] = len(player_ids)
+                player_ids.append(pid)
+                ratings.append(to_centi(seeds.get(pid, default_rating)))
+            pair.append(i)
+        s1 = int(m.get("sets_player1") or 0)
+        s2 = int(m.get("sets_player2") or 0)
+        if s1 > s2:
+            winners[k], losers[k], ws, ls = pair[0], pair[1], s1, s2
+        else:
+            winners[k], losers[k], ws, ls = pair[1], pair[0], s2, s1
+        if ws or ls:
+            factors[k] = SCORE_COEF_X10.get((ws, ls), 10) * kd_by_division.get(m.get("division_id"), default_kd)
+
+    # Проход 2: только целые и массивы — rating_calculator.match_deltas_centi, развёрнутая в цикл
+    winner_before = array("q", [0]) * n
+    loser_before = array("q", [0]) * n
+    winner_delta = array("q", [0]) * n
+    loser_delta = array("q", [0]) * n
+    for k in range(n):
+        w, l = winners[k], losers[k]
+        rw, rl = ratings[w], ratings[l]
+        num = (10000 - rw + rl) * factors[k]
+        dw, r = divmod(num, 10000)
+        if 2 * r > 10000 or (2 * r == 10000 and dw & 1):
+            dw += 1
+        dl, r = divmod(num, 20000)
+        if 2 * r > 20000 or (2 * r == 20000 and dl & 1):
+            dl += 1
+        winner_before[k], loser_before[k] = rw, rl
+        winner_delta[k], loser_delta[k] = dw, -dl
+        ratings[w] = rw + dw
+        ratings[l] = rl - dl
+
+    return Replay(
+        player_ids=player_ids,
+        ratings=ratings,
+        matches=ordered,
+        winners=winners,
+        losers=losers,
+        winner_before=winner_before,
+        loser_before=loser_before,
+        winner_delta=winner_delta,
+        loser_delta=loser_delta,
+    )
+
+
+def _history_differs(stored: dict, expected: dict) -> bool:
+    return any(
+        to_centi(stored.get(col)) != to_centi(expected[col])
+        for col in ("rating_before", "rating_delta", "rating_after")
+    ) or stored.get("season_id") != expected["season_id"]
+
+
+def build_replay_diff(
+    replay: Replay,
+    players: Iterable[dict],
+    history: Iterable[dict],
+    dp_rows: Iterable[dict],
+    season_by_division: dict[str, Optional[str]],
+) -> dict:
+    """
+    Разница переигровки с сохранёнными данными. Ключи:
+    player_changes — отчёт {player_id, name, stored, replayed};
+    player_updates — строки players для upsert (id, name, telegram_id, rating);
+    history_updates / history_inserts — строки rating_history (с id / без id);
+    history_stale — id записей rating_history по матчам, которых нет среди сыгранных;
+    division_players — строки для upsert rating_delta.
+    Игроки без сыгранных матчей не трогаются.
+    """
+    final = replay.final_ratings()
+    player_changes, player_updates = [], []
+    for p in players:
+        pid = p.get("id")
+        if pid not in final:
+            continue
+        replayed = final[pid]
+        if to_centi(p.get("rating"), DEFAULT_RATING) == to_centi(replayed):
+            continue
+        player_changes.append({"player_id": pid, "name": p.get("name"), "stored": p.get("rating"), "replayed": replayed})
+        player_updates.append({"id": pid, "name": p.get("name"), "telegram_id": p.get("telegram_id"), "rating": replayed})
+
+    stored_by_key: dict[tuple[str, str], dict] = {}
+    history_stale = []
+    replayed_matches = {m["id"] for m in replay.matches}
+    for row in history:
+        key = (row.get("match_id"), row.get("player_id"))
+        if row.get("match_id") is None:
+            continue  # ручные корректировки без матча не трогаем
+        if row.get("match_id") not in replayed_matches or key in stored_by_key:
+            history_stale.append(row["id"])
+            continue
+        stored_by_key[key] = row
+
+    history_updates, history_inserts = [], []
+    for expected in replay.history_rows(season_by_division):
+        stored = stored_by_key.pop((expected["match_id"], expected["player_id"]), None)
+        if stored is None:
+            history_inserts.append(expected)
+        elif _history_differs(stored, expected):
+            history_updates.append({"id": stored["id"], **expected})
+    # Запись по матчу есть, но игрок в нём не участвует
+    history_stale.extend(row["id"] for row in stored_by_key.values())
+
+    deltas = replay.division_deltas()
+    division_players = []
+    for row in dp_rows:
+        expected = deltas.get((row.get("division_id"), row.get("player_id")), 0)
+        if to_centi(row.get("rating_delta")) != expected:
+            division_players.append({
+                "id": row["id"],
+                "division_id": row["division_id"],
+                "player_id": row["player_id"],
+                "rating_delta": expected / 100,
+            })
+
+    return {
+        "player_changes": player_changes,
+        "player_updates": player_updates,
+        "history_updates": history_updates,
+        "history_inserts": history_inserts,
+        "history_stale": history_stale,
+        "division_players": division_players,
+    }
+
+
+def load_replay_input(client) -> dict:
+    """Всё для переигровки за константное число запросов (с точностью до страниц)."""
+    return {
+        "matches": fetch_all(
+            lambda: client.table("matches").select(MATCH_COLUMNS).eq("status", "played").order("id")
+        ),
+        "divisions": fetch_all(lambda: client.table("divisions").select("id, season_id, coef").order("id")),
+        "history": fetch_all(lambda: client.table("rating_history").select(HISTORY_COLUMNS).order("id")),
+        "players": fetch_all(lambda: client.table("players").select("id, name, telegram_id, rating").order("id")),
+        "division_players": fetch_all(
+            lambda: client.table("division_players").select("id, division_id, player_id, rating_delta").order("id")
+        ),
+    }
+
+
+def _chunks(rows: list, size: int = WRITE_CHUNK) -> Iterable[list]:
+    for start in range(0, len(rows), size):
+        yield rows[start: start + size]
+
+
+def apply_replay_diff(client, diff: dict) -> int:
+    """Записать разницу bulk-запросами (upsert / insert / delete пачками). Возвращает число строк."""
+    written = 0
+    for chunk in _chunks(diff["player_updates"]):
+        client.table("players").upsert(chunk, on_conflict="id").execute()
+        written += len(chunk)
+    for chunk in _chunks(diff["history_updates"]):
+        client.table("rating_history").upsert(chunk, on_conflict="id").execute()
+        written += len(chunk)
+    for chunk in _chunks(diff["history_inserts"]):
+        client.table("rating_history").insert(chunk).execute()
+        written += len(chunk)
+    for chunk in _chunks(diff["history_stale"]):
+        client.table("rating_history").delete().in_("id", chunk).execute()
+        written += len(chunk)
+    for chunk in _chunks(diff["division_players"]):
+        client.table("division_players").upsert(chunk, on_conflict="id").execute()
+        written += len(chunk)
+    return written
+
+
+def replay_ratings(client, write: bool = False) -> tuple[Replay, dict]:
+    """Переиграть всю историю; write=True — записать разницу в БД."""
+    data = load_replay_input(client)
+    coefs = {d["id"]: d.get("coef") for d in data["divisions"]}
+    season_by_division = {d["id"]: d.get("season_id") for d in data["divisions"]}
+    replay = replay_matches(data["matches"], seed_ratings(data["history"]), coefs)
+    diff = build_replay_diff(replay, data["players"], data["history"], data["division_players"], season_by_division)
+    if write:
+        written = apply_replay_diff(client, diff)
+        logger.info("Переигровка рейтинга: записано %s строк", written)
+    return replay, diff
@@ -12,6 +12,13 @@ from typing import Optional, TYPE_CHECKING
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
+from services.broadcast import OutgoingMessage, broadcaster, split_message
+from services.pagination import fetch_all
+from services.player_embed import embed_players, hydrate_players
+from services.season_plan import apply_season_plan, format_season_plan, load_season_plan
+from services.standings import rank_division, recalc_divisions_standings
+from services.supabase_client import execute, run_sync
+
 if TYPE_CHECKING:
     from aiogram import Bot
 
@@ -19,12 +26,6 @@ logger = logging.getLogger(__name__)
 _scheduler: Optional[AsyncIOScheduler] = None
 _bot: Optional["Bot"] = None
 
-MONTH_NAMES = [
-    "", "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь",
-]
-DIVISION_COEFS = {1: 0.30, 2: 0.27, 3: 0.25, 4: 0.22}
-
 
 def _get_client():
     from services.supabase_client import _get_client as get
@@ -37,16 +38,8 @@ def _is_last_day_of_month() -> bool:
     return now.day == last
 
 
-async def close_tour(bot: Optional["Bot"] = None) -> str:
-    """
-    1. Найти активный сезон
-    2. pending матчи → not_played, 0-0
-    3. По каждому дивизиону: позиции (очки, разница сетов)
-    4. Обновить position в division_players
-    5. Рейтинг уже обновляется после каждого матча
-    6. season.status = 'closed'
-    7. Сообщение в Telegram ADMIN_TELEGRAM_ID с итогами
-    """
+def _close_tour_sync(dry_run: bool) -> Optional[str]:
+    """Шаги 1–6 close_tour (запросы к БД, выполняются в пуле потоков). None — нет активного сезона."""
     client = _get_client()
     season_r = (
         client.table("seasons")
@@ -58,211 +51,214 @@ async def close_tour(bot: Optional["Bot"] = None) -> str:
         .execute()
     )
     if not season_r.data or len(season_r.data) == 0:
-        return "Нет активного сезона."
+        return None
 
     season = season_r.data[0]
     season_id = season["id"]
     season_name = season.get("name", "")
 
-    # 2. Все pending и pending_confirm матчи в дивизионах этого сезона → not_played, 0-0
-    divs_r = client.table("divisions").select("id").eq("season_id", season_id).execute()
-    for d in divs_r.data or []:
-        for status in ("pending", "pending_confirm"):
-            client.table("matches").update({
-                "status": "not_played",
-                "sets_player1": 0,
-                "sets_player2": 0,
-                "submitted_by": None,
-                "notification_sent_at": None,
-            }).eq("division_id", d["id"]).eq("status", status).execute()
-
-    # 3–4. Позиции в каждом дивизионе: очки → личная встреча → разница сетов
-    lines = [f"📋 <b>Тур закрыт: {season_name}</b>\n"]
-    for d in divs_r.data or []:
-        div_id = d["id"]
-        dps_r = (
-            client.table("division_players")
-            .select("id, player_id, total_points, total_sets_won, total_sets_lost")
-            .eq("division_id", div_id)
-            .execute()
+    # 2. Данные сезона — константное число запросов
+    divs_r = (
+        client.table("divisions")
+        .select("id, number")
+        .eq("season_id", season_id)
+        .order("number")
+        .execute()
+    )
+    divisions = divs_r.data or []
+    div_ids = [d["id"] for d in divisions]
+    dp_by_div: dict[str, list[dict]] = {}
+    matches_by_div: dict[str, list[dict]] = {}
+    id_to_name: dict[str, str] = {}
+    if div_ids:
+        # Весь сезон может не поместиться в один ответ PostgREST (max-rows) — читаем страницами
+        dps = fetch_all(
+            lambda: client.table("division_players")
+            .select("id, division_id, player_id, total_points, total_sets_won, total_sets_lost")
+            .in_("division_id", div_ids)
+            .order("id")
         )
-        rows = dps_r.data or []
-        if not rows:
-            continue
-        matches_r = (
-            client.table("matches")
-            .select("player1_id, player2_id, sets_player1, sets_player2")
-            .eq("division_id", div_id)
+        for row in dps:
+            dp_by_div.setdefault(row["division_id"], []).append(row)
+        matches = fetch_all(
+            lambda: client.table("matches")
+            .select("id, division_id, player1_id, player2_id, sets_player1, sets_player2")
+            .in_("division_id", div_ids)
             .eq("status", "played")
-            .execute()
+            .order("id")
         )
-        matches = matches_r.data or []
-
-        def sort_key(r):
-            pts = r.get("total_points") or 0
-            sw = r.get("total_sets_won") or 0
-            sl = r.get("total_sets_lost") or 0
-            return (-pts, -(sw - sl))
-
-        rows.sort(key=sort_key)
-
-        i = 0
-        while i < len(rows):
-            j = i
-            while j < len(rows) and sort_key(rows[j]) == sort_key(rows[i]):
-                j += 1
-            if j - i > 1:
-                group = rows[i:j]
-                group_ids = {r["player_id"] for r in group}
-                wins = {r["player_id"]: 0 for r in group}
-                for m in matches:
-                    p1, p2 = m["player1_id"], m["player2_id"]
-                    if p1 not in group_ids or p2 not in group_ids:
-                        continue
-                    s1, s2 = m.get("sets_player1") or 0, m.get("sets_player2") or 0
-                    if s1 > s2:
-                        wins[p1] = wins.get(p1, 0) + 1
-                    elif s2 > s1:
-                        wins[p2] = wins.get(p2, 0) + 1
-                group.sort(key=lambda r: wins.get(r["player_id"], 0), reverse=True)
-                rows[i:j] = group
-            i = j
-
-        for pos, row in enumerate(rows, 1):
-            client.table("division_players").update({"position": pos}).eq("id", row["id"]).execute()
-        div_num_r = client.table("divisions").select("number").eq("id", div_id).execute()
-        div_num = div_num_r.data[0].get("number", "") if div_num_r.data else ""
-        dp_player_ids = [r["player_id"] for r in rows]
-        names_r = client.table("players").select("id, name").in_("id", dp_player_ids).execute()
-        id_to_name = {p["id"]: p["name"] for p in (names_r.data or [])}
-        lines.append(f"\n<b>Дивизион {div_num}</b>")
+        for m in matches:
+            matches_by_div.setdefault(m["division_id"], []).append(m)
+        player_ids = list({row["player_id"] for rows in dp_by_div.values() for row in rows})
+        if player_ids:
+            names = fetch_all(
+                lambda: client.table("players").select("id, name").in_("id", player_ids).order("id")
+            )
+            id_to_name = {p["id"]: p["name"] for p in names}
+
+    # 3. Позиции в памяти
+    title = "Предпросмотр закрытия тура" if dry_run else "Тур закрыт"
+    lines = [f"📋 <b>{title}: {season_name}</b>\n"]
+    position_updates = []
+    for d in divisions:
+        rows = dp_by_div.get(d["id"])
+        if not rows:
+            continue
+        rows = rank_division(rows, matches_by_div.get(d["id"], []))
+        lines.append(f"\n<b>Дивизион {d.get('number', '')}</b>")
         for pos, row in enumerate(rows, 1):
+            position_updates.append({
+                "id": row["id"],
+                "division_id": row["division_id"],
+                "player_id": row["player_id"],
+                "position": pos,
+            })
             name = id_to_name.get(row["player_id"], "—")
             pts = row.get("total_points") or 0
             lines.append(f"  {pos}. {name} — {pts} очк.")
 
+    report = "\n".join(lines)
+    if dry_run:
+        return report
+
+    # 4. Все pending и pending_confirm матчи в дивизионах этого сезона → not_played, 0-0
+    if div_ids:
+        client.table("matches").update({
+            "status": "not_played",
+            "sets_player1": 0,
+            "sets_player2": 0,
+            "submitted_by": None,
+            "notification_sent_at": None,
+        }).in_("division_id", div_ids).in_("status", ["pending", "pending_confirm"]).execute()
+
+    # 5. Позиции одним upsert
+    if position_updates:
+        client.table("division_players").upsert(position_updates, on_conflict="id").execute()
+
     # 6. Закрыть сезон
     client.table("seasons").update({"status": "closed"}).eq("id", season_id).execute()
 
-    report = "\n".join(lines)
+    return report
+
+
+async def close_tour(bot: Optional["Bot"] = None, dry_run: bool = False) -> str:
+    """
+    1. Найти активный сезон
+    2. Одним пакетом прочитать дивизионы, division_players, сыгранные матчи и имена игроков
+    3. Позиции в каждом дивизионе считаются в памяти (очки → личная встреча → разница сетов)
+    4. pending / pending_confirm матчи → not_played, 0-0 (один UPDATE на весь сезон)
+    5. position в division_players — один bulk upsert
+    6. season.status = 'closed'
+    7. Сообщение в Telegram ADMIN_TELEGRAM_ID с итогами (через broadcaster, длинный отчёт — частями)
+    Число запросов не зависит от числа дивизионов и игроков.
+    dry_run=True: только отчёт (шаги 4–7 пропускаются).
+    """
+    report = await run_sync(_close_tour_sync, dry_run)
+    if report is None:
+        return "Нет активного сезона."
+    if dry_run:
+        return report
 
     # 7. Сообщение админу
     admin_id = os.getenv("ADMIN_TELEGRAM_ID")
     if admin_id and bot:
-        try:
-            await bot.send_message(int(admin_id.strip()), report)
-        except Exception as e:
-            logger.warning("Не удалось отправить отчёт админу: %s", e)
+        chat_id = int(admin_id.strip())
+        sent = await broadcaster.send(bot, [OutgoingMessage(chat_id, part) for part in split_message(report)])
+        if sent.failed or sent.dropped:
+            errors = "; ".join(r.error or "" for r in sent.results if r.error)
+            logger.warning("Не удалось отправить отчёт админу: %s", errors)
 
     return report
 
 
-def prepare_next_season() -> Optional[str]:
+def _prepare_next_season_sync() -> Optional[str]:
+    client = _get_client()
+    plan = load_season_plan(client)
+    if not plan:
+        return None
+    return apply_season_plan(client, plan)
+
+
+def _preview_next_season_sync() -> str:
+    client = _get_client()
+    plan = load_season_plan(client)
+    if not plan:
+        return "Нет закрытого сезона."
+    player_ids = [p["player_id"] for d in plan["divisions"] for p in d["players"]]
+    id_to_name = {}
+    if player_ids:
+        names_r = client.table("players").select("id, name").in_("id", player_ids).execute()
+        id_to_name = {p["id"]: p["name"] for p in (names_r.data or [])}
+    return format_season_plan(plan, id_to_name)
+
+
+async def prepare_next_season() -> Optional[str]:
     """
     Создать следующий сезон с ротацией:
     топ-2 из дивизиона N → дивизион N-1, последние 2 → N+1.
     Если в дивизионе >8 игроков — двигать по 3.
+    План считается в памяти и пишется одним upsert на таблицу; повторный запуск безопасен.
     """
-    client = _get_client()
-    closed_r = (
-        client.table("seasons")
-        .select("*")
-        .eq("status", "closed")
-        .order("year", desc=True)
-        .order("month", desc=True)
-        .limit(1)
-        .execute()
-    )
-    if not closed_r.data:
-        return None
-    closed = closed_r.data[0]
-    year, month = closed["year"], closed["month"]
-    if month == 12:
-        next_year, next_month = year + 1, 1
-    else:
-        next_year, next_month = year, month + 1
-    next_name = f"{MONTH_NAMES[next_month]} {next_year}"
-
-    new_season_r = client.table("seasons").insert({
-        "year": next_year,
-        "month": next_month,
-        "name": next_name,
-        "status": "active",
-    }).execute()
-    if not new_season_r.data:
-        return None
-    new_season_id = new_season_r.data[0]["id"]
+    return await run_sync(_prepare_next_season_sync)
 
-    old_divs_r = (
-        client.table("divisions")
-        .select("id, number")
-        .eq("season_id", closed["id"])
-        .order("number")
-        .execute()
+
+async def preview_next_season() -> str:
+    """План следующего сезона без записи в БД."""
+    return await run_sync(_preview_next_season_sync)
+
+
+# Соперник и автор результата — всегда player1/player2, поэтому они встроены в выборку матча
+PENDING_CONFIRM_SELECT = (
+    "id, status, player1_id, player2_id, sets_player1, sets_player2, submitted_by, notification_sent_at, "
+    + embed_players("player1_id", "player2_id")
+)
+
+
+def _pending_confirm_message(m: dict, players: dict[str, dict], webapp_url: str) -> Optional[OutgoingMessage]:
+    """Сообщение сопернику (не submitted_by) со ссылкой на подтверждение; None — у соперника нет telegram_id."""
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+    submitted_by = m.get("submitted_by")
+    p1, p2 = m.get("player1_id"), m.get("player2_id")
+    opponent_id = p2 if submitted_by == p1 else p1
+    opponent = players.get(opponent_id) or {}
+    if opponent.get("telegram_id") is None:
+        logger.warning("No telegram_id for opponent %s, match %s", opponent_id, m["id"])
+        return None
+    submitter_name = (players.get(submitted_by) or {}).get("name") or "Игрок"
+    score = f"{m.get('sets_player1') or 0}:{m.get('sets_player2') or 0}"
+    text = (
+        f"{submitter_name} внёс результат вашего матча: {score}. "
+        "Подтвердите или отклоните результат."
     )
-    old_divs = {d["number"]: d["id"] for d in (old_divs_r.data or [])}
-    if not old_divs:
-        return new_season_id
-
-    nums = sorted(old_divs.keys())
-    new_div_ids = {}
-    for num in nums:
-        coef = DIVISION_COEFS.get(num, 0.22)
-        r = client.table("divisions").insert({
-            "season_id": new_season_id,
-            "number": num,
-            "coef": coef,
-        }).execute()
-        if r.data:
-            new_div_ids[num] = r.data[0]["id"]
-
-    # По каждому старому дивизиону: разбить на promoted, stay, relegated
-    def get_ordered_players(division_id):
-        r = (
-            client.table("division_players")
-            .select("player_id, position, total_points, total_sets_won, total_sets_lost")
-            .eq("division_id", division_id)
-            .execute()
+    kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="Подтвердить / Отклонить", url=f"{webapp_url}#/confirm-match/{m['id']}")],
+    ])
+    return OutgoingMessage(int(opponent["telegram_id"]), text, reply_markup=kb, key=m["id"])
+
+
+async def _notify_pending_confirm(client, bot: "Bot", matches: list[dict], webapp_url: str) -> int:
+    """
+    Разослать уведомления по матчам pending_confirm: игроки встроены в matches
+    (PENDING_CONFIRM_SELECT; иначе — один запрос in_), сообщения уходят через broadcaster,
+    notification_sent_at ставится одним UPDATE только доставленным. Возвращает число отправленных.
+    """
+    if not matches:
+        return 0
+    players = await run_sync(hydrate_players, client, matches, "player1_id", "player2_id")
+    messages = [msg for msg in (_pending_confirm_message(m, players, webapp_url) for m in matches) if msg]
+    report = await broadcaster.send(bot, messages)
+    sent_ids = report.delivered_keys()
+    if sent_ids:
+        now_iso = datetime.now(timezone.utc).isoformat()
+        await execute(
+            client.table("matches")
+            .update({"notification_sent_at": now_iso})
+            .in_("id", sent_ids)
+            .is_("notification_sent_at", "null")
         )
-        rows = r.data or []
-        # 1 = лучший: сначала по position, затем по очкам и разнице сетов
-        rows.sort(key=lambda x: (x.get("position") or 99, -(x.get("total_points") or 0), -((x.get("total_sets_won") or 0) - (x.get("total_sets_lost") or 0))))
-        return [x["player_id"] for x in rows]
-
-    for num in nums:
-        old_div_id = old_divs[num]
-        new_div_id = new_div_ids.get(num)
-        if not new_div_id:
-            continue
-        player_ids = get_ordered_players(old_div_id)
-        n = len(player_ids)
-        move_count = 3 if n > 8 else 2
-        promoted = player_ids[:move_count]
-        relegated = player_ids[-move_count:] if n >= move_count else []
-        stay = player_ids[move_count:n - move_count] if n > 2 * move_count else []
-
-        # В новый дивизион num попадают: stay + relegated из (num-1) + promoted из (num+1)
-        into_this = list(stay)
-        if num - 1 in old_divs:
-            prev_players = get_ordered_players(old_divs[num - 1])
-            prev_n = len(prev_players)
-            prev_move = 3 if prev_n > 8 else 2
-            into_this.extend(prev_players[-prev_move:] if prev_n >= prev_move else [])
-        if num + 1 in old_divs:
-            next_players = get_ordered_players(old_divs[num + 1])
-            next_move = 3 if len(next_players) > 8 else 2
-            into_this.extend(next_players[:next_move])
-
-        for pid in into_this:
-            try:
-                client.table("division_players").insert({
-                    "division_id": new_div_id,
-                    "player_id": pid,
-                }).execute()
-            except Exception:
-                pass
-
-    return new_season_id
+        logger.info("Sent pending_confirm notifications for %d matches", len(sent_ids))
+    return report.sent
 
 
 async def send_pending_confirm_for_match(match_id: str, bot: Optional["Bot"] = None) -> bool:
@@ -278,12 +274,7 @@ async def send_pending_confirm_for_match(match_id: str, bot: Optional["Bot"] = N
         return False
     try:
         client = _get_client()
-        r = (
-            client.table("matches")
-            .select("id, player1_id, player2_id, sets_player1, sets_player2, submitted_by, notification_sent_at")
-            .eq("id", match_id)
-            .execute()
-        )
+        r = await execute(client.table("matches").select(PENDING_CONFIRM_SELECT).eq("id", match_id))
         if not r.data or len(r.data) == 0:
             logger.warning("Match %s not found for notify", match_id)
             return False
@@ -292,33 +283,7 @@ async def send_pending_confirm_for_match(match_id: str, bot: Optional["Bot"] = N
             return True  # уже сыгран или другой статус — не шлём
         if m.get("notification_sent_at") is not None:
             return True  # уже отправлено
-        submitted_by = m.get("submitted_by")
-        p1, p2 = m.get("player1_id"), m.get("player2_id")
-        opponent_id = p2 if submitted_by == p1 else p1
-        s1 = m.get("sets_player1") or 0
-        s2 = m.get("sets_player2") or 0
-        score = f"{s1}:{s2}"
-        submitter_r = client.table("players").select("name").eq("id", submitted_by).execute()
-        submitter_name = (submitter_r.data or [{}])[0].get("name", "Игрок") if submitter_r.data else "Игрок"
-        opp_r = client.table("players").select("telegram_id").eq("id", opponent_id).execute()
-        if not opp_r.data or opp_r.data[0].get("telegram_id") is None:
-            logger.warning("No telegram_id for opponent %s, match %s", opponent_id, match_id)
-            return False
-        telegram_id = int(opp_r.data[0]["telegram_id"])
-        confirm_url = f"{webapp_url}#/confirm-match/{match_id}"
-        text = (
-            f"{submitter_name} внёс результат вашего матча: {score}. "
-            "Подтвердите или отклоните результат."
-        )
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        kb = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="Подтвердить / Отклонить", url=confirm_url)],
-        ])
-        await bot.send_message(telegram_id, text, reply_markup=kb)
-        now_iso = datetime.now(timezone.utc).isoformat()
-        client.table("matches").update({"notification_sent_at": now_iso}).eq("id", match_id).execute()
-        logger.info("Sent pending_confirm notification for match %s to player %s", match_id, opponent_id)
-        return True
+        return await _notify_pending_confirm(client, bot, [m], webapp_url) > 0
     except Exception as e:
         logger.exception("send_pending_confirm_for_match failed for %s: %s", match_id, e)
         return False
@@ -328,21 +293,23 @@ async def _send_pending_confirm_notifications(bot: Optional["Bot"] = None) -> No
     """
     Найти матчи status=pending_confirm с notification_sent_at IS NULL,
     отправить сопернику (не submitted_by) сообщение со ссылкой на WebApp,
-    обновить notification_sent_at.
+    обновить notification_sent_at. Два запроса на любое число матчей.
     """
     if not bot:
         return
+    webapp_url = (os.getenv("WEBAPP_URL") or "").strip().rstrip("/")
+    if not webapp_url:
+        logger.debug("WEBAPP_URL not set, skip pending_confirm notifications")
+        return
     try:
         client = _get_client()
-        r = (
+        r = await execute(
             client.table("matches")
-            .select("id, player1_id, player2_id, sets_player1, sets_player2, submitted_by")
+            .select(PENDING_CONFIRM_SELECT)
             .eq("status", "pending_confirm")
             .is_("notification_sent_at", "null")
-            .execute()
         )
-        for m in r.data or []:
-            await send_pending_confirm_for_match(m["id"], bot)
+        await _notify_pending_confirm(client, bot, r.data or [], webapp_url)
     except Exception as e:
         logger.exception("_send_pending_confirm_notifications failed: %s", e)
 
@@ -352,7 +319,7 @@ async def _expire_game_requests() -> None:
     try:
         client = _get_client()
         now_iso = datetime.now(timezone.utc).isoformat()
-        client.table("game_requests").update({"status": "expired"}).eq("status", "pending").lte("expires_at", now_iso).execute()
+        await execute(client.table("game_requests").update({"status": "expired"}).eq("status", "pending").lte("expires_at", now_iso))
         logger.info("Expired stale game_requests")
     except Exception as e:
         logger.exception("_expire_game_requests failed: %s", e)
@@ -365,7 +332,7 @@ async def _daily_check(bot: Optional["Bot"] = None) -> None:
     try:
         report = await close_tour(bot)
         logger.info("close_tour done: %s", report[:200])
-        next_season_id = prepare_next_season()
+        next_season_id = await prepare_next_season()
         if next_season_id:
             logger.info("prepare_next_season done: %s", next_season_id)
     except Exception as e:
@@ -375,85 +342,30 @@ async def _daily_check(bot: Optional["Bot"] = None) -> None:
 async def _recalc_active_divisions_standings() -> None:
     """
     Периодически пересчитывает totals в division_players по matches
-    для всех дивизионов активного сезона. Использует ту же модель, что и API.
+    для всех дивизионов активного сезона. Использует тот же движок, что и API
+    (services.standings): константное число запросов на весь сезон.
     """
     try:
         client = _get_client()
-        season_r = (
+        season_r = await execute(
             client.table("seasons")
             .select("id")
             .eq("status", "active")
             .order("year", desc=True)
             .order("month", desc=True)
             .limit(1)
-            .execute()
         )
         if not season_r.data:
             return
         season_id = season_r.data[0]["id"]
-        divs_r = (
+        divs_r = await execute(
             client.table("divisions")
             .select("id")
             .eq("season_id", season_id)
-            .execute()
         )
-        for d in divs_r.data or []:
-            division_id = d["id"]
-            # Логика агрегатов совпадает с api/routers/matches._recalc_division_standings
-            matches_r = (
-                client.table("matches")
-                .select("player1_id, player2_id, sets_player1, sets_player2, status")
-                .eq("division_id", division_id)
-                .execute()
-            )
-            matches = matches_r.data or []
-            totals: dict[str, dict[str, int]] = {}
-
-            def ensure_player(pid: str) -> None:
-                if pid not in totals:
-                    totals[pid] = {"points": 0, "sets_won": 0, "sets_lost": 0}
-
-            for m in matches:
-                if m.get("status") != "played":
-                    continue
-                p1 = m.get("player1_id")
-                p2 = m.get("player2_id")
-                s1 = int(m.get("sets_player1") or 0)
-                s2 = int(m.get("sets_player2") or 0)
-                if p1 is None or p2 is None or s1 == s2:
-                    continue
-                ensure_player(p1)
-                ensure_player(p2)
-                totals[p1]["sets_won"] += s1
-                totals[p1]["sets_lost"] += s2
-                totals[p2]["sets_won"] += s2
-                totals[p2]["sets_lost"] += s1
-                if s1 > s2:
-                    totals[p1]["points"] += 2
-                    totals[p2]["points"] += 1
-                else:
-                    totals[p2]["points"] += 2
-                    totals[p1]["points"] += 1
-
-            dp_r = (
-                client.table("division_players")
-                .select("id, player_id")
-                .eq("division_id", division_id)
-                .execute()
-            )
-            for row in dp_r.data or []:
-                pid = row.get("player_id")
-                agg = totals.get(pid)
-                if not agg:
-                    continue
-                client.table("division_players").update(
-                    {
-                        "total_points": agg["points"],
-                        "total_sets_won": agg["sets_won"],
-                        "total_sets_lost": agg["sets_lost"],
-                    }
-                ).eq("id", row["id"]).execute()
-        logger.info("Recalculated standings for active season divisions")
+        division_ids = [d["id"] for d in divs_r.data or []]
+        updated = await run_sync(recalc_divisions_standings, client, division_ids)
+        logger.info("Recalculated standings for active season divisions (%d rows updated)", updated)
     except Exception as e:
         logger.exception("_recalc_active_divisions_standings failed: %s", e)
 
@@ -0,0 +1,214 @@
+"""
+План следующего сезона: ротация игроков между дивизионами закрытого сезона.
+
+План строится в памяти (build_season_plan) по трём чтениям и сохраняется
+одним upsert на таблицу (apply_season_plan). Все записи опираются на
+уникальные ключи seasons(year, month), divisions(season_id, number),
+division_players(division_id, player_id), поэтому повторный запуск после
+частичного сбоя дописывает недостающее и не создаёт дублей.
+"""
+import logging
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+MONTH_NAMES = [
+    "", "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь",
+]
+DIVISION_COEFS = {1: 0.30, 2: 0.27, 3: 0.25, 4: 0.22}
+
+MOVE_STAY = "stay"
+MOVE_UP = "up"
+MOVE_DOWN = "down"
+
+
+def next_period(year: int, month: int) -> tuple[int, int]:
+    if month == 12:
+        return year + 1, 1
+    return year, month + 1
+
+
+def order_division_players(dp_rows: Iterable[dict]) -> list[str]:
+    """player_id по итоговому месту (1 = лучший): position, затем очки и разница сетов."""
+    rows = sorted(
+        dp_rows,
+        key=lambda x: (
+            x.get("position") or 99,
+            -(x.get("total_points") or 0),
+            -((x.get("total_sets_won") or 0) - (x.get("total_sets_lost") or 0)),
+        ),
+    )
+    return [x["player_id"] for x in rows]
+
+
+def split_division(player_ids: list[str]) -> tuple[list[str], list[str], list[str]]:
+    """
+    (promoted, stay, relegated): вверх и вниз уходят по 2 игрока, при >8 игроках — по 3.
+    В маленьком дивизионе игрок не может одновременно подняться и опуститься.
+    """
+    n = len(player_ids)
+    move_count = 3 if n > 8 else 2
+    bottom_from = max(move_count, n - move_count)
+    return player_ids[:move_count], player_ids[move_count:bottom_from], player_ids[bottom_from:]
+
+
+def build_season_plan(closed_season: dict, divisions: list[dict], dp_rows: Iterable[dict]) -> dict:
+    """
+    Раскладка следующего сезона:
+    {"season": {year, month, name, status}, "divisions": [{number, coef, players: [{player_id, from_number, move}]}]}.
+    Топ дивизиона N → N-1, последние → N+1; из первого дивизиона подниматься некуда,
+    из последнего — опускаться, такие игроки остаются на месте.
+    """
+    year, month = next_period(closed_season["year"], closed_season["month"])
+    rows_by_div: dict[str, list[dict]] = {}
+    for row in dp_rows:
+        rows_by_div.setdefault(row["division_id"], []).append(row)
+
+    nums = sorted(d["number"] for d in divisions)
+    div_id_by_num = {d["number"]: d["id"] for d in divisions}
+    splits = {
+        num: split_division(order_division_players(rows_by_div.get(div_id_by_num[num], [])))
+        for num in nums
+    }
+
+    plan_divisions = []
+    for k, num in enumerate(nums):
+        promoted, stay, relegated = splits[num]
+        players = []
+        if k == 0:
+            players += [(pid, num, MOVE_STAY) for pid in promoted]
+        players += [(pid, num, MOVE_STAY) for pid in stay]
+        if k > 0:
+            upper = nums[k - 1]
+            players += [(pid, upper, MOVE_DOWN) for pid in splits[upper][2]]
+        if k + 1 < len(nums):
+            lower = nums[k + 1]
+            players += [(pid, lower, MOVE_UP) for pid in splits[lower][0]]
+        if k == len(nums) - 1:
+            players += [(pid, num, MOVE_STAY) for pid in relegated]
+        plan_divisions.append({
+            "number": num,
+            "coef": DIVISION_COEFS.get(num, 0.22),
+            "players": [
+                {"player_id": pid, "from_number": from_num, "move": move}
+                for pid, from_num, move in players
+            ],
+        })
+
+    return {
+        "season": {
+            "year": year,
+            "month": month,
+            "name": f"{MONTH_NAMES[month]} {year}",
+            "status": "active",
+        },
+        "closed_season_id": closed_season["id"],
+        "divisions": plan_divisions,
+    }
+
+
+def load_season_plan(client) -> Optional[dict]:
+    """План по последнему закрытому сезону: 3 чтения. None, если закрытого сезона нет."""
+    closed_r = (
+        client.table("seasons")
+        .select("*")
+        .eq("status", "closed")
+        .order("year", desc=True)
+        .order("month", desc=True)
+        .limit(1)
+        .execute()
+    )
+    if not closed_r.data:
+        return None
+    closed = closed_r.data[0]
+    divs_r = (
+        client.table("divisions")
+        .select("id, number")
+        .eq("season_id", closed["id"])
+        .order("number")
+        .execute()
+    )
+    divisions = divs_r.data or []
+    dp_rows: list[dict] = []
+    if divisions:
+        dps_r = (
+            client.table("division_players")
+            .select("division_id, player_id, position, total_points, total_sets_won, total_sets_lost")
+            .in_("division_id", [d["id"] for d in divisions])
+            .execute()
+        )
+        dp_rows = dps_r.data or []
+    return build_season_plan(closed, divisions, dp_rows)
+
+
+def apply_season_plan(client, plan: dict) -> Optional[str]:
+    """
+    Сохранить план: upsert сезона, upsert дивизионов, upsert division_players
+    (по одному запросу на таблицу плюс чтения id). Игроки, уже распределённые
+    в новом сезоне, повторно не добавляются. Возвращает id нового сезона.
+    """
+    season = plan["season"]
+    client.table("seasons").upsert(season, on_conflict="year,month", ignore_duplicates=True).execute()
+    season_r = (
+        client.table("seasons")
+        .select("id")
+        .eq("year", season["year"])
+        .eq("month", season["month"])
+        .limit(1)
+        .execute()
+    )
+    if not season_r.data:
+        return None
+    season_id = season_r.data[0]["id"]
+    if not plan["divisions"]:
+        return season_id
+
+    client.table("divisions").upsert(
+        [{"season_id": season_id, "number": d["number"], "coef": d["coef"]} for d in plan["divisions"]],
+        on_conflict="season_id,number",
+        ignore_duplicates=True,
+    ).execute()
+    divs_r = client.table("divisions").select("id, number").eq("season_id", season_id).execute()
+    div_id_by_num = {d["number"]: d["id"] for d in (divs_r.data or [])}
+
+    existing_r = (
+        client.table("division_players")
+        .select("player_id")
+        .in_("division_id", list(div_id_by_num.values()))
+        .execute()
+    )
+    placed = {r["player_id"] for r in (existing_r.data or [])}
+    rows = []
+    for d in plan["divisions"]:
+        div_id = div_id_by_num.get(d["number"])
+        if not div_id:
+            continue
+        for p in d["players"]:
+            if p["player_id"] in placed:
+                continue
+            placed.add(p["player_id"])
+            rows.append({"division_id": div_id, "player_id": p["player_id"]})
+    if rows:
+        client.table("division_players").upsert(
+            rows, on_conflict="division_id,player_id", ignore_duplicates=True
+        ).execute()
+    logger.info("Season plan applied: season %s, %d players placed", season_id, len(rows))
+    return season_id
+
+
+def format_season_plan(plan: dict, id_to_name: dict[str, str]) -> str:
+    """Текст предпросмотра для админа."""
+    marks = {MOVE_STAY: "", MOVE_UP: " ⬆️", MOVE_DOWN: " ⬇️"}
+    lines = [f"🗓 <b>План сезона: {plan['season']['name']}</b>\n"]
+    if not plan["divisions"]:
+        lines.append("В закрытом сезоне нет дивизионов.")
+    for d in plan["divisions"]:
+        lines.append(f"\n<b>Дивизион {d['number']}</b> (коэф. {d['coef']:.2f})")
+        for i, p in enumerate(d["players"], 1):
+            name = id_to_name.get(p["player_id"], "—")
+            suffix = marks[p["move"]]
+            if p["move"] != MOVE_STAY:
+                suffix += f" из {p['from_number']}"
+            lines.append(f"  {i}. {name}{suffix}")
+    return "\n".join(lines)
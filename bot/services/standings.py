@@ -0,0 +1,256 @@
+"""
+Пересчёт standings (totals в division_players) по таблице matches.
+
+Общий модуль для бота (services.standings) и API (bot.services.standings):
+агрегаты считаются за один проход по матчам, запись — одним bulk upsert.
+Стоимость пересчёта не зависит от числа игроков: 2 чтения + не более 1 записи
+на дивизион (или на весь сезон в recalc_divisions_standings).
+После подтверждения матча используется инкрементальный режим (apply_match_delta):
+дельта только двум игрокам и дешёвая контрольная сумма вместо полного пересчёта.
+"""
+import logging
+from typing import Iterable
+
+from .pagination import fetch_all
+
+logger = logging.getLogger(__name__)
+
+STANDINGS_COLUMNS = "id, division_id, player_id, total_points, total_sets_won, total_sets_lost"
+
+
+def _empty_totals() -> dict[str, int]:
+    return {"points": 0, "sets_won": 0, "sets_lost": 0}
+
+
+def compute_totals(matches: Iterable[dict]) -> dict[str, dict[str, int]]:
+    """
+    Агрегаты по сыгранным матчам: {player_id: {"points", "sets_won", "sets_lost"}}.
+    Очки: 2 за победу, 1 за поражение. Матчи с равным счётом или без игроков пропускаются.
+    """
+    totals: dict[str, dict[str, int]] = {}
+    for m in matches:
+        if m.get("status") != "played":
+            continue
+        p1 = m.get("player1_id")
+        p2 = m.get("player2_id")
+        s1 = int(m.get("sets_player1") or 0)
+        s2 = int(m.get("sets_player2") or 0)
+        if p1 is None or p2 is None or s1 == s2:
+            continue
+        t1 = totals.get(p1)
+        if t1 is None:
+            t1 = totals[p1] = _empty_totals()
+        t2 = totals.get(p2)
+        if t2 is None:
+            t2 = totals[p2] = _empty_totals()
+        t1["sets_won"] += s1
+        t1["sets_lost"] += s2
+        t2["sets_won"] += s2
+        t2["sets_lost"] += s1
+        if s1 > s2:
+            t1["points"] += 2
+            t2["points"] += 1
+        else:
+            t2["points"] += 2
+            t1["points"] += 1
+    return totals
+
+
+def compute_totals_by_division(matches: Iterable[dict]) -> dict[str, dict[str, dict[str, int]]]:
+    """То же, что compute_totals, но с группировкой по division_id (матчи нескольких дивизионов)."""
+    by_div: dict[str, list[dict]] = {}
+    for m in matches:
+        by_div.setdefault(m.get("division_id"), []).append(m)
+    return {div_id: compute_totals(ms) for div_id, ms in by_div.items()}
+
+
+def build_standings_updates(
+    dp_rows: Iterable[dict],
+    totals_by_division: dict[str, dict[str, dict[str, int]]],
+) -> list[dict]:
+    """
+    Строки для bulk upsert в division_players: только те, где агрегаты изменились.
+    Игроки без сыгранных матчей не трогаются (как и раньше).
+    """
+    updates = []
+    for row in dp_rows:
+        agg = totals_by_division.get(row.get("division_id"), {}).get(row.get("player_id"))
+        if not agg:
+            continue
+        if (
+            (row.get("total_points") or 0) == agg["points"]
+            and (row.get("total_sets_won") or 0) == agg["sets_won"]
+            and (row.get("total_sets_lost") or 0) == agg["sets_lost"]
+        ):
+            continue
+        updates.append({
+            "id": row["id"],
+            "division_id": row["division_id"],
+            "player_id": row["player_id"],
+            "total_points": agg["points"],
+            "total_sets_won": agg["sets_won"],
+            "total_sets_lost": agg["sets_lost"],
+        })
+    return updates
+
+
+def recalc_divisions_standings(client, division_ids: list[str]) -> int:
+    """
+    Пересчитать totals для набора дивизионов за константное число запросов:
+    все матчи (in_), все division_players (in_) — страницами fetch_all, один upsert изменённых строк.
+    Возвращает число обновлённых строк division_players.
+    """
+    if not division_ids:
+        return 0
+    # Весь сезон может не поместиться в один ответ PostgREST (max-rows) — читаем страницами
+    matches = fetch_all(
+        lambda: client.table("matches")
+        .select("id, division_id, player1_id, player2_id, sets_player1, sets_player2, status")
+        .in_("division_id", division_ids)
+        .eq("status", "played")
+        .order("id")
+    )
+    dp_rows = fetch_all(
+        lambda: client.table("division_players")
+        .select(STANDINGS_COLUMNS)
+        .in_("division_id", division_ids)
+        .order("id")
+    )
+    updates = build_standings_updates(dp_rows, compute_totals_by_division(matches))
+    if updates:
+        client.table("division_players").upsert(updates, on_conflict="id").execute()
+    return len(updates)
+
+
+def recalc_division_standings(client, division_id: str) -> int:
+    """Пересчитать totals одного дивизиона (2 чтения + не более 1 записи)."""
+    return recalc_divisions_standings(client, [division_id])
+
+
+def division_checksum(dp_rows: Iterable[dict]) -> tuple[int, int, int]:
+    """Контрольная сумма дивизиона: (Σ очков, Σ выигранных сетов, Σ проигранных сетов)."""
+    points = sets_won = sets_lost = 0
+    for row in dp_rows:
+        points += row.get("total_points") or 0
+        sets_won += row.get("total_sets_won") or 0
+        sets_lost += row.get("total_sets_lost") or 0
+    return points, sets_won, sets_lost
+
+
+def checksum_matches(checksum: tuple[int, int, int], matches: Iterable[dict], player_ids: Iterable[str]) -> bool:
+    """
+    Контрольная сумма сходится с матчами: каждый засчитанный матч (как в compute_totals:
+    оба игрока есть, счёт не равный) даёт игрокам из division_players 2 + 1 очка и сеты.
+    Матчи с равным счётом или без игрока и игроки вне division_players в сумму не входят,
+    поэтому такой дивизион не уходит в полный пересчёт на каждом подтверждении.
+    Пропущенный или применённый дважды матч нарушает хотя бы одно из равенств.
+    """
+    present = set(player_ids)
+    points = sets_won = sets_lost = 0
+    for pid, totals in compute_totals(matches).items():
+        if pid in present:
+            points += totals["points"]
+            sets_won += totals["sets_won"]
+            sets_lost += totals["sets_lost"]
+    return checksum == (points, sets_won, sets_lost)
+
+
+def apply_match_delta(
+    client,
+    division_id: str,
+    winner_id: str,
+    loser_id: str,
+    winner_sets: int,
+    loser_sets: int,
+    delta_winner: float,
+    delta_loser: float,
+) -> bool:
+    """
+    Инкрементальный режим: добавить результат одного матча только двум игрокам.
+    Матч уже должен быть в статусе played. Запросы: division_players дивизиона,
+    upsert двух строк, сыгранные матчи дивизиона для сверки — независимо от размера дивизиона.
+    Если контрольная сумма не сходится, выполняется полный пересчёт.
+    Возвращает True, если полный пересчёт не понадобился.
+    """
+    dp_r = (
+        client.table("division_players")
+        .select(STANDINGS_COLUMNS + ", rating_delta")
+        .eq("division_id", division_id)
+        .execute()
+    )
+    rows = dp_r.data or []
+    by_player = {row.get("player_id"): row for row in rows}
+    updates = []
+    for pid, pts, swon, slost, delta in [
+        (winner_id, 2, winner_sets, loser_sets, delta_winner),
+        (loser_id, 1, loser_sets, winner_sets, delta_loser),
+    ]:
+        row = by_player.get(pid)
+        if not row:
+            continue
+        row["total_points"] = (row.get("total_points") or 0) + pts
+        row["total_sets_won"] = (row.get("total_sets_won") or 0) + swon
+        row["total_sets_lost"] = (row.get("total_sets_lost") or 0) + slost
+        row["rating_delta"] = round(float(row.get("rating_delta") or 0) + delta, 2)
+        updates.append({
+            "id": row["id"],
+            "division_id": row["division_id"],
+            "player_id": pid,
+            "total_points": row["total_points"],
+            "total_sets_won": row["total_sets_won"],
+            "total_sets_lost": row["total_sets_lost"],
+            "rating_delta": row["rating_delta"],
+        })
+    if updates:
+        client.table("division_players").upsert(updates, on_conflict="id").execute()
+
+    played_r = (
+        client.table("matches")
+        .select("player1_id, player2_id, sets_player1, sets_player2, status")
+        .eq("division_id", division_id)
+        .eq("status", "played")
+        .execute()
+    )
+    if checksum_matches(division_checksum(rows), played_r.data or [], by_player):
+        return True
+    logger.warning("Standings checksum mismatch in division %s, running full recalc", division_id)
+    recalc_division_standings(client, division_id)
+    return False
+
+
+def _ranking_key(row: dict) -> tuple[int, int]:
+    pts = row.get("total_points") or 0
+    sw = row.get("total_sets_won") or 0
+    sl = row.get("total_sets_lost") or 0
+    return (-pts, -(sw - sl))
+
+
+def rank_division(dp_rows: Iterable[dict], matches: Iterable[dict]) -> list[dict]:
+    """
+    Итоговый порядок игроков дивизиона: очки → личные встречи внутри группы
+    с равными очками и разницей сетов. matches — сыгранные матчи этого дивизиона.
+    """
+    rows = sorted(dp_rows, key=_ranking_key)
+    matches = list(matches)
+    i = 0
+    while i < len(rows):
+        j = i
+        while j < len(rows) and _ranking_key(rows[j]) == _ranking_key(rows[i]):
+            j += 1
+        if j - i > 1:
+            group = rows[i:j]
+            group_ids = {r["player_id"] for r in group}
+            wins = {pid: 0 for pid in group_ids}
+            for m in matches:
+                p1, p2 = m["player1_id"], m["player2_id"]
+                if p1 not in group_ids or p2 not in group_ids:
+                    continue
+                s1, s2 = m.get("sets_player1") or 0, m.get("sets_player2") or 0
+                if s1 > s2:
+                    wins[p1] += 1
+                elif s2 > s1:
+                    wins[p2] += 1
+            group.sort(key=lambda r: wins[r["player_id"]], reverse=True)
+            rows[i:j] = group
+        i = j
+    return rows
@@ -1,15 +1,31 @@
 """
 Клиент Supabase для бота.
 Инициализация из SUPABASE_URL и SUPABASE_KEY.
+
+supabase-py синхронный, поэтому в async-коде (хендлеры aiogram, задачи планировщика)
+запросы выполняются в отдельном пуле потоков и не блокируют event loop:
+функции этого модуля — корутины (await get_player_by_telegram_id(...)),
+произвольный запрос — await execute(client.table(...).select(...)),
+синхронный блок кода целиком — await run_sync(fn, *args).
 """
+import asyncio
+import functools
 import logging
 import os
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
 from supabase import create_client, Client
 from supabase.lib.client_options import ClientOptions
 
+from services.player_cache import player_cache
+
 logger = logging.getLogger(__name__)
 _client: Optional[Client] = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Размер пула потоков для запросов к Supabase (одновременных HTTP-запросов из бота)
+DB_THREADS = int(os.getenv("SUPABASE_DB_THREADS") or 16)
 
 
 def _get_client() -> Client:
@@ -30,6 +46,34 @@ def _get_client() -> Client:
     return _client
 
 
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="supabase")
+    return _executor
+
+
+async def run_sync(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Выполнить синхронную функцию (запросы supabase-py) в пуле потоков."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def execute(query) -> Any:
+    """Выполнить построенный запрос PostgREST: await execute(client.table("x").select("*"))."""
+    return await run_sync(query.execute)
+
+
+def _offload(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Сделать из синхронной функции доступа к данным корутину; исходная доступна как .sync."""
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run_sync(fn, *args, **kwargs)
+
+    wrapper.sync = fn
+    return wrapper
+
+
 def get_supabase_client() -> Optional[Client]:
     """Опциональный клиент (возвращает None если нет переменных окружения)."""
     try:
@@ -38,17 +82,38 @@ def get_supabase_client() -> Optional[Client]:
         return None
 
 
-def get_player_by_telegram_id(telegram_id: int) -> Optional[dict]:
-    """Найти игрока по telegram_id."""
+def _fetch_player_by_telegram_id(telegram_id: int) -> Optional[dict]:
+    # Поколение до запроса: инвалидация во время запроса не даст закэшировать старую строку
+    generation = player_cache.generation(telegram_id)
     try:
         r = _get_client().table("players").select("*").eq("telegram_id", telegram_id).execute()
         if r.data and len(r.data) > 0:
+            player_cache.put(telegram_id, r.data[0], generation)
             return r.data[0]
         return None
     except Exception:
         return None
 
 
+def _get_player_by_telegram_id(telegram_id: int) -> Optional[dict]:
+    cached = player_cache.get(telegram_id)
+    if cached is not None:
+        return cached
+    return _fetch_player_by_telegram_id(telegram_id)
+
+
+async def get_player_by_telegram_id(telegram_id: int) -> Optional[dict]:
+    """Найти игрока по telegram_id. Сначала кэш процесса (без похода в пул потоков), затем БД."""
+    cached = player_cache.get(telegram_id)
+    if cached is not None:
+        return cached
+    return await run_sync(_fetch_player_by_telegram_id, telegram_id)
+
+
+get_player_by_telegram_id.sync = _get_player_by_telegram_id
+
+
+@_offload
 def create_player(
     telegram_id: int,
     name: str,
@@ -64,8 +129,11 @@ def create_player(
         }
         if is_admin:
             row["is_admin"] = True
+        player_cache.invalidate(telegram_id=telegram_id)
+        generation = player_cache.generation(telegram_id)
         r = _get_client().table("players").insert(row).execute()
         if r.data and len(r.data) > 0:
+            player_cache.put(telegram_id, r.data[0], generation)
             return r.data[0]
         return None
     except Exception as e:
@@ -73,6 +141,7 @@ def create_player(
         return None
 
 
+@_offload
 def get_active_season() -> Optional[dict]:
     """Получить активный сезон (тур)."""
     try:
@@ -93,72 +162,55 @@ def get_active_season() -> Optional[dict]:
         return None
 
 
+# Запись игрока в division_players + дивизион, его сезон и полный состав — одним запросом
+PLAYER_DIVISION_SELECT = (
+    "division:divisions!inner(*, season:seasons!inner(*), "
+    "division_players(*, player:players(id, name, telegram_id, telegram_username)))"
+)
+
+
+@_offload
 def get_player_division(player_id: str, season_id: Optional[str] = None) -> Optional[dict]:
     """
     Получить дивизион игрока в текущем (или указанном) сезоне.
     Возвращает: { "division": {...}, "season": {...}, "division_players": [...] }
     или None.
+    Один round-trip: встроенный select от division_players игрока с фильтром
+    по сезону дивизиона (division.season_id или division.season.status=active).
     """
     try:
-        if not season_id:
-            season = get_active_season()
-            if not season:
-                return None
-            season_id = season["id"]
-
-        divs = (
+        query = (
             _get_client()
-            .table("divisions")
-            .select("id, number, coef, season_id")
-            .eq("season_id", season_id)
-            .execute()
+            .table("division_players")
+            .select(PLAYER_DIVISION_SELECT)
+            .eq("player_id", player_id)
         )
-        if not divs.data:
+        if season_id:
+            query = query.eq("division.season_id", season_id)
+        else:
+            query = query.eq("division.season.status", "active")
+        r = query.execute()
+        rows = [row for row in (r.data or []) if row.get("division") and row["division"].get("season")]
+        if not rows:
             return None
-
-        division_ids = [d["id"] for d in divs.data]
-        # Найти запись division_players для этого игрока в одном из дивизионов сезона
-        for div_id in division_ids:
-            dp_r = (
-                _get_client()
-                .table("division_players")
-                .select("*, division:divisions(*), player:players(id, name, rating)")
-                .eq("division_id", div_id)
-                .eq("player_id", player_id)
-                .execute()
-            )
-            if dp_r.data and len(dp_r.data) > 0:
-                # Получить всех участников дивизиона (для списка соперников)
-                all_dp = (
-                    _get_client()
-                    .table("division_players")
-                    .select("*, player:players(id, name, telegram_id, telegram_username)")
-                    .eq("division_id", div_id)
-                    .execute()
-                )
-                division = dp_r.data[0].get("division") or next(
-                    (d for d in divs.data if d["id"] == div_id), None
-                )
-                if not division:
-                    continue
-                season_r = (
-                    _get_client()
-                    .table("seasons")
-                    .select("*")
-                    .eq("id", division.get("season_id") or season_id)
-                    .execute()
-                )
-                season = season_r.data[0] if season_r.data else None
-                return {
-                    "division": division,
-                    "season": season,
-                    "division_players": all_dp.data or [],
-                }
-        return None
+        # Если активных сезонов несколько — последний, как в get_active_season
+        row = max(
+            rows,
+            key=lambda x: (x["division"]["season"].get("year") or 0, x["division"]["season"].get("month") or 0),
+        )
+        division = dict(row["division"])
+        season = division.pop("season")
+        roster = division.pop("division_players", None) or []
+        return {
+            "division": division,
+            "season": season,
+            "division_players": roster,
+        }
     except Exception:
         return None
 
 
+@_offload
 def get_division_matches(division_id: str) -> list[dict]:
     """Все матчи дивизиона."""
     try:
@@ -174,6 +226,7 @@ def get_division_matches(division_id: str) -> list[dict]:
         return []
 
 
+@_offload
 def get_existing_match(division_id: str, player1_id: str, player2_id: str) -> Optional[dict]:
     """Проверить, есть ли уже матч между двумя игроками в дивизионе (в любом порядке)."""
     try:
@@ -204,6 +257,7 @@ def get_existing_match(division_id: str, player1_id: str, player2_id: str) -> Op
         return None
 
 
+@_offload
 def submit_match_for_confirmation(
     division_id: str,
     player1_id: str,
@@ -218,7 +272,7 @@ def submit_match_for_confirmation(
     """
     try:
         client = _get_client()
-        existing = get_existing_match(division_id, player1_id, player2_id)
+        existing = get_existing_match.sync(division_id, player1_id, player2_id)
         if existing and existing.get("status") == "played":
             return None, "Этот матч уже внесён и подтверждён."
         now_iso = datetime.now(timezone.utc).isoformat()
@@ -251,6 +305,7 @@ def submit_match_for_confirmation(
         return None, str(e)
 
 
+@_offload
 def get_rating_top(limit: int = 20) -> list[dict]:
     """Топ игроков по рейтингу."""
     try:
@@ -0,0 +1,12 @@
+import pytest
+
+from services.player_cache import player_cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_player_cache():
+    """Кэш игроков — глобальный на процесс; тесты не должны видеть записи друг друга."""
+    player_cache.clear()
+    player_cache.hits = player_cache.misses = 0
+    yield
+    player_cache.clear()
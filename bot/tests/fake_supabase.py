@@ -0,0 +1,344 @@
+"""
+In-memory stand-in for the supabase-py client used in tests.
+
+Supports the subset of the PostgREST query builder the project relies on
+(select/insert/update/upsert/delete, eq/neq/in_/gt/gte/lt/lte/is_, not_, order, limit, range)
+and counts every execute() as one HTTP round-trip.
+latency (seconds) makes every execute() block like a real HTTP call.
+select() projects the listed columns and resolves embedded resources
+(alias:table!hint!inner(...)) through FOREIGN_KEYS, including filters on
+embedded columns ("division.season_id"); ambiguous embeds fail like PGRST201.
+"""
+import copy
+import itertools
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Optional
+
+_ids = itertools.count(1)
+
+# (table, column) → referenced table; mirrors database/schema.sql and migrations
+FOREIGN_KEYS: dict[tuple[str, str], str] = {
+    ("divisions", "season_id"): "seasons",
+    ("division_players", "division_id"): "divisions",
+    ("division_players", "player_id"): "players",
+    ("matches", "division_id"): "divisions",
+    ("matches", "player1_id"): "players",
+    ("matches", "player2_id"): "players",
+    ("matches", "submitted_by"): "players",
+    ("rating_history", "player_id"): "players",
+    ("rating_history", "match_id"): "matches",
+    ("rating_history", "season_id"): "seasons",
+    ("client_sessions", "player_id"): "players",
+    ("game_requests", "requester_id"): "players",
+    ("game_requests", "target_player_id"): "players",
+    ("game_requests", "accepted_by_id"): "players",
+    ("game_requests", "season_id"): "seasons",
+}
+
+
+def _new_id() -> str:
+    return f"00000000-0000-0000-0000-{next(_ids):012d}"
+
+
+def _split_top_level(spec: str) -> list[str]:
+    items, depth, current = [], 0, []
+    for ch in spec:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            items.append("".join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    tail = "".join(current).strip()
+    if tail:
+        items.append(tail)
+    return [i for i in items if i]
+
+
+def _parse_select(spec: str) -> tuple[list[str], list[dict]]:
+    """'id, name, player:players!player1_id(id, name)' → (columns, embeds)."""
+    columns, embeds = [], []
+    for item in _split_top_level(spec):
+        if "(" not in item:
+            columns.append(item)
+            continue
+        head, inner = item[: item.index("(")], item[item.index("(") + 1: item.rindex(")")]
+        alias, _, target = head.rpartition(":")
+        table, *modifiers = target.strip().split("!")
+        inner_cols, inner_embeds = _parse_select(inner)
+        embeds.append({
+            "alias": (alias or table).strip(),
+            "table": table.strip(),
+            "hint": next((m for m in modifiers if m != "inner"), None),
+            "inner": "inner" in modifiers,
+            "columns": inner_cols,
+            "embeds": inner_embeds,
+        })
+    return columns, embeds
+
+
+def _project(row: dict, columns: list[str]) -> dict:
+    if not columns or "*" in columns:
+        return dict(row)
+    return {c: row.get(c) for c in columns}
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._select = "*"
+        self._payload: Any = None
+        self._on_conflict = "id"
+        self._ignore_duplicates = False
+        self._filters: list[tuple[str, Callable[[Any], bool]]] = []
+        self._order: list[tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._count: Optional[str] = None
+        self._head = False
+        self._negate = False
+
+    # --- operations ---
+
+    def select(self, *columns: str, count: Optional[str] = None, head: Optional[bool] = None):
+        if self._op == "select":
+            self._select = ",".join(columns) or "*"
+            self._count = count
+            self._head = bool(head)
+        return self
+
+    def insert(self, payload, **kwargs):
+        self._op, self._payload = "insert", payload
+        return self
+
+    def update(self, payload, **kwargs):
+        self._op, self._payload = "update", payload
+        return self
+
+    def upsert(self, payload, *, on_conflict: str = "", ignore_duplicates: bool = False, **kwargs):
+        self._op, self._payload = "upsert", payload
+        self._on_conflict = on_conflict or "id"
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def delete(self, **kwargs):
+        self._op = "delete"
+        return self
+
+    # --- filters ---
+
+    def _filter(self, column: str, predicate: Callable[[Any], bool]):
+        if self._negate:
+            self._negate = False
+            predicate = (lambda p: lambda v: not p(v))(predicate)
+        self._filters.append((column, predicate))
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column: str, value):
+        return self._filter(column, lambda v: v != value)
+
+    def in_(self, column: str, values):
+        values = list(values)
+        return self._filter(column, lambda v: v in values)
+
+    def gt(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def is_(self, column: str, value):
+        expected = None if value in (None, "null") else value
+        return self._filter(column, lambda v: v is expected)
+
+    def order(self, column: str, desc: bool = False, **kwargs):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    # --- execution ---
+
+    def _match(self, row: dict, path: tuple[str, ...] = ()) -> bool:
+        """Фильтры уровня path: () — сама таблица, ("division",) — встроенный ресурс и т.д."""
+        for column, predicate in self._filters:
+            *prefix, name = column.split(".")
+            if tuple(prefix) == path and not predicate(row.get(name)):
+                return False
+        return True
+
+    def _embed(self, table: str, row: dict, embeds: list[dict], path: tuple[str, ...]) -> bool:
+        """Достроить встроенные ресурсы строки; False — строку отбрасывает !inner."""
+        for spec in embeds:
+            sub_path = path + (spec["alias"],)
+            fk = self._db.fk_column(table, spec["table"], spec["hint"])
+            if fk is not None:
+                target = next(
+                    (r for r in self._db.tables.get(spec["table"], []) if r.get("id") == row.get(fk)),
+                    None,
+                )
+                value = None
+                if target is not None and self._match(target, sub_path):
+                    value = _project(target, spec["columns"])
+                    if not self._embed(spec["table"], value, spec["embeds"], sub_path):
+                        value = None
+                if value is None and spec["inner"]:
+                    return False
+            else:
+                back = self._db.fk_column(spec["table"], table, None)
+                if back is None:
+                    raise AssertionError(f"no relationship between {table} and {spec['table']}")
+                value = []
+                for r in self._db.tables.get(spec["table"], []):
+                    if r.get(back) != row.get("id") or not self._match(r, sub_path):
+                        continue
+                    child = _project(r, spec["columns"])
+                    if self._embed(spec["table"], child, spec["embeds"], sub_path):
+                        value.append(child)
+                if not value and spec["inner"]:
+                    return False
+            row[spec["alias"]] = value
+        return True
+
+    def execute(self):
+        if self._db.latency:
+            time.sleep(self._db.latency)
+        self._db.round_trips += 1
+        self._db.calls.append((self._table, self._op))
+        rows = self._db.tables.setdefault(self._table, [])
+        if self._op == "select":
+            columns, embeds = _parse_select(self._select)
+            data = []
+            for r in rows:
+                if not self._match(r):
+                    continue
+                # Сортировка и фильтры — по полной строке, проекция — в конце
+                full = copy.deepcopy(r)
+                if self._embed(self._table, full, embeds, ()):
+                    data.append(full)
+            for column, desc in reversed(self._order):
+                data.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+            if self._offset:
+                data = data[self._offset:]
+            if self._limit is not None:
+                data = data[: self._limit]
+            if self._db.max_rows is not None:
+                data = data[: self._db.max_rows]  # как db-max-rows PostgREST: молча обрезает ответ
+            data = [
+                {**_project(r, columns), **{e["alias"]: r[e["alias"]] for e in embeds}}
+                for r in data
+            ]
+            count = len(data) if self._count else None
+            return SimpleNamespace(data=[] if self._head else data, count=count)
+        if self._op == "insert":
+            payload = self._payload if isinstance(self._payload, list) else [self._payload]
+            created = []
+            for item in payload:
+                row = {"id": _new_id(), **copy.deepcopy(item)}
+                rows.append(row)
+                created.append(copy.deepcopy(row))
+            return SimpleNamespace(data=created, count=None)
+        if self._op == "update":
+            updated = []
+            for row in rows:
+                if self._match(row):
+                    row.update(copy.deepcopy(self._payload))
+                    updated.append(copy.deepcopy(row))
+            return SimpleNamespace(data=updated, count=None)
+        if self._op == "upsert":
+            keys = [k.strip() for k in self._on_conflict.split(",")]
+            payload = self._payload if isinstance(self._payload, list) else [self._payload]
+            result = []
+            for item in payload:
+                existing = next(
+                    (r for r in rows if all(k in item and r.get(k) == item[k] for k in keys)),
+                    None,
+                )
+                if existing is not None:
+                    if not self._ignore_duplicates:
+                        existing.update(copy.deepcopy(item))
+                        result.append(copy.deepcopy(existing))
+                    continue
+                row = {"id": _new_id(), **copy.deepcopy(item)}
+                rows.append(row)
+                result.append(copy.deepcopy(row))
+            return SimpleNamespace(data=result, count=None)
+        if self._op == "delete":
+            kept = [r for r in rows if not self._match(r)]
+            removed = [r for r in rows if self._match(r)]
+            self._db.tables[self._table] = kept
+            return SimpleNamespace(data=removed, count=None)
+        raise AssertionError(f"unsupported op {self._op}")
+
+
+class FakeSupabase:
+    """tables: {"matches": [row, ...], ...}; round_trips: number of execute() calls.
+    max_rows caps every select response like PostgREST's db-max-rows (None — no cap)."""
+
+    def __init__(
+        self,
+        tables: Optional[dict[str, list[dict]]] = None,
+        latency: float = 0.0,
+        max_rows: Optional[int] = None,
+    ):
+        self.tables: dict[str, list[dict]] = copy.deepcopy(tables or {})
+        self.latency = latency
+        self.max_rows = max_rows
+        self.round_trips = 0
+        self.calls: list[tuple[str, str]] = []
+        self.rpcs: dict[str, Callable[[dict], Any]] = {}
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def fk_column(self, table: str, target: str, hint: Optional[str]) -> Optional[str]:
+        """Колонка table, ссылающаяся на target (to-one embed); None — связи в эту сторону нет."""
+        if hint is not None:
+            if FOREIGN_KEYS.get((table, hint)) != target:
+                raise AssertionError(f"{table}.{hint} does not reference {target}")
+            return hint
+        candidates = [col for (t, col), ref in FOREIGN_KEYS.items() if t == table and ref == target]
+        if len(candidates) > 1:
+            raise AssertionError(f"ambiguous embed {table} → {target}: {candidates} (PGRST201)")
+        return candidates[0] if candidates else None
+
+    def rpc(self, name: str, params: Optional[dict] = None):
+        db = self
+
+        class _Rpc:
+            def execute(self_inner):
+                db.round_trips += 1
+                db.calls.append((name, "rpc"))
+                return SimpleNamespace(data=db.rpcs[name](params or {}), count=None)
+
+        return _Rpc()
+
+    def reset_counters(self) -> None:
+        self.round_trips = 0
+        self.calls = []
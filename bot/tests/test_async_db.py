@@ -0,0 +1,126 @@
+"""
+Нагрузочный тест слоя доступа к данным: запросы к Supabase выполняются в пуле потоков,
+поэтому одновременные апдейты Telegram не выстраиваются в очередь за одним HTTP-вызовом.
+Проверяется структура, а не время: запросы фейка держатся, пока не соберётся нужное число
+одновременных вызовов (или пока event loop не отработает), и без пула потоков тест не дождётся их.
+"""
+import asyncio
+import threading
+
+from handlers import rating
+from services import supabase_client
+from tests.fake_supabase import FakeQuery, FakeSupabase
+
+N_UPDATES = 12
+WAIT = 5.0  # предел ожидания заблокированного запроса: при последовательном выполнении тест падает, а не виснет
+
+
+class _Gate:
+    """execute() фейка ждёт release; in_flight и max_in_flight — одновременные вызовы."""
+
+    def __init__(self, release_at: int = 0):
+        self.release = threading.Event()
+        self.release_at = release_at
+        self.in_flight = self.max_in_flight = 0
+        self.timed_out = False
+        self._lock = threading.Lock()
+
+    def install(self, monkeypatch) -> None:
+        execute = FakeQuery.execute
+
+        def gated_execute(query):
+            with self._lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                if self.release_at and self.in_flight >= self.release_at:
+                    self.release.set()
+            try:
+                if not self.release.wait(WAIT):
+                    self.timed_out = True
+                    self.release.set()  # остальные вызовы уже не ждут
+                return execute(query)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+        monkeypatch.setattr(FakeQuery, "execute", gated_execute)
+
+
+def _db() -> FakeSupabase:
+    players = [
+        {"id": f"p{i}", "telegram_id": 1000 + i, "name": f"Игрок {i}", "rating": 100 + i}
+        for i in range(N_UPDATES)
+    ]
+    return FakeSupabase({"players": players})
+
+
+class _FakeMessage:
+    def __init__(self):
+        self.answers: list[str] = []
+
+    async def answer(self, text: str, **kwargs) -> None:
+        self.answers.append(text)
+
+
+def test_concurrent_lookups_do_not_serialize(monkeypatch):
+    db = _db()
+    monkeypatch.setattr(supabase_client, "_get_client", lambda: db)
+    gate = _Gate(release_at=N_UPDATES)  # запросы отпускаются, только когда в пути все N
+    gate.install(monkeypatch)
+
+    async def run():
+        return await asyncio.gather(*(
+            supabase_client.get_player_by_telegram_id(1000 + i) for i in range(N_UPDATES)
+        ))
+
+    players = asyncio.run(run())
+    assert [p["id"] for p in players] == [f"p{i}" for i in range(N_UPDATES)]
+    assert gate.max_in_flight == N_UPDATES
+    assert not gate.timed_out
+
+
+def test_event_loop_stays_responsive_during_query(monkeypatch):
+    db = FakeSupabase({"players": []})
+    monkeypatch.setattr(supabase_client, "_get_client", lambda: db)
+    gate = _Gate()  # запрос отпускает сам event loop: если он заблокирован, тиков не будет
+    gate.install(monkeypatch)
+
+    async def run():
+        ticks_in_flight = 0
+
+        async def ticker():
+            nonlocal ticks_in_flight
+            while not gate.release.is_set():
+                await asyncio.sleep(0)
+                if gate.in_flight:
+                    ticks_in_flight += 1
+                    if ticks_in_flight >= 5:
+                        gate.release.set()
+
+        task = asyncio.create_task(ticker())
+        await supabase_client.get_rating_top()
+        await task
+        return ticks_in_flight
+
+    assert asyncio.run(run()) >= 5
+    assert not gate.timed_out
+
+
+def test_load_concurrent_rating_updates(monkeypatch):
+    """N одновременных /rating (по 2 запроса каждый) идут параллельно, а не друг за другом."""
+    db = _db()
+    monkeypatch.setattr(supabase_client, "_get_client", lambda: db)
+    gate = _Gate(release_at=N_UPDATES)
+    gate.install(monkeypatch)
+    messages = [_FakeMessage() for _ in range(N_UPDATES)]
+
+    async def run():
+        await asyncio.gather(*(
+            rating._send_rating(msg, 1000 + i) for i, msg in enumerate(messages)
+        ))
+
+    asyncio.run(run())
+    assert db.round_trips == 2 * N_UPDATES
+    assert all(m.answers and "Рейтинг (топ-20)" in m.answers[0] for m in messages)
+    assert gate.max_in_flight == N_UPDATES
+    assert not gate.timed_out
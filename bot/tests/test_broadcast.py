@@ -0,0 +1,223 @@
+"""
+Рассылки (services.broadcast): лимиты скорости, RetryAfter, результаты по получателям
+и использование в открытых заявках и напоминаниях о подтверждении матча.
+"""
+import asyncio
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+)
+from aiogram.methods import SendMessage
+
+from handlers import game_requests
+from services import scheduler
+from services.broadcast import (
+    DROPPED,
+    FAILED,
+    SENT,
+    Broadcaster,
+    OutgoingMessage,
+    RateLimiter,
+    split_message,
+)
+from tests.fake_supabase import FakeSupabase
+
+_METHOD = SendMessage(chat_id=0, text="")
+
+
+class VirtualTime:
+    """Виртуальные часы: sleep не ждёт, а переводит время вперёд."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def clock(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        target = self.now + seconds
+        await asyncio.sleep(0)
+        self.now = max(self.now, target)
+
+
+class FakeBot:
+    """errors: chat_id → исключения, которые send_message выбросит по очереди."""
+
+    def __init__(self, vt=None, errors=None):
+        self.vt = vt
+        self.errors = errors or {}
+        self.calls: list[int] = []
+        self.sent: list[tuple[int, str, float]] = []
+
+    async def send_message(self, chat_id, text, reply_markup=None, **kwargs):
+        self.calls.append(chat_id)
+        pending = self.errors.get(chat_id)
+        if pending:
+            raise pending.pop(0)
+        self.sent.append((chat_id, text, self.vt.now if self.vt else 0.0))
+
+
+def _broadcaster(vt: VirtualTime, **kwargs) -> Broadcaster:
+    return Broadcaster(clock=vt.clock, sleep=vt.sleep, **kwargs)
+
+
+def test_rate_limiter_allows_burst_then_spaces_messages():
+    limiter = RateLimiter(rate=10, burst=3, clock=lambda: 0.0)
+    delays = [round(limiter.reserve(), 3) for _ in range(6)]
+    assert delays == [0.0, 0.0, 0.0, 0.1, 0.2, 0.3]
+
+
+def test_global_rate_is_respected():
+    vt = VirtualTime()
+    bot = FakeBot(vt)
+    engine = _broadcaster(vt, rate=30, burst=1, concurrency=8)
+    report = asyncio.run(engine.send(bot, [OutgoingMessage(1000 + i, "hi") for i in range(90)]))
+
+    assert report.sent == 90
+    times = sorted(t for _, _, t in bot.sent)
+    for i in range(len(times) - 30):
+        assert times[i + 30] - times[i] >= 1.0 - 1e-9  # не больше 30 сообщений за секунду
+    assert 2.9 <= report.elapsed <= 3.1
+    assert engine.stats()["last_throughput"] == round(report.throughput, 1)
+
+
+def test_messages_to_one_chat_are_a_second_apart():
+    vt = VirtualTime()
+    bot = FakeBot(vt)
+    engine = _broadcaster(vt, concurrency=4)
+    asyncio.run(engine.send(bot, [OutgoingMessage(42, f"part {i}") for i in range(3)]))
+    assert [round(t, 3) for _, _, t in bot.sent] == [0.0, 1.0, 2.0]
+
+
+def test_retry_after_pauses_everyone_and_requeues():
+    vt = VirtualTime()
+    bot = FakeBot(vt, errors={2: [TelegramRetryAfter(_METHOD, "Flood", retry_after=5)]})
+    engine = _broadcaster(vt, rate=100, burst=1, concurrency=1)
+    report = asyncio.run(engine.send(bot, [OutgoingMessage(chat, "hi", key=chat) for chat in (1, 2, 3, 4)]))
+
+    assert [r.status for r in report.results] == [SENT] * 4
+    assert [r.attempts for r in report.results] == [1, 2, 1, 1]
+    sent_at = {chat: t for chat, _, t in bot.sent}
+    assert sent_at[1] < 1.0
+    assert all(sent_at[chat] >= 5.0 for chat in (2, 3, 4))
+    assert engine.stats()["retry_after"] == 1
+    assert engine.stats()["retried"] == 1
+
+
+def test_retry_after_gives_up_after_limit():
+    vt = VirtualTime()
+    flood = [TelegramRetryAfter(_METHOD, "Flood", retry_after=1) for _ in range(10)]
+    bot = FakeBot(vt, errors={7: flood})
+    engine = _broadcaster(vt, max_retry_after=2)
+    report = asyncio.run(engine.send(bot, [OutgoingMessage(7, "hi")]))
+    assert report.results[0].status == FAILED
+    assert report.results[0].attempts == 3
+
+
+def test_results_per_recipient():
+    vt = VirtualTime()
+    bot = FakeBot(vt, errors={
+        2: [TelegramForbiddenError(_METHOD, "bot was blocked by the user")],
+        3: [TelegramBadRequest(_METHOD, "chat not found")],
+        4: [TelegramNetworkError(_METHOD, "timeout"), TelegramNetworkError(_METHOD, "timeout")],
+        5: [TelegramNetworkError(_METHOD, "timeout") for _ in range(5)],
+    })
+    engine = _broadcaster(vt, max_attempts=3, backoff_base=0.5)
+    report = asyncio.run(engine.send(bot, [OutgoingMessage(c, "hi", key=f"p{c}") for c in range(1, 6)]))
+
+    assert [(r.key, r.status, r.attempts) for r in report.results] == [
+        ("p1", SENT, 1),
+        ("p2", DROPPED, 1),
+        ("p3", FAILED, 1),
+        ("p4", SENT, 3),
+        ("p5", FAILED, 3),
+    ]
+    assert "blocked" in report.results[1].error
+    assert report.delivered_keys() == ["p1", "p4"]
+    st = engine.stats()
+    assert (st["sent"], st["failed"], st["dropped"], st["retried"]) == (2, 2, 1, 4)
+
+
+def test_split_message_respects_telegram_limit():
+    text = "\n".join(f"  {i}. Игрок {i} — {i} очк." for i in range(600))
+    parts = split_message(text)
+    assert len(parts) > 1
+    assert all(len(p) <= 4096 for p in parts)
+    assert "\n".join(parts) == text
+    assert split_message("x" * 5000, limit=4096) == ["x" * 4096, "x" * 904]
+
+
+def test_open_game_request_reaches_everyone_but_requester(monkeypatch):
+    players = [{"id": f"p{i}", "name": f"Игрок {i}", "telegram_id": 1000 + i} for i in range(12)]
+    players.append({"id": "ghost", "name": "Без телеграма", "telegram_id": None})
+    db = FakeSupabase({
+        "players": players,
+        "game_requests": [{
+            "id": "r1", "requester_id": "p0", "type": "open_league",
+            "status": "pending", "notification_sent_at": None,
+        }],
+    })
+    vt = VirtualTime()
+    bot = FakeBot(vt, errors={1003: [TelegramForbiddenError(_METHOD, "bot was blocked by the user")]})
+    monkeypatch.setattr(game_requests, "_get_client", lambda: db)
+    monkeypatch.setattr(game_requests, "broadcaster", _broadcaster(vt))
+
+    assert asyncio.run(game_requests.send_open_game_request_notify("r1", bot)) is True
+    recipients = sorted(chat for chat, _, _ in bot.sent)
+    assert recipients == [1000 + i for i in range(1, 12) if i != 3]
+    assert "Игрок 0" in bot.sent[0][1]
+    assert db.tables["game_requests"][0]["notification_sent_at"] is not None
+
+
+def _pending_db(n: int) -> FakeSupabase:
+    players = [{"id": f"p{i}", "name": f"Игрок {i}", "telegram_id": 2000 + i} for i in range(2 * n)]
+    matches = [{
+        "id": f"m{i}",
+        "player1_id": f"p{2 * i}",
+        "player2_id": f"p{2 * i + 1}",
+        "sets_player1": 3,
+        "sets_player2": 1,
+        "submitted_by": f"p{2 * i}",
+        "status": "pending_confirm",
+        "notification_sent_at": None,
+    } for i in range(n)]
+    return FakeSupabase({"players": players, "matches": matches})
+
+
+def test_pending_confirm_reminders_are_batched(monkeypatch):
+    db = _pending_db(10)
+    vt = VirtualTime()
+    bot = FakeBot(vt, errors={2003: [TelegramForbiddenError(_METHOD, "bot was blocked by the user")]})
+    monkeypatch.setenv("WEBAPP_URL", "https://app.example")
+    monkeypatch.setattr(scheduler, "_get_client", lambda: db)
+    monkeypatch.setattr(scheduler, "broadcaster", _broadcaster(vt))
+
+    asyncio.run(scheduler._send_pending_confirm_notifications(bot))
+
+    assert db.round_trips == 2  # matches со встроенными игроками + один UPDATE
+    assert sorted(chat for chat, _, _ in bot.sent) == [2000 + 2 * i + 1 for i in range(10) if i != 1]
+    assert all("Игрок" in text and "3:1" in text for _, text, _ in bot.sent)
+    flagged = {m["id"]: m["notification_sent_at"] for m in db.tables["matches"]}
+    assert flagged["m1"] is None
+    assert all(v is not None for k, v in flagged.items() if k != "m1")
+
+
+def test_send_pending_confirm_for_single_match(monkeypatch):
+    db = _pending_db(2)
+    vt = VirtualTime()
+    bot = FakeBot(vt)
+    monkeypatch.setenv("WEBAPP_URL", "https://app.example")
+    monkeypatch.setattr(scheduler, "_get_client", lambda: db)
+    monkeypatch.setattr(scheduler, "broadcaster", _broadcaster(vt))
+
+    assert asyncio.run(scheduler.send_pending_confirm_for_match("m1", bot)) is True
+    assert db.round_trips == 2
+    assert [chat for chat, _, _ in bot.sent] == [2003]
+    assert db.tables["matches"][1]["notification_sent_at"] is not None
+    assert db.tables["matches"][0]["notification_sent_at"] is None
+    # повторный вызов ничего не шлёт
+    assert asyncio.run(scheduler.send_pending_confirm_for_match("m1", bot)) is True
+    assert len(bot.sent) == 1
@@ -0,0 +1,160 @@
+"""
+Закрытие тура (services.scheduler.close_tour): позиции, dry-run и константное число запросов.
+"""
+import asyncio
+import itertools
+
+import pytest
+
+from services import scheduler
+from tests.fake_supabase import FakeSupabase
+
+SEASON = "season-1"
+
+
+def _season(n_divisions: int, n_players: int) -> FakeSupabase:
+    """Активный сезон: в каждом дивизионе круговой турнир, p_i обыгрывает p_j при i < j;
+    последний матч каждого дивизиона ещё pending_confirm."""
+    divisions, dps, matches, players = [], [], [], []
+    for d in range(n_divisions):
+        div_id = f"d{d}"
+        divisions.append({"id": div_id, "season_id": SEASON, "number": d + 1})
+        pids = [f"{div_id}-p{i}" for i in range(n_players)]
+        players.extend({"id": pid, "name": f"Игрок {pid}"} for pid in pids)
+        pairs = list(itertools.combinations(range(n_players), 2))
+        for k, (i, j) in enumerate(pairs):
+            matches.append({
+                "id": f"{div_id}-m{i}-{j}",
+                "division_id": div_id,
+                "player1_id": pids[i],
+                "player2_id": pids[j],
+                "sets_player1": 3,
+                "sets_player2": 1,
+                "status": "pending_confirm" if k == len(pairs) - 1 else "played",
+                "submitted_by": pids[i],
+                "notification_sent_at": None,
+            })
+        # Перечислены в обратном порядке, position пока не задан
+        for i in reversed(range(n_players)):
+            wins = n_players - 1 - i
+            losses = i
+            dps.append({
+                "id": f"{div_id}-dp{i}",
+                "division_id": div_id,
+                "player_id": pids[i],
+                "total_points": 2 * wins + losses,
+                "total_sets_won": 3 * wins + losses,
+                "total_sets_lost": wins + 3 * losses,
+                "position": None,
+            })
+    return FakeSupabase({
+        "seasons": [{"id": SEASON, "name": "Май 2026", "year": 2026, "month": 5, "status": "active"}],
+        "divisions": divisions,
+        "division_players": dps,
+        "matches": matches,
+        "players": players,
+    })
+
+
+def _close(db, monkeypatch, dry_run=False) -> str:
+    monkeypatch.setattr(scheduler, "_get_client", lambda: db)
+    return asyncio.run(scheduler.close_tour(dry_run=dry_run))
+
+
+def test_close_tour_writes_positions_and_closes_season(monkeypatch):
+    db = _season(2, 4)
+    report = _close(db, monkeypatch)
+    positions = {r["player_id"]: r["position"] for r in db.tables["division_players"]}
+    assert positions["d0-p0"] == 1
+    assert positions["d0-p3"] == 4
+    assert positions["d1-p1"] == 2
+    assert db.tables["seasons"][0]["status"] == "closed"
+    leftovers = [m for m in db.tables["matches"] if m["status"] in ("pending", "pending_confirm")]
+    assert leftovers == []
+    not_played = [m for m in db.tables["matches"] if m["status"] == "not_played"]
+    assert len(not_played) == 2
+    assert all(m["sets_player1"] == 0 and m["submitted_by"] is None for m in not_played)
+    assert "Тур закрыт: Май 2026" in report
+    assert "1. Игрок d0-p0 — 6 очк." in report
+
+
+def test_close_tour_head_to_head_breaks_ties(monkeypatch):
+    db = _season(1, 3)
+    # Все трое с равными очками и разницей сетов; личная встреча p2–p1 выиграна p2
+    for row in db.tables["division_players"]:
+        row.update({"total_points": 3, "total_sets_won": 4, "total_sets_lost": 4})
+    db.tables["matches"] = [
+        {"id": "m1", "division_id": "d0", "player1_id": "d0-p1", "player2_id": "d0-p2",
+         "sets_player1": 1, "sets_player2": 3, "status": "played"},
+    ]
+    _close(db, monkeypatch)
+    positions = {r["player_id"]: r["position"] for r in db.tables["division_players"]}
+    assert positions["d0-p2"] < positions["d0-p1"]
+
+
+def test_close_tour_dry_run_does_not_write(monkeypatch):
+    db = _season(2, 4)
+    report = _close(db, monkeypatch, dry_run=True)
+    assert {op for _, op in db.calls} == {"select"}
+    assert db.tables["seasons"][0]["status"] == "active"
+    assert all(r["position"] is None for r in db.tables["division_players"])
+    assert "Предпросмотр закрытия тура: Май 2026" in report
+    # Отчёт совпадает с реальным закрытием, кроме заголовка
+    real = _close(db, monkeypatch)
+    assert report.split("\n")[1:] == real.split("\n")[1:]
+
+
+def test_close_tour_without_active_season(monkeypatch):
+    db = FakeSupabase({"seasons": []})
+    assert _close(db, monkeypatch) == "Нет активного сезона."
+
+
+def test_close_tour_reads_season_past_max_rows(monkeypatch):
+    """Матчей сезона больше, чем PostgREST отдаёт за ответ: позиции считаются по всем матчам."""
+    db = _season(5, 24)  # 5 × 276 = 1380 матчей
+    db.max_rows = 1000
+    played = sum(m["status"] == "played" for m in db.tables["matches"])
+    ranked = []
+    rank_division = scheduler.rank_division
+    monkeypatch.setattr(
+        scheduler, "rank_division", lambda rows, matches: ranked.extend(matches) or rank_division(rows, matches)
+    )
+    _close(db, monkeypatch, dry_run=True)
+    assert len(ranked) == played > 1000
+
+
+@pytest.mark.parametrize("n_divisions,n_players", [(2, 6), (4, 8), (6, 12)])
+def test_benchmark_round_trips_per_close_tour(monkeypatch, n_divisions, n_players):
+    """
+    Бенчмарк: раньше 1 + 2·D (матчи) + D·(4 + N) запросов, теперь 5 чтений + 3 записи.
+    """
+    db = _season(n_divisions, n_players)
+    _close(db, monkeypatch)
+    assert db.round_trips == 8
+
+
+def test_closetour_command_sends_long_report_in_parts(monkeypatch):
+    from types import SimpleNamespace
+
+    from handlers import admin
+    from services.broadcast import TELEGRAM_MESSAGE_LIMIT
+
+    class Message:
+        def __init__(self):
+            self.answers: list[str] = []
+
+        async def answer(self, text: str, **kwargs) -> None:
+            assert len(text) <= TELEGRAM_MESSAGE_LIMIT  # иначе TelegramBadRequest уже после закрытия тура
+            self.answers.append(text)
+
+    async def allow(message):
+        return True
+
+    db = _season(12, 14)
+    monkeypatch.setattr(admin, "_admin_only", allow)
+    report = _close(db, monkeypatch, dry_run=True)
+    assert len(report) > TELEGRAM_MESSAGE_LIMIT
+    message = Message()
+    asyncio.run(admin.cmd_closetour(message, SimpleNamespace(args="preview")))
+    assert len(message.answers) > 1
+    assert "\n".join(message.answers) == report
@@ -0,0 +1,113 @@
+"""
+Отчёт о согласованности (services.consistency): то же, что прежний отчёт по дивизиону,
+но весь сезон за три выборки и сверка по словарям.
+"""
+import random
+
+from services.consistency import division_reports, iter_consistency_reports
+from tests.fake_supabase import FakeSupabase
+
+SCORES = [(3, 0), (3, 1), (3, 2), (0, 3), (1, 3), (2, 3)]
+
+
+def _season(n_divisions=4, n_players=8, seed=3):
+    rnd = random.Random(seed)
+    tables = {"seasons": [{"id": "s1"}], "divisions": [], "players": [], "matches": [],
+              "rating_history": [], "division_players": []}
+    for d in range(n_divisions):
+        div = f"d{d}"
+        tables["divisions"].append({"id": div, "season_id": "s1", "number": d + 1, "coef": 0.25})
+        pids = [f"{div}-p{i}" for i in range(n_players)]
+        tables["players"] += [{"id": p, "name": p, "rating": 100} for p in pids]
+        totals = {p: [0, 0, 0] for p in pids}
+        for a in range(n_players):
+            for b in range(a + 1, n_players):
+                mid = f"{div}-m{a}-{b}"
+                played = rnd.random() < 0.7
+                s1, s2 = rnd.choice(SCORES) if played else (0, 0)
+                tables["matches"].append({
+                    "id": mid, "division_id": div, "player1_id": pids[a], "player2_id": pids[b],
+                    "sets_player1": s1, "sets_player2": s2, "status": "played" if played else "pending",
+                })
+                if not played:
+                    continue
+                for pid in (pids[a], pids[b]):
+                    tables["rating_history"].append({"id": f"h-{mid}-{pid}", "player_id": pid, "match_id": mid, "season_id": "s1"})
+                for pid, won, lost in ((pids[a], s1, s2), (pids[b], s2, s1)):
+                    totals[pid][0] += 2 if won > lost else 1
+                    totals[pid][1] += won
+                    totals[pid][2] += lost
+        tables["division_players"] += [
+            {"id": f"dp-{p}", "division_id": div, "player_id": p,
+             "total_points": t[0], "total_sets_won": t[1], "total_sets_lost": t[2]}
+            for p, t in totals.items()
+        ]
+    return FakeSupabase(tables)
+
+
+def _reference(db, division_id):
+    """Прежний отчёт: выборки одного дивизиона и подсчёт по каждому матчу."""
+    matches = [m for m in db.tables["matches"] if m["division_id"] == division_id]
+    played = [m["id"] for m in matches if m["status"] == "played"]
+    history = [h["match_id"] for h in db.tables["rating_history"] if h["match_id"] in played]
+    missing = [{"match_id": mid, "history_rows": history.count(mid)} for mid in played if history.count(mid) != 2]
+    calc = {}
+    for m in matches:
+        if m["status"] != "played":
+            continue
+        s1, s2 = m["sets_player1"], m["sets_player2"]
+        for pid, won, lost in ((m["player1_id"], s1, s2), (m["player2_id"], s2, s1)):
+            t = calc.setdefault(pid, {"points": 0, "sets_won": 0, "sets_lost": 0})
+            t["points"] += 2 if won > lost else 1
+            t["sets_won"] += won
+            t["sets_lost"] += lost
+    mismatches = []
+    for row in db.tables["division_players"]:
+        if row["division_id"] != division_id:
+            continue
+        agg = calc.get(row["player_id"], {"points": 0, "sets_won": 0, "sets_lost": 0})
+        stored = {"points": row["total_points"], "sets_won": row["total_sets_won"], "sets_lost": row["total_sets_lost"]}
+        if stored != agg:
+            mismatches.append({"player_id": row["player_id"], "division_player_id": row["id"],
+                               "stored": stored, "calculated": agg})
+    return {"division_id": division_id, "missing_rating_history": missing, "totals_mismatches": mismatches}
+
+
+def _break(db):
+    """Потерянная запись истории, лишняя запись, сбитые totals и матч, ставший сыгранным без истории."""
+    history = db.tables["rating_history"]
+    history.remove(next(h for h in history if h["match_id"].startswith("d1-")))
+    history.append(dict(next(h for h in history if h["match_id"].startswith("d2-")), id="dup"))
+    db.tables["division_players"][3]["total_points"] += 2
+    pending = next(m for m in db.tables["matches"] if m["status"] == "pending" and m["division_id"] == "d3")
+    pending.update(status="played", sets_player1=3, sets_player2=1)
+
+
+def test_season_report_matches_per_division_reference():
+    db = _season()
+    assert all(not r["missing_rating_history"] and not r["totals_mismatches"]
+               for r in iter_consistency_reports(db, ["d0", "d1", "d2", "d3"]))
+    _break(db)
+    db.reset_counters()
+    reports = list(iter_consistency_reports(db, ["d0", "d1", "d2", "d3"]))
+    assert db.round_trips == 3  # матчи, история, division_players — на весь сезон
+    assert reports == [_reference(db, d) for d in ("d0", "d1", "d2", "d3")]
+    assert [len(r["missing_rating_history"]) for r in reports] == [0, 1, 1, 1]
+    assert reports[0]["totals_mismatches"][0]["division_player_id"] == "dp-d0-p3"
+
+
+def test_batches_keep_query_count_independent_of_size():
+    db = _season(n_divisions=5, n_players=12)
+    reports = list(iter_consistency_reports(db, [f"d{i}" for i in range(5)], batch=2))
+    assert [r["division_id"] for r in reports] == [f"d{i}" for i in range(5)]
+    assert db.round_trips == 9  # три пачки × три выборки
+
+
+def test_division_reports_from_plain_rows():
+    matches = [{"id": "m1", "division_id": "d", "player1_id": "a", "player2_id": "b",
+                "sets_player1": 3, "sets_player2": 2, "status": "played"}]
+    dps = [{"id": "x", "division_id": "d", "player_id": "a", "total_points": 2, "total_sets_won": 3, "total_sets_lost": 2},
+           {"id": "y", "division_id": "d", "player_id": "c", "total_points": 0}]
+    (report,) = division_reports(["d"], matches, [{"match_id": "m1"}], dps)
+    assert report["missing_rating_history"] == [{"match_id": "m1", "history_rows": 1}]
+    assert report["totals_mismatches"] == []
@@ -0,0 +1,144 @@
+"""
+Кэш игроков по telegram_id (services.player_cache): LRU, TTL, инвалидация и экономия запросов.
+"""
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import notify_server
+from services import supabase_client
+from services.player_cache import PlayerCache, player_cache
+from tests.fake_supabase import FakeQuery, FakeSupabase
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _db() -> FakeSupabase:
+    return FakeSupabase({"players": [
+        {"id": "p1", "telegram_id": 111, "name": "Анна", "rating": 100},
+        {"id": "p2", "telegram_id": 222, "name": "Борис", "rating": 105},
+    ]})
+
+
+def test_ttl_expiry_and_counters():
+    clock = _Clock()
+    cache = PlayerCache(maxsize=10, ttl=30, clock=clock)
+    assert cache.get(1) is None
+    cache.put(1, {"id": "p1"})
+    assert cache.get(1) == {"id": "p1"}
+    clock.now = 31
+    assert cache.get(1) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_evicts_least_recently_used():
+    cache = PlayerCache(maxsize=2, ttl=60)
+    cache.put(1, {"id": "a"})
+    cache.put(2, {"id": "b"})
+    cache.get(1)
+    cache.put(3, {"id": "c"})
+    assert cache.get(2) is None
+    assert cache.get(1) == {"id": "a"}
+    assert cache.get(3) == {"id": "c"}
+
+
+def test_invalidate_by_player_id_and_copies():
+    cache = PlayerCache()
+    cache.put(1, {"id": "a", "name": "Old"})
+    cache.get(1)["name"] = "mutated"
+    assert cache.get(1)["name"] == "Old"
+    assert cache.invalidate(player_id="a") == 1
+    assert cache.get(1) is None
+
+
+def test_repeated_lookups_hit_db_once(monkeypatch):
+    db = _db()
+    monkeypatch.setattr(supabase_client, "_get_client", lambda: db)
+
+    async def press_button():
+        # Хендлер, is_admin и вложенный вызов ищут одного и того же игрока
+        return [await supabase_client.get_player_by_telegram_id(111) for _ in range(3)]
+
+    players = asyncio.run(press_button())
+    assert all(p["name"] == "Анна" for p in players)
+    assert db.round_trips == 1
+    assert player_cache.stats()["hits"] == 2
+    assert player_cache.stats()["misses"] == 1
+
+
+def test_unknown_player_is_not_cached(monkeypatch):
+    db = _db()
+    monkeypatch.setattr(supabase_client, "_get_client", lambda: db)
+    assert asyncio.run(supabase_client.get_player_by_telegram_id(999)) is None
+    asyncio.run(supabase_client.create_player(telegram_id=999, name="Новый"))
+    db.reset_counters()
+    player = asyncio.run(supabase_client.get_player_by_telegram_id(999))
+    assert player["name"] == "Новый"
+    assert db.round_trips == 0
+
+
+def test_notify_player_updated_invalidates_cache(monkeypatch):
+    monkeypatch.delenv("NOTIFY_SECRET", raising=False)
+    db = _db()
+    monkeypatch.setattr(supabase_client, "_get_client", lambda: db)
+
+    async def run():
+        await supabase_client.get_player_by_telegram_id(111)
+        await supabase_client.get_player_by_telegram_id(222)
+        db.tables["players"][0]["name"] = "Анна Петрова"
+        async with TestClient(TestServer(notify_server.create_app())) as client:
+            resp = await client.post("/notify-player-updated", json={"player_ids": ["p1"]})
+            body = await resp.json()
+        return body, await supabase_client.get_player_by_telegram_id(111)
+
+    body, player = asyncio.run(run())
+    assert body == {"ok": True, "invalidated": 1}
+    assert player["name"] == "Анна Петрова"
+    assert player_cache.stats()["size"] == 2
+
+
+def test_invalidation_during_fetch_is_not_overwritten(monkeypatch):
+    db = _db()
+    monkeypatch.setattr(supabase_client, "_get_client", lambda: db)
+    execute = FakeQuery.execute
+
+    def execute_then_invalidate(query):
+        # Строка прочитана, и до put приходит уведомление об изменении игрока
+        result = execute(query)
+        player_cache.invalidate(player_id="p1")
+        return result
+
+    monkeypatch.setattr(FakeQuery, "execute", execute_then_invalidate)
+    assert supabase_client._fetch_player_by_telegram_id(111)["name"] == "Анна"
+    assert player_cache.get(111) is None
+
+
+def test_put_with_stale_generation_is_noop():
+    cache = PlayerCache()
+    generation = cache.generation(1)
+    cache.invalidate(telegram_id=1)
+    cache.put(1, {"id": "a"}, generation)
+    assert cache.get(1) is None
+    generation = cache.generation(1)
+    cache.put(1, {"id": "a"}, generation)
+    assert cache.get(1) == {"id": "a"}
+
+
+def test_invalidation_marks_stay_bounded():
+    cache = PlayerCache(maxsize=8)
+    in_flight = cache.generation(1)
+    for telegram_id in range(1, 10_000):
+        cache.put(telegram_id, {"id": f"p{telegram_id}"})
+        cache.invalidate(telegram_id=telegram_id)
+    assert len(cache._invalidated) == 8
+    cache.put(1, {"id": "stale"}, in_flight)  # отметка ключа 1 давно вытеснена, но граница её помнит
+    assert cache.get(1) is None
+    cache.put(1, {"id": "fresh"}, cache.generation(1))
+    assert cache.get(1) == {"id": "fresh"}
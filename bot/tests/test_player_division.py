@@ -0,0 +1,73 @@
+"""
+get_player_division: дивизион, сезон и состав игрока одним встроенным select.
+"""
+import asyncio
+
+import pytest
+
+from services import supabase_client
+from tests.fake_supabase import FakeSupabase
+
+ME = "me"
+
+
+def _league(n_divisions: int, my_division: int, per_division: int = 6) -> FakeSupabase:
+    """Закрытый прошлый сезон (игрок был в дивизионе 1) и активный сезон из n дивизионов."""
+    seasons = [
+        {"id": "s-old", "year": 2026, "month": 4, "name": "Апрель 2026", "status": "closed"},
+        {"id": "s-now", "year": 2026, "month": 5, "name": "Май 2026", "status": "active"},
+    ]
+    divisions = [{"id": "old-d1", "season_id": "s-old", "number": 1, "coef": 0.30}]
+    dps = [{"id": "dp-old", "division_id": "old-d1", "player_id": ME, "position": 3}]
+    players = [{"id": ME, "name": "Я", "telegram_id": 1, "telegram_username": "me", "rating": 100}]
+    for k in range(1, n_divisions + 1):
+        div_id = f"d{k}"
+        divisions.append({"id": div_id, "season_id": "s-now", "number": k, "coef": 0.25})
+        members = [f"{div_id}-p{i}" for i in range(per_division - (1 if k == my_division else 0))]
+        if k == my_division:
+            members.append(ME)
+        for pid in members:
+            if pid != ME:
+                players.append({"id": pid, "name": f"Игрок {pid}", "telegram_id": None, "telegram_username": None})
+            dps.append({"id": f"dp-{div_id}-{pid}", "division_id": div_id, "player_id": pid, "total_points": 0})
+    return FakeSupabase({"seasons": seasons, "divisions": divisions, "division_players": dps, "players": players})
+
+
+def _get(db, monkeypatch, *args):
+    monkeypatch.setattr(supabase_client, "_get_client", lambda: db)
+    return asyncio.run(supabase_client.get_player_division(*args))
+
+
+def test_returns_division_season_and_roster(monkeypatch):
+    db = _league(4, my_division=3)
+    data = _get(db, monkeypatch, ME)
+    assert data["division"]["id"] == "d3"
+    assert data["division"]["number"] == 3
+    assert "division_players" not in data["division"] and "season" not in data["division"]
+    assert data["season"]["id"] == "s-now"
+    roster = data["division_players"]
+    assert len(roster) == 6
+    me = next(dp for dp in roster if dp["player_id"] == ME)
+    assert me["player"] == {"id": ME, "name": "Я", "telegram_id": 1, "telegram_username": "me"}
+
+
+def test_explicit_season(monkeypatch):
+    db = _league(4, my_division=3)
+    data = _get(db, monkeypatch, ME, "s-old")
+    assert data["division"]["id"] == "old-d1"
+    assert data["season"]["status"] == "closed"
+    assert [dp["player_id"] for dp in data["division_players"]] == [ME]
+
+
+def test_player_without_division(monkeypatch):
+    db = _league(3, my_division=1)
+    assert _get(db, monkeypatch, "stranger") is None
+    assert db.round_trips == 1
+
+
+@pytest.mark.parametrize("n_divisions", [2, 4, 8])
+def test_round_trips_do_not_depend_on_divisions(monkeypatch, n_divisions):
+    """Регрессия: раньше 2 + D (поиск по дивизионам) + 2 запроса, теперь всегда 1."""
+    db = _league(n_divisions, my_division=n_divisions)
+    assert _get(db, monkeypatch, ME)["division"]["number"] == n_divisions
+    assert db.round_trips == 1
@@ -0,0 +1,90 @@
+"""
+Игроки встроены в выборку матча / заявки (services.player_embed): уведомления читают
+всё одним запросом, hydrate_players добирает недостающих одним in_.
+"""
+import asyncio
+
+from handlers import game_requests
+from services.player_embed import embed_players, hydrate_players
+from tests.fake_supabase import FakeSupabase
+
+PLAYERS = [
+    {"id": "p1", "name": "Анна", "telegram_id": 101},
+    {"id": "p2", "name": "Борис", "telegram_id": 102},
+    {"id": "p3", "name": "Вера", "telegram_id": None},
+]
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id, text, reply_markup=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+def test_embed_players_builds_aliases_from_fk_columns():
+    assert embed_players("player1_id", "accepted_by_id", fields="id") == (
+        "player1:players!player1_id(id), accepted_by:players!accepted_by_id(id)"
+    )
+    assert embed_players("submitted_by", fields="id") == "submitted_by_player:players!submitted_by(id)"
+
+
+def test_embedded_select_returns_players_with_match():
+    db = FakeSupabase({
+        "players": PLAYERS,
+        "matches": [{"id": "m1", "player1_id": "p1", "player2_id": "p2"}],
+    })
+    r = db.table("matches").select("id, " + embed_players("player1_id", "player2_id")).execute()
+    assert db.round_trips == 1
+    assert r.data[0]["player1"] == {"id": "p1", "name": "Анна", "telegram_id": 101}
+    assert r.data[0]["player2"]["name"] == "Борис"
+
+
+def test_hydrate_players_batches_missing_ids_into_one_query():
+    db = FakeSupabase({"players": PLAYERS})
+    rows = [
+        {"id": "m1", "player1_id": "p1", "player2_id": "p2"},
+        {"id": "m2", "player1_id": "p2", "player2_id": "p3"},
+        {"id": "m3", "player1_id": "p1", "player2_id": "gone"},
+    ]
+    players = hydrate_players(db, rows, "player1_id", "player2_id")
+    assert db.round_trips == 1
+    assert set(players) == {"p1", "p2", "p3"}
+    assert rows[1]["player2"]["name"] == "Вера"
+    assert rows[2]["player2"] is None  # удалённый игрок
+
+    # уже встроенные не запрашиваются повторно
+    assert hydrate_players(db, rows, "player1_id", "player2_id") == players
+    assert db.round_trips == 1
+
+
+def test_accepted_notify_reads_request_and_players_in_one_query(monkeypatch):
+    db = FakeSupabase({
+        "players": PLAYERS,
+        "game_requests": [{"id": "r1", "requester_id": "p1", "accepted_by_id": "p2", "status": "accepted"}],
+    })
+    monkeypatch.setattr(game_requests, "_get_client", lambda: db)
+    bot = RecordingBot()
+
+    assert asyncio.run(game_requests.send_game_request_accepted_notify("r1", bot)) is True
+    assert db.round_trips == 1
+    assert [chat for chat, _ in bot.sent] == [101, 102]
+    assert "Борис" in bot.sent[0][1] and "Анна" in bot.sent[1][1]
+
+
+def test_challenge_notify_embeds_requester_and_target(monkeypatch):
+    db = FakeSupabase({
+        "players": PLAYERS,
+        "game_requests": [{
+            "id": "r1", "requester_id": "p2", "target_player_id": "p1", "type": "division_challenge",
+            "status": "pending", "notification_sent_at": None,
+        }],
+    })
+    monkeypatch.setattr(game_requests, "_get_client", lambda: db)
+    bot = RecordingBot()
+
+    assert asyncio.run(game_requests.send_game_request_notify("r1", bot)) is True
+    assert db.round_trips == 2  # заявка с игроками + отметка notification_sent_at
+    assert bot.sent[0][0] == 101
+    assert "Борис" in bot.sent[0][1]
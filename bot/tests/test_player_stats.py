@@ -0,0 +1,62 @@
+"""
+Статистика игроков для рейтинга (services.player_stats): модель, как в player_stats (006),
+и пересборка player_match_stats через RPC.
+"""
+import pytest
+from postgrest.exceptions import APIError
+
+from services.player_stats import compute_player_stats, rebuild_player_stats
+from tests.fake_supabase import FakeSupabase
+
+
+def _match(i, p1, p2, s1, s2, status="played", day=1):
+    return {
+        "id": f"m{i}",
+        "player1_id": p1,
+        "player2_id": p2,
+        "sets_player1": s1,
+        "sets_player2": s2,
+        "status": status,
+        "played_at": f"2026-05-{day:02d}T12:00:00+00:00" if status == "played" else None,
+    }
+
+
+MATCHES = [
+    _match(1, "a", "b", 3, 1, day=3),
+    _match(2, "b", "c", 3, 2, day=5),
+    _match(3, "c", "a", 0, 3, day=4),
+    _match(4, "a", "c", 0, 0, status="pending"),
+    _match(5, "b", "a", 2, 3, status="pending_confirm"),
+]
+
+
+def test_compute_player_stats_matches_view_semantics():
+    stats = compute_player_stats(MATCHES)
+    assert stats["a"] == {
+        "games": 2, "wins": 2, "sets_won": 6, "sets_lost": 1,
+        "last_played_at": "2026-05-04T12:00:00+00:00",
+    }
+    assert stats["b"] == {
+        "games": 2, "wins": 1, "sets_won": 4, "sets_lost": 5,
+        "last_played_at": "2026-05-05T12:00:00+00:00",
+    }
+    assert (stats["c"]["games"], stats["c"]["wins"]) == (2, 0)
+
+
+def test_rebuild_uses_rpc_when_available():
+    db = FakeSupabase({"matches": MATCHES})
+    db.rpcs["refresh_player_stats"] = lambda params: 3
+    assert rebuild_player_stats(db) == 3
+    assert db.calls == [("refresh_player_stats", "rpc")]
+
+
+def test_rebuild_without_migration_raises():
+    db = FakeSupabase({"matches": MATCHES})
+
+    def missing(params):
+        raise APIError({"code": "PGRST202", "message": "Could not find the function"})
+
+    db.rpcs["refresh_player_stats"] = missing
+    with pytest.raises(APIError):
+        rebuild_player_stats(db)
+    assert db.calls == [("refresh_player_stats", "rpc")]  # без чтения и удаления строк
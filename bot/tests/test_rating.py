@@ -1,10 +1,15 @@
 """
 Unit-тесты расчёта рейтинга ФНТР.
 """
+import random
+import struct
+from decimal import Decimal
+
 import pytest
 from services.rating_calculator import (
     calculate_score_coef,
     calculate_match_rating,
+    calculate_match_ratings,
 )
 
 
@@ -81,3 +86,51 @@ class TestCalculateMatchRating:
         d1_w, _ = calculate_match_rating(100.0, 100.0, 3, 0, 0.30)
         d2_w, _ = calculate_match_rating(100.0, 100.0, 3, 0, 0.22)
         assert d1_w > d2_w
+
+
+def _reference(winner_rating, loser_rating, winner_sets, loser_sets, kd):
+    """Прежняя реализация (Decimal на каждый вызов) — эталон для целочисленного пути."""
+    if winner_sets == 0 and loser_sets == 0:
+        return (0.0, 0.0)
+    ks = {(3, 0): "1.2", (0, 3): "1.2", (3, 2): "0.8", (2, 3): "0.8"}.get((winner_sets, loser_sets), "1.0")
+    base = (Decimal("100") - (Decimal(str(winner_rating)) - Decimal(str(loser_rating)))) / Decimal("10")
+    dw = (base * Decimal(str(kd)) * Decimal(ks)).quantize(Decimal("0.01"))
+    dl = -(base / Decimal("2") * Decimal(str(kd)) * Decimal(ks)).quantize(Decimal("0.01"))
+    return (float(dw), float(dl))
+
+
+def _bits(pair):
+    return tuple(struct.pack("<d", x) for x in pair)
+
+
+def _random_case(rnd):
+    """Рейтинги numeric(10,2), иногда «грязные» float, разница больше 100 (дельта ≤ 0), КД numeric(4,2)."""
+    rating = lambda: rnd.choice([round(rnd.uniform(0, 500), 2), round(rnd.uniform(0, 500), rnd.randint(0, 6))])
+    ws, ls = rnd.choice([(3, 0), (3, 1), (3, 2), (0, 0), (2, 2), (1, 0)])
+    kd = rnd.choice([0.22, 0.25, 0.27, 0.3, 0.5, 1.0, round(rnd.uniform(0, 2), 2), 0.333])
+    return rating(), rating(), ws, ls, kd
+
+
+def test_matches_reference_bit_for_bit():
+    rnd = random.Random(2024)
+    for _ in range(20000):
+        case = _random_case(rnd)
+        assert _bits(calculate_match_rating(*case)) == _bits(_reference(*case)), case
+
+
+def test_rounding_edges_match_reference():
+    """Половина сотой (к чётному), ноль со знаком при разнице ровно 100 и больше."""
+    cases = [
+        (100.0, 100.05, 3, 2, 0.25), (100.0, 100.15, 3, 1, 0.25), (100.25, 100.0, 3, 1, 0.3),
+        (200.0, 100.0, 3, 1, 0.3), (200.01, 100.0, 3, 2, 0.25), (199.99, 100.0, 3, 2, 0.25),
+        (300.0, 100.0, 3, 0, 0.25), (0.0, 0.0, 3, 0, 0.0),
+    ]
+    for case in cases:
+        assert _bits(calculate_match_rating(*case)) == _bits(_reference(*case)), case
+
+
+def test_batch_matches_single_calls():
+    rnd = random.Random(7)
+    cases = [_random_case(rnd) for _ in range(2000)]
+    deltas_w, deltas_l = calculate_match_ratings(*zip(*cases))
+    assert [_bits(pair) for pair in zip(deltas_w, deltas_l)] == [_bits(_reference(*c)) for c in cases]
@@ -0,0 +1,147 @@
+"""
+Переигровка рейтинга (services.rating_replay): совпадение с calculate_match_rating бит в бит,
+разница с сохранёнными данными и запись bulk-запросами за константное число round-trip'ов.
+"""
+import itertools
+import random
+
+from services.rating_calculator import calculate_match_rating, match_deltas_centi
+from services.rating_replay import apply_replay_diff, replay_matches, replay_ratings
+from tests.fake_supabase import FakeSupabase
+
+SCORES = [(3, 0), (3, 1), (3, 2), (0, 3), (1, 3), (2, 3)]
+
+
+def _reference(matches, seeds, coefs):
+    """Старый путь: матч за матчем через calculate_match_rating (Decimal), округление как в API."""
+    ratings = dict(seeds)
+    for m in sorted(matches, key=lambda m: (m["played_at"], m["id"])):
+        p1, p2, s1, s2 = m["player1_id"], m["player2_id"], m["sets_player1"], m["sets_player2"]
+        w, l, ws, ls = (p1, p2, s1, s2) if s1 > s2 else (p2, p1, s2, s1)
+        rw, rl = ratings.setdefault(w, 100.0), ratings.setdefault(l, 100.0)
+        dw, dl = calculate_match_rating(rw, rl, ws, ls, coefs[m["division_id"]])
+        ratings[w] = round((rw + dw) * 100) / 100
+        ratings[l] = round((rl + dl) * 100) / 100
+    return ratings
+
+
+def _season(n_players=12, n_matches=300, seed=7):
+    rnd = random.Random(seed)
+    pids = [f"p{i}" for i in range(n_players)]
+    coefs = {"d1": 0.25, "d2": 0.5, "d3": 1.0}
+    matches = []
+    for k in range(n_matches):
+        p1, p2 = rnd.sample(pids, 2)
+        s1, s2 = rnd.choice(SCORES)
+        matches.append({
+            "id": f"m{k:05d}",
+            "division_id": rnd.choice(list(coefs)),
+            "player1_id": p1,
+            "player2_id": p2,
+            "sets_player1": s1,
+            "sets_player2": s2,
+            "played_at": f"2025-{1 + k // 100:02d}-01T{k % 24:02d}:{k % 60:02d}:00+00:00",
+        })
+    seeds = {pid: round(rnd.uniform(20, 400), 2) for pid in pids}
+    return matches, seeds, coefs
+
+
+def test_match_deltas_match_decimal_calculator():
+    for rw, rl in itertools.product([0, 55.55, 100, 100.05, 123.45, 250, 399.99], repeat=2):
+        for (ws, ls), ks10 in (((3, 0), 12), ((3, 1), 10), ((3, 2), 8)):
+            for kd in (0.25, 0.3, 0.5, 0.75, 1.0, 1.25):
+                dw, dl = match_deltas_centi(round(rw * 100), round(rl * 100), ks10, round(kd * 100))
+                assert (dw / 100, dl / 100) == calculate_match_rating(rw, rl, ws, ls, kd)
+
+
+def test_replay_matches_reference_trajectory():
+    matches, seeds, coefs = _season()
+    replay = replay_matches(matches, seeds, coefs)
+    assert replay.final_ratings() == _reference(matches, seeds, coefs)
+    # Траектория: рейтинг после матча = рейтинг до следующего матча игрока
+    last = {}
+    for k, m in enumerate(replay.matches):
+        for idx, before, delta in (
+            (replay.winners[k], replay.winner_before[k], replay.winner_delta[k]),
+            (replay.losers[k], replay.loser_before[k], replay.loser_delta[k]),
+        ):
+            if idx in last:
+                assert last[idx] == before
+            last[idx] = before + delta
+
+
+def _db(matches, seeds, coefs):
+    """БД, где история записана по старой формуле, а затем исправили счёт первого матча."""
+    history = []
+    ratings = dict(seeds)
+    for m in sorted(matches, key=lambda m: (m["played_at"], m["id"])):
+        before = {p: ratings[p] for p in (m["player1_id"], m["player2_id"])}
+        after = _reference([m], before, coefs)
+        for pid in before:
+            history.append({
+                "id": f"h-{m['id']}-{pid}",
+                "player_id": pid,
+                "match_id": m["id"],
+                "season_id": "s1",
+                "rating_before": before[pid],
+                "rating_delta": round(after[pid] - before[pid], 2),
+                "rating_after": after[pid],
+                "created_at": m["played_at"],
+            })
+        ratings.update(after)
+    dps = [
+        {"id": f"dp-{d}-{p}", "division_id": d, "player_id": p, "rating_delta": 0}
+        for d in coefs for p in seeds
+    ]
+    for row in history:
+        div = next(m["division_id"] for m in matches if m["id"] == row["match_id"])
+        dp = next(dp for dp in dps if dp["division_id"] == div and dp["player_id"] == row["player_id"])
+        dp["rating_delta"] = round(dp["rating_delta"] + row["rating_delta"], 2)
+    return FakeSupabase({
+        "players": [{"id": p, "name": p.upper(), "telegram_id": None, "rating": r} for p, r in ratings.items()],
+        "divisions": [{"id": d, "season_id": "s1", "coef": c} for d, c in coefs.items()],
+        "matches": [{**m, "status": "played"} for m in matches],
+        "rating_history": history,
+        "division_players": dps,
+    })
+
+
+def test_consistent_history_gives_empty_diff():
+    matches, seeds, coefs = _season(n_matches=120)
+    db = _db(matches, seeds, coefs)
+    _, diff = replay_ratings(db)
+    assert all(not rows for rows in diff.values())
+    assert db.round_trips == 5  # matches, divisions, rating_history, players, division_players
+
+
+def test_score_fix_is_replayed_and_written_back():
+    matches, seeds, coefs = _season(n_matches=120)
+    db = _db(matches, seeds, coefs)
+    first = min(db.tables["matches"], key=lambda m: m["played_at"])
+    first["sets_player1"], first["sets_player2"] = first["sets_player2"], first["sets_player1"]
+    unplayed = next(m for m in db.tables["matches"] if m["id"] == "m00100")
+    unplayed["status"] = "pending"
+
+    _, diff = replay_ratings(db)
+    assert {"h-m00100-" + unplayed["player1_id"], "h-m00100-" + unplayed["player2_id"]} == set(diff["history_stale"])
+    assert diff["player_changes"] and diff["history_updates"] and diff["division_players"]
+    assert not diff["history_inserts"]
+
+    db.reset_counters()
+    written = apply_replay_diff(db, diff)
+    assert written == sum(len(rows) for key, rows in diff.items() if key != "player_changes")
+    assert db.round_trips <= 5  # по одному bulk-запросу на вид изменений
+
+    expected = _reference([m for m in db.tables["matches"] if m["status"] == "played"], seeds, coefs)
+    assert {p["id"]: p["rating"] for p in db.tables["players"]} == expected
+    _, again = replay_ratings(db)
+    assert all(not rows for rows in again.values())
+
+
+def test_missing_history_rows_are_inserted_from_earliest_seed():
+    matches, seeds, coefs = _season(n_players=4, n_matches=20)
+    db = _db(matches, seeds, coefs)
+    db.tables["rating_history"] = [r for r in db.tables["rating_history"] if r["match_id"] != "m00019"]
+    _, diff = replay_ratings(db)
+    assert {(r["match_id"], r["season_id"]) for r in diff["history_inserts"]} == {("m00019", "s1")}
+    assert len(diff["history_inserts"]) == 2
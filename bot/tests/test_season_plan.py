@@ -0,0 +1,132 @@
+"""
+План следующего сезона (services.season_plan): ротация, идемпотентность и число запросов.
+"""
+import asyncio
+
+import pytest
+
+from services import scheduler
+from services.season_plan import (
+    MOVE_DOWN,
+    MOVE_UP,
+    apply_season_plan,
+    build_season_plan,
+    load_season_plan,
+    split_division,
+)
+from tests.fake_supabase import FakeSupabase
+
+CLOSED = {"id": "s-old", "year": 2026, "month": 12, "name": "Декабрь 2026", "status": "closed"}
+
+
+def _closed_season(sizes: list[int]) -> FakeSupabase:
+    """Закрытый сезон: дивизион k (с 1) на sizes[k-1] игроков, position задан."""
+    divisions, dps, players = [], [], []
+    for k, n in enumerate(sizes, 1):
+        div_id = f"old-d{k}"
+        divisions.append({"id": div_id, "season_id": CLOSED["id"], "number": k, "coef": 0.25})
+        for pos in range(1, n + 1):
+            pid = f"d{k}-p{pos}"
+            players.append({"id": pid, "name": f"Игрок {pid}"})
+            dps.append({"id": f"dp-{pid}", "division_id": div_id, "player_id": pid, "position": pos})
+    return FakeSupabase({
+        "seasons": [dict(CLOSED)],
+        "divisions": divisions,
+        "division_players": dps,
+        "players": players,
+    })
+
+
+def _layout(db: FakeSupabase, season_id: str) -> dict[int, set[str]]:
+    nums = {d["id"]: d["number"] for d in db.tables["divisions"] if d["season_id"] == season_id}
+    layout: dict[int, set[str]] = {num: set() for num in nums.values()}
+    for row in db.tables["division_players"]:
+        if row["division_id"] in nums:
+            layout[nums[row["division_id"]]].add(row["player_id"])
+    return layout
+
+
+def test_split_division_never_moves_player_twice():
+    assert split_division(["a", "b", "c"]) == (["a", "b"], [], ["c"])
+    assert split_division(list("abcdef")) == (["a", "b"], ["c", "d"], ["e", "f"])
+    promoted, stay, relegated = split_division([str(i) for i in range(10)])
+    assert (len(promoted), len(stay), len(relegated)) == (3, 4, 3)
+
+
+def test_plan_rotates_players_and_keeps_edges():
+    db = _closed_season([6, 6, 6])
+    plan = load_season_plan(db)
+    assert plan["season"]["name"] == "Январь 2027"
+    by_num = {d["number"]: d for d in plan["divisions"]}
+    d1 = {p["player_id"]: p for p in by_num[1]["players"]}
+    # Лидеры первого дивизиона остаются в нём, туда же поднимаются двое лучших из второго
+    assert {"d1-p1", "d1-p2", "d1-p3", "d1-p4"} <= set(d1)
+    assert d1["d2-p1"]["move"] == MOVE_UP
+    assert "d1-p5" not in d1
+    d2 = {p["player_id"]: p for p in by_num[2]["players"]}
+    assert d2["d1-p6"]["move"] == MOVE_DOWN and d2["d1-p6"]["from_number"] == 1
+    d3 = {p["player_id"] for p in by_num[3]["players"]}
+    assert {"d3-p5", "d3-p6", "d2-p5", "d2-p6"} <= d3
+    placed = [p["player_id"] for d in plan["divisions"] for p in d["players"]]
+    assert len(placed) == len(set(placed)) == 18
+    assert by_num[1]["coef"] == 0.30
+
+
+def test_prepare_next_season_persists_plan(monkeypatch):
+    db = _closed_season([6, 9])
+    monkeypatch.setattr(scheduler, "_get_client", lambda: db)
+    season_id = asyncio.run(scheduler.prepare_next_season())
+    season = next(s for s in db.tables["seasons"] if s["id"] == season_id)
+    assert (season["year"], season["month"], season["status"]) == (2027, 1, "active")
+    layout = _layout(db, season_id)
+    # Из 9 игроков второго дивизиона наверх уходят трое
+    assert layout[1] >= {"d2-p1", "d2-p2", "d2-p3"}
+    assert layout[2] >= {"d1-p5", "d1-p6"}
+    assert sum(len(v) for v in layout.values()) == 15
+
+
+def test_prepare_next_season_is_idempotent_after_partial_failure(monkeypatch):
+    db = _closed_season([6, 6])
+    monkeypatch.setattr(scheduler, "_get_client", lambda: db)
+    plan = load_season_plan(db)
+    # Сбой после записи сезона и дивизионов, до division_players
+    plan_without_players = {**plan, "divisions": [{**d, "players": []} for d in plan["divisions"]]}
+    partial_id = apply_season_plan(db, plan_without_players)
+    assert _layout(db, partial_id) == {1: set(), 2: set()}
+
+    season_id = asyncio.run(scheduler.prepare_next_season())
+    assert season_id == partial_id
+    first = _layout(db, season_id)
+    assert sum(len(v) for v in first.values()) == 12
+
+    assert asyncio.run(scheduler.prepare_next_season()) == season_id
+    assert _layout(db, season_id) == first
+    assert len([s for s in db.tables["seasons"] if s["year"] == 2027]) == 1
+    assert len([d for d in db.tables["divisions"] if d["season_id"] == season_id]) == 2
+
+
+def test_preview_does_not_write(monkeypatch):
+    db = _closed_season([4, 4])
+    monkeypatch.setattr(scheduler, "_get_client", lambda: db)
+    text = asyncio.run(scheduler.preview_next_season())
+    assert {op for _, op in db.calls} == {"select"}
+    assert len(db.tables["seasons"]) == 1
+    assert "План сезона: Январь 2027" in text
+    assert "Игрок d2-p1 ⬆️ из 2" in text
+
+
+def test_build_plan_without_divisions():
+    plan = build_season_plan(CLOSED, [], [])
+    assert plan["divisions"] == []
+
+
+@pytest.mark.parametrize("sizes", [[6, 6], [8, 8, 8, 8], [12, 12, 12, 12]])
+def test_benchmark_round_trips_per_prepare(monkeypatch, sizes):
+    """
+    Бенчмарк: раньше 3 + D вставок дивизионов + до 3·D чтений + вставка на каждого игрока,
+    теперь 3 чтения плана + 6 запросов записи.
+    """
+    db = _closed_season(sizes)
+    monkeypatch.setattr(scheduler, "_get_client", lambda: db)
+    asyncio.run(scheduler.prepare_next_season())
+    assert db.round_trips == 9
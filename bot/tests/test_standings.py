@@ -0,0 +1,204 @@
+"""
+Тесты движка standings (services.standings) и бенчмарк числа round-trip'ов на пересчёт.
+"""
+import itertools
+
+import pytest
+
+from services.standings import (
+    apply_match_delta,
+    build_standings_updates,
+    compute_totals,
+    recalc_division_standings,
+    recalc_divisions_standings,
+)
+from tests.fake_supabase import FakeSupabase
+
+DIV = "div-1"
+
+
+def _division(n_players: int, division_id: str = DIV):
+    """Круговой турнир на n игроков: все матчи сыграны, p_i обыгрывает p_j при i < j (3:1)."""
+    pids = [f"{division_id}-p{i}" for i in range(n_players)]
+    matches = [
+        {
+            "id": f"{division_id}-m{i}-{j}",
+            "division_id": division_id,
+            "player1_id": pids[i],
+            "player2_id": pids[j],
+            "sets_player1": 3,
+            "sets_player2": 1,
+            "status": "played",
+        }
+        for i, j in itertools.combinations(range(n_players), 2)
+    ]
+    dps = [
+        {
+            "id": f"{division_id}-dp{i}",
+            "division_id": division_id,
+            "player_id": pid,
+            "total_points": 0,
+            "total_sets_won": 0,
+            "total_sets_lost": 0,
+            "rating_delta": 1.5,
+            "position": i + 1,
+        }
+        for i, pid in enumerate(pids)
+    ]
+    return pids, matches, dps
+
+
+def test_compute_totals_points_and_sets():
+    totals = compute_totals([
+        {"player1_id": "a", "player2_id": "b", "sets_player1": 3, "sets_player2": 2, "status": "played"},
+        {"player1_id": "c", "player2_id": "a", "sets_player1": 3, "sets_player2": 0, "status": "played"},
+        {"player1_id": "b", "player2_id": "c", "sets_player1": 0, "sets_player2": 0, "status": "pending"},
+        {"player1_id": "b", "player2_id": "c", "sets_player1": 2, "sets_player2": 2, "status": "played"},
+    ])
+    assert totals["a"] == {"points": 3, "sets_won": 3, "sets_lost": 5}
+    assert totals["b"] == {"points": 1, "sets_won": 2, "sets_lost": 3}
+    assert totals["c"] == {"points": 2, "sets_won": 3, "sets_lost": 0}
+
+
+def test_build_updates_skips_unchanged_and_players_without_matches():
+    dp_rows = [
+        {"id": "1", "division_id": DIV, "player_id": "a", "total_points": 3, "total_sets_won": 3, "total_sets_lost": 5},
+        {"id": "2", "division_id": DIV, "player_id": "b", "total_points": 0, "total_sets_won": 0, "total_sets_lost": 0},
+        {"id": "3", "division_id": DIV, "player_id": "z", "total_points": 7, "total_sets_won": 9, "total_sets_lost": 9},
+    ]
+    totals = {DIV: {
+        "a": {"points": 3, "sets_won": 3, "sets_lost": 5},
+        "b": {"points": 1, "sets_won": 2, "sets_lost": 3},
+    }}
+    updates = build_standings_updates(dp_rows, totals)
+    assert updates == [{
+        "id": "2", "division_id": DIV, "player_id": "b",
+        "total_points": 1, "total_sets_won": 2, "total_sets_lost": 3,
+    }]
+
+
+def test_recalc_writes_totals_and_keeps_other_columns():
+    pids, matches, dps = _division(4)
+    db = FakeSupabase({"matches": matches, "division_players": dps})
+    assert recalc_division_standings(db, DIV) == 4
+    by_pid = {r["player_id"]: r for r in db.tables["division_players"]}
+    # p0 выиграл все 3 матча, p3 проиграл все 3
+    assert by_pid[pids[0]]["total_points"] == 6
+    assert by_pid[pids[0]]["total_sets_won"] == 9
+    assert by_pid[pids[3]]["total_points"] == 3
+    assert by_pid[pids[3]]["total_sets_lost"] == 9
+    assert all(r["rating_delta"] == 1.5 for r in db.tables["division_players"])
+    assert [r["position"] for r in db.tables["division_players"]] == [1, 2, 3, 4]
+
+
+def test_recalc_is_noop_write_when_already_consistent():
+    _, matches, dps = _division(6)
+    db = FakeSupabase({"matches": matches, "division_players": dps})
+    recalc_division_standings(db, DIV)
+    db.reset_counters()
+    assert recalc_division_standings(db, DIV) == 0
+    assert [op for _, op in db.calls] == ["select", "select"]
+
+
+def test_recalc_season_touches_only_given_divisions():
+    _, m1, dp1 = _division(3, "d1")
+    _, m2, dp2 = _division(3, "d2")
+    _, m3, dp3 = _division(3, "d3")
+    db = FakeSupabase({"matches": m1 + m2 + m3, "division_players": dp1 + dp2 + dp3})
+    assert recalc_divisions_standings(db, ["d1", "d2"]) == 6
+    assert db.round_trips == 3
+    untouched = [r for r in db.tables["division_players"] if r["division_id"] == "d3"]
+    assert all(r["total_points"] == 0 for r in untouched)
+
+
+def test_recalc_season_reads_past_max_rows():
+    """Матчей сезона больше, чем PostgREST отдаёт за ответ: totals считаются по всем, а не по первой тысяче."""
+    divisions = [_division(30, f"d{k}") for k in range(3)]  # 3 × 435 = 1305 матчей
+    db = FakeSupabase(
+        {"matches": [m for _, ms, _ in divisions for m in ms],
+         "division_players": [r for _, _, dps in divisions for r in dps]},
+        max_rows=1000,
+    )
+    recalc_divisions_standings(db, ["d0", "d1", "d2"])
+    expected = compute_totals(db.tables["matches"])
+    for row in db.tables["division_players"]:
+        assert row["total_points"] == expected[row["player_id"]]["points"]
+    assert db.round_trips == 2 + 1 + 1  # две страницы матчей, division_players, upsert
+
+
+@pytest.mark.parametrize("n_players", [8, 16, 32])
+def test_benchmark_round_trips_per_recalc(n_players):
+    """
+    Бенчмарк: число HTTP round-trip'ов на пересчёт дивизиона.
+    Раньше: 2 чтения + по UPDATE на каждого игрока (2 + N). Теперь: 2 чтения + 1 upsert.
+    """
+    _, matches, dps = _division(n_players)
+    db = FakeSupabase({"matches": matches, "division_players": dps})
+    recalc_division_standings(db, DIV)
+    assert db.round_trips == 3  # раньше 2 + n_players
+    assert db.calls[-1] == ("division_players", "upsert")
+
+
+def _confirm_last_match(n_players: int):
+    """Дивизион, где сыгран последний матч p0–p1 (3:2), но standings его ещё не учитывают."""
+    pids, matches, dps = _division(n_players)
+    db = FakeSupabase({"matches": matches, "division_players": dps})
+    last = next(m for m in db.tables["matches"] if m["player1_id"] == pids[0] and m["player2_id"] == pids[1])
+    last["status"] = "pending_confirm"
+    recalc_division_standings(db, DIV)
+    last.update({"status": "played", "sets_player1": 3, "sets_player2": 2})
+    db.reset_counters()
+    return pids, db
+
+
+def test_apply_match_delta_updates_two_players_only():
+    pids, db = _confirm_last_match(5)
+    before = {r["player_id"]: dict(r) for r in db.tables["division_players"]}
+    assert apply_match_delta(db, DIV, pids[0], pids[1], 3, 2, 2.4, -1.2) is True
+    after = {r["player_id"]: r for r in db.tables["division_players"]}
+    assert after[pids[0]]["total_points"] == before[pids[0]]["total_points"] + 2
+    assert after[pids[0]]["rating_delta"] == 3.9
+    assert after[pids[1]]["total_sets_lost"] == before[pids[1]]["total_sets_lost"] + 3
+    assert after[pids[1]]["rating_delta"] == 0.3
+    assert all(after[p] == before[p] for p in pids[2:])
+    # Результат совпадает с полным пересчётом
+    db.reset_counters()
+    assert recalc_division_standings(db, DIV) == 0
+
+
+def test_apply_match_delta_falls_back_to_full_recalc_on_checksum_mismatch():
+    pids, db = _confirm_last_match(5)
+    drifted = next(r for r in db.tables["division_players"] if r["player_id"] == pids[4])
+    drifted["total_points"] += 2  # рассинхронизация, внесённая в обход API
+    assert apply_match_delta(db, DIV, pids[0], pids[1], 3, 2, 2.4, -1.2) is False
+    assert ("division_players", "upsert") in db.calls[3:]
+    db.reset_counters()
+    assert recalc_division_standings(db, DIV) == 0
+
+
+def test_apply_match_delta_ignores_unscored_matches_in_checksum():
+    """Сыгранные 0:0, матч без соперника и игрок вне division_players не ломают контрольную сумму."""
+    pids, matches, dps = _division(5)
+    last = next(m for m in matches if m["player1_id"] == pids[0] and m["player2_id"] == pids[1])
+    last["status"] = "pending_confirm"
+    matches += [
+        {"id": "draw", "division_id": DIV, "player1_id": pids[2], "player2_id": pids[3],
+         "sets_player1": 0, "sets_player2": 0, "status": "played"},
+        {"id": "walkover", "division_id": DIV, "player1_id": pids[2], "player2_id": None,
+         "sets_player1": 3, "sets_player2": 0, "status": "played"},
+        {"id": "left", "division_id": DIV, "player1_id": pids[3], "player2_id": "left-the-league",
+         "sets_player1": 3, "sets_player2": 1, "status": "played"},
+    ]
+    db = FakeSupabase({"matches": matches, "division_players": dps})
+    recalc_division_standings(db, DIV)
+    last.update({"status": "played", "sets_player1": 3, "sets_player2": 2})
+    db.tables["matches"] = matches
+    assert apply_match_delta(db, DIV, pids[0], pids[1], 3, 2, 2.4, -1.2) is True
+
+
+@pytest.mark.parametrize("n_players", [8, 16, 32])
+def test_benchmark_round_trips_per_confirm(n_players):
+    """Инкрементальный режим: 3 round-trip'а на подтверждение при любом размере дивизиона."""
+    pids, db = _confirm_last_match(n_players)
+    apply_match_delta(db, DIV, pids[0], pids[1], 3, 2, 2.4, -1.2)
+    assert db.round_trips == 3
@@ -0,0 +1,219 @@
+-- Атомарное подтверждение результата матча одним вызовом (RPC из API).
+-- В одной транзакции: блокировка матча и рейтингов игроков, расчёт рейтинга по ФНТР,
+-- matches → played, players.rating, division_players (дельта двум игрокам),
+-- две записи rating_history. Убирает ~10 последовательных запросов PostgREST
+-- и гонку lost update на players.rating при параллельных подтверждениях.
+-- Применить вручную в SQL Editor Supabase. API без этой миграции работает по старому пути.
+
+-- Округление до places знаков «к чётному» — как Decimal.quantize в Python (ROUND_HALF_EVEN).
+CREATE OR REPLACE FUNCTION public.round_half_even(v numeric, places integer DEFAULT 2)
+RETURNS numeric
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+  scale numeric := power(10::numeric, places);
+  scaled numeric := v * scale;
+  t numeric := trunc(scaled);
+BEGIN
+  IF abs(scaled - t) = 0.5 THEN
+    IF mod(t, 2) = 0 THEN
+      RETURN round(t / scale, places);
+    END IF;
+    RETURN round((t + sign(v)) / scale, places);
+  END IF;
+  RETURN round(v, places);
+END;
+$$;
+
+-- Пересчёт totals дивизиона по matches одним UPDATE (та же модель, что bot/services/standings.py).
+-- Игроки без сыгранных матчей не трогаются.
+CREATE OR REPLACE FUNCTION public.recalc_division_standings(p_division_id uuid)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  updated integer;
+BEGIN
+  WITH per_player AS (
+    SELECT player1_id AS player_id,
+           sets_player1 AS sets_won,
+           sets_player2 AS sets_lost,
+           CASE WHEN sets_player1 > sets_player2 THEN 2 ELSE 1 END AS points
+    FROM matches
+    WHERE division_id = p_division_id AND status = 'played' AND sets_player1 <> sets_player2
+      AND player1_id IS NOT NULL AND player2_id IS NOT NULL
+    UNION ALL
+    SELECT player2_id, sets_player2, sets_player1,
+           CASE WHEN sets_player2 > sets_player1 THEN 2 ELSE 1 END
+    FROM matches
+    WHERE division_id = p_division_id AND status = 'played' AND sets_player1 <> sets_player2
+      AND player1_id IS NOT NULL AND player2_id IS NOT NULL
+  ), totals AS (
+    SELECT player_id, SUM(points)::int AS points, SUM(sets_won)::int AS sets_won, SUM(sets_lost)::int AS sets_lost
+    FROM per_player
+    GROUP BY player_id
+  )
+  UPDATE division_players dp
+  SET total_points = t.points,
+      total_sets_won = t.sets_won,
+      total_sets_lost = t.sets_lost
+  FROM totals t
+  WHERE dp.division_id = p_division_id
+    AND dp.player_id = t.player_id
+    AND (dp.total_points, dp.total_sets_won, dp.total_sets_lost)
+        IS DISTINCT FROM (t.points, t.sets_won, t.sets_lost);
+  GET DIAGNOSTICS updated = ROW_COUNT;
+  RETURN updated;
+END;
+$$;
+
+-- Контрольная сумма standings (как checksum_matches в bot/services/standings.py): Σ totals
+-- division_players равна сумме по засчитанным матчам — счёт не равный, оба игрока есть —
+-- только для игроков из division_players. Матчи 0:0, без соперника и игроки, выбывшие
+-- из дивизиона, в сумму не входят, поэтому такой дивизион не пересчитывается целиком
+-- на каждом подтверждении. Пропущенный или применённый дважды матч сумму нарушает.
+CREATE OR REPLACE FUNCTION public.division_standings_consistent(p_division_id uuid)
+RETURNS boolean
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT s.points = e.points AND s.sets_won = e.sets_won AND s.sets_lost = e.sets_lost
+  FROM (
+    SELECT coalesce(sum(total_points), 0) AS points,
+           coalesce(sum(total_sets_won), 0) AS sets_won,
+           coalesce(sum(total_sets_lost), 0) AS sets_lost
+    FROM division_players
+    WHERE division_id = p_division_id
+  ) s, (
+    SELECT coalesce(sum(CASE WHEN x.sets_won > x.sets_lost THEN 2 ELSE 1 END), 0) AS points,
+           coalesce(sum(x.sets_won), 0) AS sets_won,
+           coalesce(sum(x.sets_lost), 0) AS sets_lost
+    FROM (
+      SELECT player1_id AS player_id, sets_player1 AS sets_won, sets_player2 AS sets_lost
+      FROM matches
+      WHERE division_id = p_division_id AND status = 'played' AND sets_player1 <> sets_player2
+        AND player1_id IS NOT NULL AND player2_id IS NOT NULL
+      UNION ALL
+      SELECT player2_id, sets_player2, sets_player1
+      FROM matches
+      WHERE division_id = p_division_id AND status = 'played' AND sets_player1 <> sets_player2
+        AND player1_id IS NOT NULL AND player2_id IS NOT NULL
+    ) x
+    WHERE x.player_id IN (SELECT player_id FROM division_players WHERE division_id = p_division_id)
+  ) e;
+$$;
+
+CREATE OR REPLACE FUNCTION public.confirm_match_result(p_match_id uuid, p_confirmed_by uuid)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  m matches%ROWTYPE;
+  v_coef numeric;
+  v_season_id uuid;
+  v_winner uuid;
+  v_loser uuid;
+  v_winner_sets integer;
+  v_loser_sets integer;
+  v_winner_before numeric;
+  v_loser_before numeric;
+  v_ks numeric;
+  v_base numeric;
+  v_delta_winner numeric;
+  v_delta_loser numeric;
+  v_recalculated boolean := false;
+BEGIN
+  SELECT * INTO m FROM matches WHERE id = p_match_id FOR UPDATE;
+  IF NOT FOUND OR m.status IS DISTINCT FROM 'pending_confirm' THEN
+    RAISE EXCEPTION 'Матч не найден или уже обработан.' USING ERRCODE = 'P0001';
+  END IF;
+  IF p_confirmed_by IS DISTINCT FROM m.player1_id AND p_confirmed_by IS DISTINCT FROM m.player2_id THEN
+    RAISE EXCEPTION 'Вы не участник этого матча.' USING ERRCODE = 'P0001';
+  END IF;
+  IF p_confirmed_by = m.submitted_by THEN
+    RAISE EXCEPTION 'Подтверждать должен соперник.' USING ERRCODE = 'P0001';
+  END IF;
+  IF coalesce(m.sets_player1, 0) = coalesce(m.sets_player2, 0) THEN
+    RAISE EXCEPTION 'Некорректный счёт матча.' USING ERRCODE = 'P0001';
+  END IF;
+
+  SELECT coalesce(d.coef, 0.25), d.season_id INTO v_coef, v_season_id
+  FROM divisions d WHERE d.id = m.division_id;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Дивизион не найден.' USING ERRCODE = 'P0001';
+  END IF;
+  IF v_season_id IS NULL THEN
+    RAISE EXCEPTION 'Сезон дивизиона не найден.' USING ERRCODE = 'P0001';
+  END IF;
+
+  IF m.sets_player1 > m.sets_player2 THEN
+    v_winner := m.player1_id; v_loser := m.player2_id;
+    v_winner_sets := m.sets_player1; v_loser_sets := m.sets_player2;
+  ELSE
+    v_winner := m.player2_id; v_loser := m.player1_id;
+    v_winner_sets := m.sets_player2; v_loser_sets := m.sets_player1;
+  END IF;
+
+  -- Блокировки в порядке id, чтобы параллельные подтверждения не дедлочились
+  PERFORM 1 FROM players WHERE id IN (v_winner, v_loser) ORDER BY id FOR UPDATE;
+  SELECT coalesce(rating, 100) INTO v_winner_before FROM players WHERE id = v_winner;
+  v_winner_before := coalesce(v_winner_before, 100);
+  SELECT coalesce(rating, 100) INTO v_loser_before FROM players WHERE id = v_loser;
+  v_loser_before := coalesce(v_loser_before, 100);
+
+  -- ФНТР: КС 3:0 → 1.2, 3:1 → 1.0, 3:2 → 0.8
+  v_ks := CASE
+    WHEN v_winner_sets = 3 AND v_loser_sets = 0 THEN 1.2
+    WHEN v_winner_sets = 3 AND v_loser_sets = 2 THEN 0.8
+    ELSE 1.0
+  END;
+  v_base := (100 - (v_winner_before - v_loser_before)) / 10;
+  v_delta_winner := public.round_half_even(v_base * v_coef * v_ks, 2);
+  v_delta_loser := -public.round_half_even(v_base / 2 * v_coef * v_ks, 2);
+
+  UPDATE matches SET status = 'played', played_at = now() WHERE id = m.id;
+  UPDATE players SET rating = v_winner_before + v_delta_winner WHERE id = v_winner;
+  UPDATE players SET rating = v_loser_before + v_delta_loser WHERE id = v_loser;
+
+  UPDATE division_players
+  SET total_points = coalesce(total_points, 0) + CASE WHEN player_id = v_winner THEN 2 ELSE 1 END,
+      total_sets_won = coalesce(total_sets_won, 0) + CASE WHEN player_id = v_winner THEN v_winner_sets ELSE v_loser_sets END,
+      total_sets_lost = coalesce(total_sets_lost, 0) + CASE WHEN player_id = v_winner THEN v_loser_sets ELSE v_winner_sets END,
+      rating_delta = coalesce(rating_delta, 0) + CASE WHEN player_id = v_winner THEN v_delta_winner ELSE v_delta_loser END
+  WHERE division_id = m.division_id AND player_id IN (v_winner, v_loser);
+
+  INSERT INTO rating_history (player_id, match_id, season_id, rating_before, rating_delta, rating_after)
+  VALUES
+    (v_winner, m.id, v_season_id, v_winner_before, v_delta_winner, v_winner_before + v_delta_winner),
+    (v_loser, m.id, v_season_id, v_loser_before, v_delta_loser, v_loser_before + v_delta_loser);
+
+  -- Контрольная сумма standings: при расхождении — полный пересчёт дивизиона
+  IF NOT public.division_standings_consistent(m.division_id) THEN
+    PERFORM public.recalc_division_standings(m.division_id);
+    v_recalculated := true;
+  END IF;
+
+  RETURN jsonb_build_object(
+    'match_id', m.id,
+    'division_id', m.division_id,
+    'winner_id', v_winner,
+    'loser_id', v_loser,
+    'winner_rating_before', v_winner_before,
+    'winner_rating_after', v_winner_before + v_delta_winner,
+    'delta_winner', v_delta_winner,
+    'loser_rating_before', v_loser_before,
+    'loser_rating_after', v_loser_before + v_delta_loser,
+    'delta_loser', v_delta_loser,
+    'standings_recalculated', v_recalculated
+  );
+END;
+$$;
+
+-- Только backend (service_role): anon-ключ фронта не должен подтверждать матчи в обход API
+REVOKE ALL ON FUNCTION public.confirm_match_result(uuid, uuid) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.recalc_division_standings(uuid) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.division_standings_consistent(uuid) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.confirm_match_result(uuid, uuid) TO service_role;
+GRANT EXECUTE ON FUNCTION public.recalc_division_standings(uuid) TO service_role;
+GRANT EXECUTE ON FUNCTION public.division_standings_consistent(uuid) TO service_role;
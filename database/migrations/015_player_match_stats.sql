@@ -0,0 +1,190 @@
+-- Материализованная статистика игроков для страницы Рейтинг.
+-- Представление player_stats (006) на каждый запрос агрегировало все матчи через
+-- LEFT JOIN matches ON player1_id = p.id OR player2_id = p.id — время росло с историей.
+-- Теперь агрегаты лежат в player_match_stats и обновляются триггером на matches
+-- инкрементально (±1 матч при переходе в played и обратно), player_stats читает таблицу.
+-- Пересборка целиком: SELECT public.refresh_player_stats(); (или /rebuildstats в боте).
+-- Применить вручную в SQL Editor Supabase; в конце миграции — backfill по существующим матчам.
+
+CREATE TABLE IF NOT EXISTS player_match_stats (
+    player_id UUID PRIMARY KEY REFERENCES players(id) ON DELETE CASCADE,
+    games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    sets_won INTEGER NOT NULL DEFAULT 0,
+    sets_lost INTEGER NOT NULL DEFAULT 0,
+    last_played_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Поиск матчей игрока при откате last_played_at (player1_id уже покрыт idx_matches_player1_player2)
+CREATE INDEX IF NOT EXISTS idx_matches_player2_id ON matches(player2_id);
+
+ALTER TABLE player_match_stats ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Anyone can view player_match_stats" ON player_match_stats;
+CREATE POLICY "Anyone can view player_match_stats" ON player_match_stats FOR SELECT USING (true);
+
+-- Триггер пишет в player_match_stats от имени владельца: RLS не должен мешать любому, кто обновляет matches.
+-- Добавить (p_sign = 1) или вычесть (p_sign = -1) один сыгранный матч из статистики игрока.
+CREATE OR REPLACE FUNCTION public.player_match_stats_apply(
+    p_player_id uuid,
+    p_sets_won integer,
+    p_sets_lost integer,
+    p_played_at timestamptz,
+    p_sign integer
+)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF p_player_id IS NULL THEN
+    RETURN;
+  END IF;
+  INSERT INTO player_match_stats AS s (player_id, games, wins, sets_won, sets_lost, last_played_at, updated_at)
+  VALUES (
+    p_player_id,
+    p_sign,
+    CASE WHEN p_sets_won > p_sets_lost THEN p_sign ELSE 0 END,
+    p_sign * p_sets_won,
+    p_sign * p_sets_lost,
+    CASE WHEN p_sign > 0 THEN p_played_at END,
+    now()
+  )
+  ON CONFLICT (player_id) DO UPDATE
+  SET games = s.games + EXCLUDED.games,
+      wins = s.wins + EXCLUDED.wins,
+      sets_won = s.sets_won + EXCLUDED.sets_won,
+      sets_lost = s.sets_lost + EXCLUDED.sets_lost,
+      last_played_at = CASE
+        WHEN p_sign > 0 THEN greatest(s.last_played_at, p_played_at)
+        ELSE s.last_played_at
+      END,
+      updated_at = now();
+
+  -- Максимум нельзя «вычесть»: при откате матча дата последней игры берётся заново (по индексам игрока)
+  IF p_sign < 0 THEN
+    UPDATE player_match_stats
+    SET last_played_at = (
+      SELECT max(m.played_at) FROM matches m
+      WHERE m.status = 'played' AND (m.player1_id = p_player_id OR m.player2_id = p_player_id)
+    )
+    WHERE player_id = p_player_id;
+  END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.player_match_stats_on_match()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'played' THEN
+    PERFORM public.player_match_stats_apply(
+      OLD.player1_id, coalesce(OLD.sets_player1, 0), coalesce(OLD.sets_player2, 0), OLD.played_at, -1);
+    PERFORM public.player_match_stats_apply(
+      OLD.player2_id, coalesce(OLD.sets_player2, 0), coalesce(OLD.sets_player1, 0), OLD.played_at, -1);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'played' THEN
+    PERFORM public.player_match_stats_apply(
+      NEW.player1_id, coalesce(NEW.sets_player1, 0), coalesce(NEW.sets_player2, 0), NEW.played_at, 1);
+    PERFORM public.player_match_stats_apply(
+      NEW.player2_id, coalesce(NEW.sets_player2, 0), coalesce(NEW.sets_player1, 0), NEW.played_at, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_player_match_stats_insert_delete ON matches;
+CREATE TRIGGER trg_player_match_stats_insert_delete
+AFTER INSERT OR DELETE ON matches
+FOR EACH ROW EXECUTE FUNCTION public.player_match_stats_on_match();
+
+-- UPDATE: только если затронут сыгранный матч и изменилось что-то, влияющее на статистику
+DROP TRIGGER IF EXISTS trg_player_match_stats_update ON matches;
+CREATE TRIGGER trg_player_match_stats_update
+AFTER UPDATE ON matches
+FOR EACH ROW
+WHEN (
+  (OLD.status = 'played' OR NEW.status = 'played')
+  AND (OLD.status, OLD.player1_id, OLD.player2_id, OLD.sets_player1, OLD.sets_player2, OLD.played_at)
+      IS DISTINCT FROM
+      (NEW.status, NEW.player1_id, NEW.player2_id, NEW.sets_player1, NEW.sets_player2, NEW.played_at)
+)
+EXECUTE FUNCTION public.player_match_stats_on_match();
+
+-- Полная пересборка по matches (та же модель, что bot/services/player_stats.py).
+-- Пишет только отличающиеся строки; возвращает число изменённых строк.
+CREATE OR REPLACE FUNCTION public.refresh_player_stats()
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  upserted integer;
+  removed integer;
+BEGIN
+  WITH per_player AS (
+    SELECT player1_id AS player_id, sets_player1 AS sets_won, sets_player2 AS sets_lost, played_at
+    FROM matches WHERE status = 'played' AND player1_id IS NOT NULL
+    UNION ALL
+    SELECT player2_id, sets_player2, sets_player1, played_at
+    FROM matches WHERE status = 'played' AND player2_id IS NOT NULL
+  ), totals AS (
+    SELECT player_id,
+           count(*)::int AS games,
+           count(*) FILTER (WHERE coalesce(sets_won, 0) > coalesce(sets_lost, 0))::int AS wins,
+           coalesce(sum(sets_won), 0)::int AS sets_won,
+           coalesce(sum(sets_lost), 0)::int AS sets_lost,
+           max(played_at) AS last_played_at
+    FROM per_player
+    GROUP BY player_id
+  )
+  INSERT INTO player_match_stats AS s (player_id, games, wins, sets_won, sets_lost, last_played_at, updated_at)
+  SELECT player_id, games, wins, sets_won, sets_lost, last_played_at, now() FROM totals
+  ON CONFLICT (player_id) DO UPDATE
+  SET games = EXCLUDED.games,
+      wins = EXCLUDED.wins,
+      sets_won = EXCLUDED.sets_won,
+      sets_lost = EXCLUDED.sets_lost,
+      last_played_at = EXCLUDED.last_played_at,
+      updated_at = now()
+  WHERE (s.games, s.wins, s.sets_won, s.sets_lost, s.last_played_at)
+        IS DISTINCT FROM
+        (EXCLUDED.games, EXCLUDED.wins, EXCLUDED.sets_won, EXCLUDED.sets_lost, EXCLUDED.last_played_at);
+  GET DIAGNOSTICS upserted = ROW_COUNT;
+
+  DELETE FROM player_match_stats s
+  WHERE NOT EXISTS (
+    SELECT 1 FROM matches m
+    WHERE m.status = 'played' AND (m.player1_id = s.player_id OR m.player2_id = s.player_id)
+  );
+  GET DIAGNOSTICS removed = ROW_COUNT;
+  RETURN upserted + removed;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.player_match_stats_apply(uuid, integer, integer, timestamptz, integer)
+  FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.refresh_player_stats() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.refresh_player_stats() TO service_role;
+
+-- Backfill
+SELECT public.refresh_player_stats();
+
+-- Рейтинг: players по idx_players_rating + поиск по первичному ключу статистики,
+-- время не зависит от числа матчей. Новые столбцы добавлены в конец (CREATE OR REPLACE VIEW).
+CREATE OR REPLACE VIEW player_stats AS
+SELECT
+  p.id,
+  p.name,
+  p.rating,
+  p.telegram_id,
+  coalesce(s.games, 0) AS games,
+  coalesce(s.wins, 0) AS wins,
+  coalesce(s.sets_won, 0) AS sets_won,
+  coalesce(s.sets_lost, 0) AS sets_lost,
+  s.last_played_at
+FROM players p
+LEFT JOIN player_match_stats s ON s.player_id = p.id;
@@ -0,0 +1,51 @@
+-- График рейтинга игрока (GET /players/{id}/rating-history).
+-- Составной индекс (player_id, created_at, id): выборка истории игрока по времени и keyset-пагинация
+-- «после (created_at, id)» читают только нужный диапазон индекса, без сортировки всей истории.
+-- id в конце — однозначный порядок записей с одинаковым created_at (две записи одного матча).
+-- Прежний idx_rating_history_player_id покрывается новым индексом и удаляется.
+-- Функция rating_history_series прореживает историю в базе: последняя точка каждой недели/месяца,
+-- в ответ уходят только они. API без этой миграции прореживает сам, читая историю страницами.
+-- Применить вручную в SQL Editor Supabase.
+
+CREATE INDEX IF NOT EXISTS idx_rating_history_player_created
+    ON rating_history(player_id, created_at, id);
+DROP INDEX IF EXISTS idx_rating_history_player_id;
+
+-- Последнее значение рейтинга за каждую неделю (week) или месяц (month) по UTC,
+-- сумма дельт и число матчей в периоде. p_from — начало первого периода (курсор страницы).
+-- Допустимость p_bucket проверяет API (date_trunc с другой единицей дал бы другие периоды).
+CREATE OR REPLACE FUNCTION public.rating_history_series(
+    p_player_id uuid,
+    p_bucket text,
+    p_from timestamptz DEFAULT NULL,
+    p_limit integer DEFAULT 120
+)
+RETURNS TABLE (
+    bucket timestamptz,
+    created_at timestamptz,
+    rating_after numeric,
+    rating_delta numeric,
+    games bigint
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT s.bucket, s.created_at, s.rating_after, s.rating_delta, s.games
+  FROM (
+    SELECT date_trunc(p_bucket, h.created_at, 'UTC') AS bucket,
+           h.created_at,
+           h.rating_after,
+           sum(h.rating_delta) OVER w AS rating_delta,
+           count(*) OVER w AS games,
+           row_number() OVER (w ORDER BY h.created_at DESC, h.id DESC) AS rn
+    FROM rating_history h
+    WHERE h.player_id = p_player_id
+      AND (p_from IS NULL OR h.created_at >= p_from)
+    WINDOW w AS (PARTITION BY date_trunc(p_bucket, h.created_at, 'UTC'))
+  ) s
+  WHERE s.rn = 1
+  ORDER BY s.bucket
+  LIMIT p_limit;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.rating_history_series(uuid, text, timestamptz, integer) TO anon, authenticated, service_role;
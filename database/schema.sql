@@ -86,7 +86,7 @@ CREATE INDEX idx_division_players_division_id ON division_players(division_id);
 CREATE INDEX idx_division_players_player_id ON division_players(player_id);
 CREATE INDEX idx_matches_division_id ON matches(division_id);
 CREATE INDEX idx_matches_player1_player2 ON matches(player1_id, player2_id);
-CREATE INDEX idx_rating_history_player_id ON rating_history(player_id);
+CREATE INDEX idx_rating_history_player_created ON rating_history(player_id, created_at, id);
 CREATE INDEX idx_rating_history_season_id ON rating_history(season_id);
 
 -- RLS политики для Supabase (anon: только чтение; запись через API с service role)
@@ -163,3 +163,34 @@ export async function cancelGameRequest(requestId, playerId) {
   await checkResponse(res)
   return res.json()
 }
+
+/**
+ * Прогноз рейтинга для оставшихся пар дивизиона: дельты обоих игроков и сценарий
+ * для каждого из шести счетов (scores). Считается на сервере один раз на версию дивизиона.
+ */
+export async function getDivisionScenarios(divisionId) {
+  const url = baseUrl()
+  if (!url) throw new Error('VITE_API_URL not set')
+  const res = await fetch(`${url}/divisions/${divisionId}/scenarios`, {
+    headers: headers(),
+  })
+  await checkResponse(res)
+  return res.json()
+}
+
+/**
+ * История рейтинга игрока для графика. bucket: 'match' | 'week' | 'month';
+ * следующая страница — cursor = next_cursor предыдущего ответа (null — история закончилась).
+ */
+export async function getPlayerRatingHistory(playerId, { bucket = 'match', limit, cursor } = {}) {
+  const url = baseUrl()
+  if (!url) throw new Error('VITE_API_URL not set')
+  const params = new URLSearchParams({ bucket })
+  if (limit) params.set('limit', String(limit))
+  if (cursor) params.set('cursor', cursor)
+  const res = await fetch(`${url}/players/${playerId}/rating-history?${params}`, {
+    headers: headers(),
+  })
+  await checkResponse(res)
+  return res.json()
+}
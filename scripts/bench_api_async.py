@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Нагрузочное сравнение async-роутов API с прежними синхронными: p50/p99 задержки
+при N одновременных клиентах (по умолчанию 50).
+
+Сервер (uvicorn) поднимается отдельным процессом с поддельным Supabase, который отвечает
+через --latency секунд (сеть до PostgREST): ни Supabase, ни .env не нужны.
+В одном приложении два варианта GET /divisions/{id}/matches:
+  /divisions/...       — текущий async-роут: две выборки параллельно (asyncio.gather);
+  /sync/divisions/...  — прежний `def`-роут: две выборки подряд в пуле потоков (40 потоков).
+Каждый запрос — другой дивизион, чтобы не попадать в кэш ответов.
+Клиенты и сервер делят одну машину: на одном ядре в p50 входит и очередь за CPU.
+
+Использование:
+  python scripts/bench_api_async.py [--clients 50] [--requests 20] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+MATCHES = [{
+    "id": "m1", "player1_id": "p1", "player2_id": "p2",
+    "sets_player1": 3, "sets_player2": 1, "status": "played", "submitted_by": None,
+}]
+DIVISION_PLAYERS = [{"player_id": pid, "player": {"id": pid, "name": pid}} for pid in ("p1", "p2")]
+
+
+class FakeQuery:
+    """Построитель запроса: любые фильтры, execute() — через latency (sleep или await)."""
+
+    def __init__(self, rows, latency: float, is_async: bool):
+        self._rows, self._latency, self._async = rows, latency, is_async
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        if self._async:
+            async def delayed():
+                await asyncio.sleep(self._latency)
+                return SimpleNamespace(data=list(self._rows))
+            return delayed()
+        time.sleep(self._latency)
+        return SimpleNamespace(data=list(self._rows))
+
+
+class FakeSupabase:
+    def __init__(self, latency: float, is_async: bool):
+        self._latency, self._async = latency, is_async
+
+    def table(self, name):
+        rows = {"matches": MATCHES, "division_players": DIVISION_PLAYERS}.get(name, [])
+        return FakeQuery(rows, self._latency, self._async)
+
+
+def serve(port: int, latency: float) -> None:
+    import uvicorn
+
+    import api.dependencies as deps
+
+    sync_sb, async_sb = FakeSupabase(latency, False), FakeSupabase(latency, True)
+
+    async def get_async_supabase():
+        return async_sb
+
+    # До импорта роутеров: они берут зависимости из api.dependencies при импорте
+    deps.get_supabase = lambda: sync_sb
+    deps.get_async_supabase = get_async_supabase
+    os.environ.pop("API_KEY", None)
+    from api.main import app
+    from api.routers.divisions import (
+        _full_matrix_payload,
+        _matrix_matches_query,
+        _matrix_players_query,
+        _matrix_source,
+    )
+
+    def get_division_matches_sync(division_id: str):
+        r_m = _matrix_matches_query(sync_sb, division_id).execute()
+        r_dp = _matrix_players_query(sync_sb, division_id).execute()
+        return _full_matrix_payload(*_matrix_source(r_m.data, r_dp.data))
+
+    app.add_api_route("/sync/divisions/{division_id}/matches", get_division_matches_sync)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def _get(reader, writer, path: str) -> int:
+    """Один GET по keep-alive соединению. Минимальный клиент HTTP/1.1: httpx на том же
+    ядре съел бы больше CPU, чем сервер, и мерил бы сам себя."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = next(int(l.split(":", 1)[1]) for l in lines if l.lower().startswith("content-length:"))
+    await reader.readexactly(length)
+    return int(lines[0].split(" ")[1])
+
+
+async def load(port: int, prefix: str, clients: int, requests: int, run: str = "bench") -> list[float]:
+    latencies: list[float] = []
+
+    async def worker(n: int):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            for k in range(requests):
+                started = time.perf_counter()
+                status = await _get(reader, writer, f"{prefix}/divisions/{run}-{n}-{k}/matches")
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    raise RuntimeError(f"HTTP {status}")
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(worker(n) for n in range(clients)))
+    return latencies
+
+
+def wait_for_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("API server did not start")
+
+
+def percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="запросов на клиента")
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка одного запроса к PostgREST, с")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.latency)
+        return
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, __file__, "--serve", str(port), "--latency", str(args.latency)],
+        cwd=ROOT,
+    )
+    try:
+        wait_for_port(port)
+        print(f"{args.clients} клиентов × {args.requests} запросов, задержка PostgREST {args.latency * 1000:.0f} мс")
+        for name, prefix in (("sync ", "/sync"), ("async", "")):
+            asyncio.run(load(port, prefix, args.clients, 2, run="warmup"))
+            started = time.perf_counter()
+            latencies = asyncio.run(load(port, prefix, args.clients, args.requests))
+            elapsed = time.perf_counter() - started
+            print(
+                f"{name}: p50 {percentile(latencies, 50):7.1f} мс   p99 {percentile(latencies, 99):7.1f} мс   "
+                f"{len(latencies) / elapsed:6.0f} запр/с"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк переигровки рейтинга на синтетической истории (по умолчанию 100 000 матчей,
+2 000 игроков): прежний путь — матч за матчем через calculate_match_rating (Decimal),
+и rating_replay.replay_matches (целые в сотых, массивы). Итоговые рейтинги сверяются.
+
+Использование:
+  python scripts/bench_rating_replay.py [--matches 100000] [--players 2000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bot.services.rating_calculator import calculate_match_rating
+from bot.services.rating_replay import replay_matches
+
+SCORES = [(3, 0), (3, 1), (3, 2), (0, 3), (1, 3), (2, 3)]
+
+
+def synthetic_history(n_matches: int, n_players: int, seed: int = 1):
+    rnd = random.Random(seed)
+    pids = [f"p{i}" for i in range(n_players)]
+    coefs = {f"d{i}": c for i, c in enumerate((1.25, 1.0, 0.75, 0.5, 0.25))}
+    divisions = list(coefs)
+    matches = []
+    for k in range(n_matches):
+        p1, p2 = rnd.sample(pids, 2)
+        s1, s2 = rnd.choice(SCORES)
+        matches.append({
+            "id": f"m{k:07d}",
+            "division_id": rnd.choice(divisions),
+            "player1_id": p1,
+            "player2_id": p2,
+            "sets_player1": s1,
+            "sets_player2": s2,
+            "played_at": f"t{k:07d}",
+        })
+    seeds = {pid: round(rnd.uniform(50, 300), 2) for pid in pids}
+    return matches, seeds, coefs
+
+
+def replay_decimal(matches, seeds, coefs):
+    """Как раньше: по одному матчу, Decimal внутри calculate_match_rating."""
+    ratings = dict(seeds)
+    for m in sorted(matches, key=lambda m: (m["played_at"], m["id"])):
+        p1, p2, s1, s2 = m["player1_id"], m["player2_id"], m["sets_player1"], m["sets_player2"]
+        w, l, ws, ls = (p1, p2, s1, s2) if s1 > s2 else (p2, p1, s2, s1)
+        rw, rl = ratings[w], ratings[l]
+        dw, dl = calculate_match_rating(rw, rl, ws, ls, coefs[m["division_id"]])
+        ratings[w] = round((rw + dw) * 100) / 100
+        ratings[l] = round((rl + dl) * 100) / 100
+    return ratings
+
+
+def best_of(fn, repeats: int):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=100_000)
+    parser.add_argument("--players", type=int, default=2_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    matches, seeds, coefs = synthetic_history(args.matches, args.players)
+    print(f"{args.matches} матчей, {args.players} игроков, лучшее из {args.repeats}")
+    decimal_s, expected = best_of(lambda: replay_decimal(matches, seeds, coefs), args.repeats)
+    replay_s, replay = best_of(lambda: replay_matches(matches, seeds, coefs), args.repeats)
+    assert replay.final_ratings() == expected, "итоговые рейтинги разошлись"
+    print(f"Decimal, матч за матчем: {decimal_s * 1000:8.0f} мс")
+    print(f"replay_matches:          {replay_s * 1000:8.0f} мс  (×{decimal_s / replay_s:.1f})")
+    print("Итоговые рейтинги совпадают.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк авторизации API: проверка Bearer-токена без кэша (jwt.decode на каждый запрос)
+и с попаданием в кэш проверенных токенов (api.token_cache), а также накладные расходы
+авторизации на целый запрос через TestClient (роут без зависимостей и с require_current_player_id).
+
+Ни Supabase, ни .env не нужны: секрет и токен создаются на месте.
+
+Использование:
+  python scripts/bench_token_cache.py [--loops 2000] [--request-loops 200] [--repeats 5]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+SECRET = "bench-jwt-secret-at-least-32-characters-long"
+PLAYER = "00000000-0000-0000-0000-000000000001"
+os.environ["JWT_SECRET"] = SECRET
+
+import jwt
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import api.dependencies as deps
+from api.dependencies import require_current_player_id
+from api.token_cache import token_cache
+
+
+def make_token() -> str:
+    now = int(time.time())
+    return jwt.encode({"player_id": PLAYER, "iat": now, "exp": now + 3600}, SECRET, algorithm="HS256")
+
+
+def best_of(fn, repeats: int, loops: int) -> float:
+    """Лучшее среднее время одного вызова fn, секунды."""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best
+
+
+def bench_verification(repeats: int, loops: int) -> None:
+    header = f"Bearer {make_token()}"
+    token_cache.clear()
+    cold = best_of(lambda: (token_cache.clear(), deps._player_id_from_bearer(header)), repeats, loops)
+    warm = best_of(lambda: deps._player_id_from_bearer(header), repeats, loops)
+    print(f"Проверка Bearer: jwt.decode {cold * 1e6:8.1f} мкс, из кэша {warm * 1e6:8.1f} мкс  (×{cold / warm:.1f})")
+
+
+def bench_request(repeats: int, loops: int) -> None:
+    headers = {"Authorization": f"Bearer {make_token()}"}
+    app = FastAPI()
+
+    @app.get("/open")
+    async def open_route():
+        return {}
+
+    @app.get("/me")
+    async def me(current=Depends(require_current_player_id)):
+        return {}
+
+    tc = TestClient(app)
+    tc.get("/me", headers=headers)
+    baseline = best_of(lambda: tc.get("/open", headers=headers), repeats, loops)
+    authed = best_of(lambda: tc.get("/me", headers=headers), repeats, loops)
+    print(f"Запрос без авторизации {baseline * 1e6:8.0f} мкс")
+    print(f"Запрос с Bearer        {authed * 1e6:8.0f} мкс  (накладные {(authed - baseline) * 1e6:.0f} мкс)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loops", type=int, default=2000)
+    parser.add_argument("--request-loops", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Лучшее из {args.repeats}")
+    bench_verification(args.repeats, args.loops)
+    bench_request(args.repeats, args.request_loops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Переигровка рейтинга по всей истории сыгранных матчей (bot/services/rating_replay.py):
+после правки формулы ФНТР или исправления счёта задним числом.
+
+По умолчанию только отчёт: у каких игроков разойдётся рейтинг и сколько строк
+rating_history / division_players изменится. С --write разница записывается в БД
+bulk-запросами. Кэши работающих API и бота живут до своего TTL.
+
+Использование:
+  python scripts/replay_ratings.py [--write] [--limit 20]
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+load_dotenv(ROOT / "bot" / ".env")
+
+from supabase import create_client
+
+from bot.services.rating_replay import replay_ratings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--write", action="store_true", help="записать разницу в БД")
+    parser.add_argument("--limit", type=int, default=20, help="сколько игроков показать в отчёте")
+    args = parser.parse_args()
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        print("Укажите SUPABASE_URL и SUPABASE_KEY (или SUPABASE_SERVICE_KEY) в .env")
+        sys.exit(1)
+
+    replay, diff = replay_ratings(create_client(url, key), write=args.write)
+    print(f"Переиграно матчей: {len(replay.matches)}, игроков: {len(replay.player_ids)}")
+    changes = sorted(diff["player_changes"], key=lambda c: -abs(c["replayed"] - float(c["stored"] or 0)))
+    for c in changes[: args.limit]:
+        print(f"  {c['name'] or c['player_id']}: {c['stored']} → {c['replayed']}")
+    if len(changes) > args.limit:
+        print(f"  … и ещё {len(changes) - args.limit}")
+    print(
+        f"Игроков с другим рейтингом: {len(changes)}; rating_history: "
+        f"изменить {len(diff['history_updates'])}, добавить {len(diff['history_inserts'])}, "
+        f"удалить {len(diff['history_stale'])}; division_players: {len(diff['division_players'])}"
+    )
+    print("Записано в БД." if args.write else "Только отчёт; для записи запустите с --write.")
+
+
+if __name__ == "__main__":
+    main()